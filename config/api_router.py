@@ -1,6 +1,9 @@
 from django.conf import settings
+from django.urls import path
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
+from osler.analytics.api import views as analytics
+from osler.core.api import views as core
 from osler.users.api.views import UserViewSet
 
 if settings.DEBUG:
@@ -12,4 +15,15 @@ router.register("users", UserViewSet)
 
 
 app_name = "api"
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("patients/<int:pk>/timeline/", core.PatientTimeline.as_view(),
+         name="patient-timeline"),
+    path("analytics/volume/", analytics.ClinicVolume.as_view(),
+         name="analytics-volume"),
+    path("analytics/diagnoses/", analytics.DiagnosisFrequency.as_view(),
+         name="analytics-diagnoses"),
+    path("analytics/referrals/", analytics.ReferralOutcomes.as_view(),
+         name="analytics-referrals"),
+    path("analytics/demographics/", analytics.PatientDemographics.as_view(),
+         name="analytics-demographics"),
+]
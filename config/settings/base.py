@@ -85,6 +85,8 @@ LOCAL_APPS = [
     'osler.referral.apps.ReferralConfig',
     'osler.audit.apps.AuditConfig',
     'osler.vaccine.apps.VaccineConfig',
+    'osler.jobs.apps.JobsConfig',
+    'osler.analytics.apps.AnalyticsConfig',
 ]
 
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
@@ -327,6 +329,58 @@ OSLER_TODO_LIST_MANAGERS = [
     ('referral', 'FollowupRequest'),
     ('vaccine', 'VaccineActionItem')]
 
+# Case managers emailed about an overdue item by action_item_spam are
+# reminded of it if it's still overdue this many days later
+OSLER_ACTION_ITEM_REMINDER_DAYS = 7
+
+# Notes listed on the patient timeline, kept in PatientTimelineEntry
+OSLER_TIMELINE_NOTES = [
+    ('workup', 'Workup'),
+    ('workup', 'ProgressNote'),
+    ('followup', 'LabFollowup'),
+    ('followup', 'ActionItemFollowup'),
+    ('core', 'Document'),
+    ('vaccine', 'VaccineDose'),
+    ('vaccine', 'VaccineFollowup'),
+    ('referral', 'PatientContact')]
+OSLER_TIMELINE_ENTRIES_PER_PAGE = 25
+
+# Cache the rendered sections of patient charts in the default cache (see
+# core.chart_cache); entries are invalidated when the patient's notes change
+OSLER_CHART_CACHE_ENABLED = True
+OSLER_CHART_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+
+# Answer conditional GETs of charts and patient lists with 304 Not Modified
+# when no chart has changed (see core.conditional)
+OSLER_CONDITIONAL_GET_ENABLED = True
+
+# Cache rendered workup PDFs on disk (see workup.pdf); None disables the cache.
+# The least recently downloaded PDFs are deleted past the size cap.
+OSLER_PDF_CACHE_DIR = str(APPS_DIR / "media" / "pdf_cache")
+OSLER_PDF_CACHE_MAX_BYTES = 500 * 1024 * 1024
+# Processes converting notes to PDF for zip exports (see workup.export);
+# 0 converts them in the exporting process.
+OSLER_PDF_EXPORT_PROCESSES = 4
+# Zip exports downloaded from the site are made by the workup.export_zip job
+# and kept here, within the size cap, for the views to serve.
+OSLER_PDF_EXPORT_DIR = str(APPS_DIR / "media" / "pdf_cache" / "exports")
+OSLER_PDF_EXPORT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Rows read per query by streaming data exports (see core.data_export)
+OSLER_EXPORT_CHUNK_SIZE = 2000
+
+# Rows validated and written together by bulk patient imports (see
+# core.patient_import)
+OSLER_IMPORT_BATCH_SIZE = 200
+
+# Background jobs (see jobs.queue), run by the run_jobs command. In eager
+# mode, jobs run in the process that queues them as soon as they're queued.
+OSLER_JOBS_EAGER = False
+OSLER_JOBS_POLL_INTERVAL = 2  # seconds
+OSLER_JOBS_RETRY_DELAY = 60  # seconds, doubled after each failed attempt
+OSLER_JOBS_TIMEOUT = 60 * 60  # seconds before a running job is requeued
+OSLER_JOBS_KEEP_DAYS = 30  # days to keep the records of succeeded jobs
+
 OSLER_MAX_APPOINTMENTS = 5
 OSLER_DEFAULT_APPOINTMENT_HOUR = 9
 
@@ -341,8 +395,27 @@ OSLER_CLINIC_DAYS_PER_PAGE = 20
 
 OSLER_DEFAULT_DASHBOARD = 'dashboard-attending'
 OSLER_PROVIDERTYPE_DASHBOARDS = {
-    'Attending': 'dashboard-attending'
+    'Attending': 'dashboard-attending',
+    'Coordinator': 'dashboard-coordinator',
+    'Clinical': 'dashboard-volunteer',
+    'Preclinical': 'dashboard-volunteer',
 }
+# Entries listed in each work queue on the coordinator and volunteer
+# dashboards (see dashboard.models.WorkQueueEntry)
+OSLER_WORK_QUEUE_LENGTH = 50
 
 # List of IP addresses to exclude from audit
 OSLER_AUDIT_BLACK_LIST = []
+
+# How AuditMiddleware writes PageviewRecords: 'synchronous' writes each one
+# in the response path; 'buffered' batches them in-process (see audit.sinks)
+OSLER_AUDIT_MODE = 'synchronous'
+OSLER_AUDIT_BUFFER_SIZE = 50
+OSLER_AUDIT_FLUSH_INTERVAL = 5  # seconds
+# Directory where buffered records that fail to save are spooled, to be
+# loaded later with the replay_audit_spool command. None drops them.
+OSLER_AUDIT_SPOOL_DIR = None
+# PageviewRecords older than this many months (counting the current one)
+# are moved to gzipped files in OSLER_AUDIT_ARCHIVE_DIR by archive_pageviews
+OSLER_AUDIT_RETENTION_MONTHS = 13
+OSLER_AUDIT_ARCHIVE_DIR = None
@@ -1,5 +1,7 @@
 from .base import *  # noqa
-from .base import env
+from .base import (env, OSLER_PDF_CACHE_DIR, OSLER_PDF_CACHE_MAX_BYTES,
+                   OSLER_PDF_EXPORT_PROCESSES, OSLER_PDF_EXPORT_DIR,
+                   OSLER_PDF_EXPORT_MAX_BYTES)
 
 # GENERAL
 # ------------------------------------------------------------------------------
@@ -152,5 +154,20 @@ LOGGING = {
 
 # Your stuff...
 # -----------------------------------------------------------------------------
+OSLER_AUDIT_MODE = env("OSLER_AUDIT_MODE", default="buffered")
+OSLER_AUDIT_SPOOL_DIR = env("OSLER_AUDIT_SPOOL_DIR", default=None)
+OSLER_AUDIT_ARCHIVE_DIR = env("OSLER_AUDIT_ARCHIVE_DIR", default=None)
+
 DEBUG = TEMPLATE_DEBUG = False
 CRISPY_FAIL_SILENTLY = not DEBUG
+OSLER_CHART_CACHE_ENABLED = env.bool("OSLER_CHART_CACHE_ENABLED", default=True)
+OSLER_CONDITIONAL_GET_ENABLED = env.bool(
+    "OSLER_CONDITIONAL_GET_ENABLED", default=True)
+OSLER_PDF_CACHE_DIR = env("OSLER_PDF_CACHE_DIR", default=OSLER_PDF_CACHE_DIR)
+OSLER_PDF_CACHE_MAX_BYTES = env.int(
+    "OSLER_PDF_CACHE_MAX_BYTES", default=OSLER_PDF_CACHE_MAX_BYTES)
+OSLER_PDF_EXPORT_PROCESSES = env.int(
+    "OSLER_PDF_EXPORT_PROCESSES", default=OSLER_PDF_EXPORT_PROCESSES)
+OSLER_PDF_EXPORT_DIR = env("OSLER_PDF_EXPORT_DIR", default=OSLER_PDF_EXPORT_DIR)
+OSLER_PDF_EXPORT_MAX_BYTES = env.int(
+    "OSLER_PDF_EXPORT_MAX_BYTES", default=OSLER_PDF_EXPORT_MAX_BYTES)
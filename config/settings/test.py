@@ -24,6 +24,13 @@ CACHES = {
         "LOCATION": "",
     }
 }
+# the cache outlives test transactions, in which patient pks are reused
+OSLER_CHART_CACHE_ENABLED = False
+# likewise, files cached on disk would outlive the test database
+OSLER_PDF_CACHE_DIR = None
+OSLER_PDF_EXPORT_DIR = None
+# run background jobs inline, raising their errors
+OSLER_JOBS_EAGER = True
 
 # PASSWORDS
 # ------------------------------------------------------------------------------
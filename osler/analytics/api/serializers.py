@@ -0,0 +1,43 @@
+import datetime
+
+from django.utils.timezone import localdate
+from rest_framework import serializers
+
+from osler.workup.models import ClinicType
+
+
+class ReportQuerySerializer(serializers.Serializer):
+    '''The query parameters of analytics reports. The range defaults to the
+    last year, ending today.'''
+
+    GROUP_BY = ['day', 'week', 'month', 'year']
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    group_by = serializers.ChoiceField(GROUP_BY, default='month')
+    clinic_type = serializers.PrimaryKeyRelatedField(
+        queryset=ClinicType.objects.all(), many=True, required=False)
+
+    def validate(self, data):
+        data.setdefault('end', localdate())
+        data.setdefault('start', data['end'] - datetime.timedelta(days=365))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError(
+                "start must not be after end.")
+        return data
+
+
+class DemographicsQuerySerializer(ReportQuerySerializer):
+
+    # the patient fields that demographics can be broken down by
+    BREAKDOWNS = {
+        'gender': 'gender',
+        'ethnicity': 'ethnicities',
+        'language': 'languages',
+        'annual_income': 'demographics__annual_income',
+        'education_level': 'demographics__education_level',
+        'work_status': 'demographics__work_status',
+        'has_insurance': 'demographics__has_insurance',
+    }
+
+    by = serializers.ChoiceField(sorted(BREAKDOWNS))
@@ -0,0 +1,170 @@
+'''Read-only clinic statistics, for grant reporting and the like.
+
+Each report takes the parameters of ReportQuerySerializer and sums the
+DailyRollups in the date range by period (day, week, month or year), so
+they don't scan workups or referrals. Stale rollups are refreshed first.
+Reports are for staff only (see IsStaffProvider).
+'''
+from __future__ import unicode_literals
+import collections
+
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import Trunc
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from osler.analytics.models import DailyRollup
+from osler.core.api.permissions import IsStaffProvider
+from osler.core.models import Patient
+from osler.referral.models import Referral
+from osler.workup.models import ClinicType, Workup
+
+from . import serializers
+
+
+def rollup_totals(metrics, start, end, group_by, clinic_type=None):
+    '''Rows of (period, clinic type pk, metric, key, count, amount)
+    summing the rollups of metrics from start to end.'''
+
+    rollups = DailyRollup.objects.filter(
+        metric__in=metrics, date__gte=start, date__lte=end)
+    if clinic_type:
+        rollups = rollups.filter(clinic_type__in=clinic_type)
+
+    return rollups \
+        .annotate(period=Trunc('date', group_by, output_field=DateField())) \
+        .values_list('period', 'clinic_type', 'metric', 'key') \
+        .annotate(count=Sum('count'), amount=Sum('amount')) \
+        .order_by('period', 'clinic_type_id', 'key')
+
+
+class AnalyticsView(APIView):
+
+    permission_classes = [IsAuthenticated, IsStaffProvider]
+    query_serializer_class = serializers.ReportQuerySerializer
+
+    def get(self, request, format=None):
+        query = self.query_serializer_class(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        DailyRollup.objects.refresh()
+
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'group_by': params['group_by'],
+            'results': self.report(**params),
+        })
+
+    def report(self, start, end, group_by, clinic_type=None):
+        raise NotImplementedError
+
+
+class ClinicVolume(AnalyticsView):
+    '''Workups, patient visits, and vouchers by period and clinic type.'''
+
+    FIELDS = {
+        DailyRollup.WORKUPS: [('workups', 'count')],
+        DailyRollup.PATIENTS: [('patient_visits', 'count')],
+        DailyRollup.VOUCHERS: [('vouchers', 'count'),
+                               ('voucher_total', 'amount')],
+        DailyRollup.IMAGING_VOUCHERS: [('imaging_vouchers', 'count'),
+                                       ('imaging_voucher_total', 'amount')],
+        DailyRollup.PATIENT_PAYS: [('patient_pays_total', 'amount')],
+    }
+
+    def report(self, start, end, group_by, clinic_type=None):
+        clinic_types = ClinicType.objects.in_bulk()
+
+        rows = collections.OrderedDict()
+        for period, ct, metric, key, count, amount in rollup_totals(
+                self.FIELDS, start, end, group_by, clinic_type):
+            if (period, ct) not in rows:
+                rows[(period, ct)] = dict(
+                    {'period': period, 'clinic_type': str(clinic_types[ct])},
+                    **{name: 0 for fields in self.FIELDS.values()
+                       for name, _ in fields})
+            totals = {'count': count, 'amount': amount}
+            for name, total in self.FIELDS[metric]:
+                rows[(period, ct)][name] = totals[total]
+
+        return list(rows.values())
+
+
+class DiagnosisFrequency(AnalyticsView):
+    '''The number of workups with each diagnosis type, by period.'''
+
+    def report(self, start, end, group_by, clinic_type=None):
+        counts = collections.Counter()
+        for period, ct, metric, diagnosis, count, amount in rollup_totals(
+                [DailyRollup.DIAGNOSES], start, end, group_by, clinic_type):
+            counts[(period, diagnosis)] += count
+
+        return [{'period': period, 'diagnosis': diagnosis, 'count': count}
+                for (period, diagnosis), count in sorted(
+                    counts.items(), key=lambda item: (item[0][0], -item[1],
+                                                      item[0][1]))]
+
+
+class ReferralOutcomes(AnalyticsView):
+    '''Referrals of each type by status, and the fraction that succeeded,
+    by period. Referrals aren't made on clinic days, so clinic_type is
+    ignored.'''
+
+    def report(self, start, end, group_by, clinic_type=None):
+        statuses = {DailyRollup.REFERRAL_METRICS[status]: name.lower()
+                    for status, name in Referral.REFERRAL_STATUSES}
+
+        rows = collections.OrderedDict()
+        for period, ct, metric, kind, count, amount in rollup_totals(
+                statuses, start, end, group_by):
+            if (period, kind) not in rows:
+                rows[(period, kind)] = dict(
+                    {'period': period, 'referral_type': kind},
+                    **{status: 0 for status in statuses.values()})
+            rows[(period, kind)][statuses[metric]] = count
+
+        for row in rows.values():
+            total = sum(row[status] for status in statuses.values())
+            row['success_rate'] = row['successful'] / float(total)
+
+        return sorted(rows.values(),
+                      key=lambda row: (row['period'], row['referral_type']))
+
+
+class PatientDemographics(AnalyticsView):
+    '''The number of distinct patients with workups in the date range, by
+    a demographic field. Since it counts distinct patients, this report
+    isn't grouped by period and is computed from workups directly.'''
+
+    query_serializer_class = serializers.DemographicsQuerySerializer
+
+    def get(self, request, format=None):
+        query = self.query_serializer_class(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'by': params['by'],
+            'results': self.report(**params),
+        })
+
+    def report(self, start, end, by, clinic_type=None, **kwargs):
+        workups = Workup.objects.filter(
+            clinic_day__clinic_date__gte=start,
+            clinic_day__clinic_date__lte=end)
+        if clinic_type:
+            workups = workups.filter(clinic_day__clinic_type__in=clinic_type)
+
+        field = self.query_serializer_class.BREAKDOWNS[by]
+        counts = Patient.objects \
+            .filter(workup__in=workups) \
+            .values_list(field) \
+            .annotate(patients=Count('pk', distinct=True)) \
+            .order_by('-patients', field)
+
+        return [{by: value, 'patients': n} for value, n in counts]
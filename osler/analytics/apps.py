@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class AnalyticsConfig(AppConfig):
+    name = 'osler.analytics'
+    verbose_name = _("Analytics")
+
+    def ready(self):
+        import osler.analytics.signals  # noqa F401
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from osler.analytics import tasks
+from osler.analytics.models import DailyRollup
+
+
+class Command(BaseCommand):
+    help = '''Recompute the daily rollups behind the analytics API for the
+    dates whose workups or referrals changed. Reports do this themselves,
+    so running it (e.g. nightly) just keeps them fast. With --rebuild,
+    recompute every date, e.g. after notes are changed in bulk in a way
+    that bypasses signals.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help="Recompute the rollups of all dates.")
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue the refresh as a background job.")
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = tasks.refresh_rollups.delay()
+            self.stdout.write("Queued job %s." % job.pk)
+        elif options['rebuild']:
+            n = DailyRollup.objects.rebuild()
+            self.stdout.write("Rebuilt %s daily rollups." % n)
+        else:
+            n = DailyRollup.objects.refresh()
+            self.stdout.write("Refreshed the rollups of %s dates." % n)
@@ -0,0 +1,43 @@
+# Generated by Django 3.0.5 on 2026-10-17 17:48
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('workup', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleDate',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(max_length=30)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('clinic_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='workup.ClinicType')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailyrollup',
+            index=models.Index(fields=['metric', 'date'], name='analytics_metric_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailyrollup',
+            unique_together={('date', 'clinic_type', 'metric', 'key')},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staledate',
+            name='marked',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,182 @@
+from __future__ import unicode_literals
+from functools import reduce
+import decimal
+import operator
+
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import now
+
+from osler.referral.models import Referral
+from osler.workup.models import ClinicType, Workup
+
+
+class StaleDate(models.Model):
+    '''A date whose DailyRollups are out of date, because a workup or
+    referral on that date was saved or deleted since they were computed.
+    Marked by signals in analytics.signals.'''
+
+    date = models.DateField(primary_key=True)
+    # when the date was last marked, so that a date marked again while its
+    # rollups are being refreshed stays stale (see DailyRollupManager)
+    marked = models.DateTimeField(default=now)
+
+    @classmethod
+    def mark(cls, *dates):
+        dates = {d for d in dates if d is not None}
+        marked = now()
+        cls.objects.filter(date__in=dates).update(marked=marked)
+        cls.objects.bulk_create([cls(date=d, marked=marked) for d in dates],
+                                ignore_conflicts=True)
+
+    @classmethod
+    def unmark(cls, marks):
+        '''Delete the marks of marks, (date, marked) pairs, unless their
+        dates have been marked again since.'''
+        marks = list(marks)
+        # in batches, so as not to hit limits on the size of a query
+        for i in range(0, len(marks), 100):
+            cls.objects.filter(reduce(operator.or_, (
+                Q(date=date, marked=marked)
+                for date, marked in marks[i:i + 100]))).delete()
+
+    def __str__(self):
+        return str(self.date)
+
+
+class DailyRollupManager(models.Manager):
+
+    def compute(self, dates=None):
+        '''Unsaved rollups of the workups and referrals of dates (or of all
+        dates), computed with three aggregate queries.'''
+
+        workups = Workup.objects.all()
+        diagnoses = Workup.diagnosis_categories.through.objects.all()
+        referrals = Referral.objects.annotate(
+            date=TruncDate('written_datetime'))
+        if dates is not None:
+            workups = workups.filter(clinic_day__clinic_date__in=dates)
+            diagnoses = diagnoses.filter(
+                workup__clinic_day__clinic_date__in=dates)
+            referrals = referrals.filter(date__in=dates)
+
+        rollups = []
+
+        def add(date, clinic_type, metric, key='', count=0, amount=None):
+            if count or amount:
+                rollups.append(self.model(
+                    date=date, clinic_type_id=clinic_type, metric=metric,
+                    key=key, count=count, amount=amount or 0))
+
+        for row in workups \
+                .values_list('clinic_day__clinic_date',
+                             'clinic_day__clinic_type') \
+                .annotate(
+                    n=Count('pk'),
+                    patients=Count('patient', distinct=True),
+                    vouchers=Count('pk', filter=Q(got_voucher=True)),
+                    voucher_total=Sum('voucher_amount'),
+                    imaging_vouchers=Count(
+                        'pk', filter=Q(got_imaging_voucher=True)),
+                    imaging_total=Sum('imaging_voucher_amount'),
+                    pays=Sum('patient_pays'),
+                    pays_imaging=Sum('patient_pays_imaging')) \
+                .order_by():
+            (date, clinic_type, n, patients, vouchers, voucher_total,
+             imaging_vouchers, imaging_total, pays, pays_imaging) = row
+
+            add(date, clinic_type, self.model.WORKUPS, count=n)
+            add(date, clinic_type, self.model.PATIENTS, count=patients)
+            add(date, clinic_type, self.model.VOUCHERS, count=vouchers,
+                amount=voucher_total)
+            add(date, clinic_type, self.model.IMAGING_VOUCHERS,
+                count=imaging_vouchers, amount=imaging_total)
+            add(date, clinic_type, self.model.PATIENT_PAYS,
+                amount=(pays or 0) + (pays_imaging or 0))
+
+        for date, clinic_type, diagnosis, n in diagnoses \
+                .values_list('workup__clinic_day__clinic_date',
+                             'workup__clinic_day__clinic_type',
+                             'diagnosistype') \
+                .annotate(n=Count('pk')) \
+                .order_by():
+            add(date, clinic_type, self.model.DIAGNOSES, diagnosis, n)
+
+        for date, kind, status, n in referrals \
+                .values_list('date', 'kind', 'status') \
+                .annotate(n=Count('pk')) \
+                .order_by():
+            add(date, None, self.model.REFERRAL_METRICS[status], kind, n)
+
+        return rollups
+
+    def refresh(self):
+        '''Recompute the rollups of all stale dates. Returns the number of
+        dates refreshed.'''
+
+        with transaction.atomic():
+            marks = list(StaleDate.objects.select_for_update()
+                         .values_list('date', 'marked'))
+            if not marks:
+                return 0
+
+            dates = [date for date, marked in marks]
+            self.get_queryset().filter(date__in=dates).delete()
+            self.bulk_create(self.compute(dates))
+            StaleDate.unmark(marks)
+
+        return len(marks)
+
+    def rebuild(self):
+        '''Recompute all rollups. Returns the number of rollups written.'''
+
+        with transaction.atomic():
+            marks = list(StaleDate.objects.select_for_update()
+                         .values_list('date', 'marked'))
+            self.get_queryset().delete()
+            rollups = self.bulk_create(self.compute())
+            StaleDate.unmark(marks)
+
+        return len(rollups)
+
+
+class DailyRollup(models.Model):
+    '''The total of one metric over the workups of a clinic type (or, for
+    referrals, all referrals) on one day, optionally broken down by key
+    (the diagnosis type or referral type).
+
+    Reports sum rollups over date ranges instead of scanning workups. Note
+    that 'patients' is the number of distinct patients seen each day, so
+    its sum over a range counts patient visits.'''
+
+    class Meta(object):
+        unique_together = [('date', 'clinic_type', 'metric', 'key')]
+        indexes = [models.Index(fields=['metric', 'date'],
+                                name='analytics_metric_date_idx')]
+
+    WORKUPS = 'workups'
+    PATIENTS = 'patients'
+    VOUCHERS = 'vouchers'
+    IMAGING_VOUCHERS = 'imaging_vouchers'
+    PATIENT_PAYS = 'patient_pays'
+    DIAGNOSES = 'diagnoses'
+    REFERRAL_METRICS = {status: 'referrals_%s' % status.lower()
+                        for status, _ in Referral.REFERRAL_STATUSES}
+
+    date = models.DateField()
+    clinic_type = models.ForeignKey(
+        ClinicType, blank=True, null=True, on_delete=models.CASCADE)
+    metric = models.CharField(max_length=30)
+    key = models.CharField(max_length=100, blank=True)
+
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2,
+                                 default=decimal.Decimal(0))
+
+    objects = DailyRollupManager()
+
+    def __str__(self):
+        return '%s %s%s on %s' % (
+            self.count, self.metric, ' (%s)' % self.key if self.key else '',
+            self.date)
@@ -0,0 +1,56 @@
+'''Signal handlers that mark the dates whose rollups need recomputing.'''
+from django.db.models.signals import (pre_save, post_save, post_delete,
+                                      m2m_changed)
+from django.dispatch import receiver
+from django.utils.timezone import localtime
+
+from osler.analytics.models import StaleDate
+from osler.referral.models import Referral
+from osler.workup.models import ClinicDate, Workup
+
+
+@receiver(pre_save, sender=Workup)
+def mark_old_workup_date(sender, instance, raw=False, **kwargs):
+    '''An edited workup may have moved to another clinic day, so its old
+    date is stale too.'''
+    if not raw and instance.pk is not None:
+        StaleDate.mark(*Workup.objects.filter(pk=instance.pk).values_list(
+            'clinic_day__clinic_date', flat=True))
+
+
+@receiver(post_save, sender=Workup)
+@receiver(post_delete, sender=Workup)
+def mark_workup_date(sender, instance, raw=False, **kwargs):
+    if not raw:
+        StaleDate.mark(instance.clinic_day.clinic_date)
+
+
+@receiver(m2m_changed, sender=Workup.diagnosis_categories.through)
+def mark_diagnosis_dates(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if not reverse:
+        StaleDate.mark(instance.clinic_day.clinic_date)
+    else:
+        workups = Workup.objects.filter(diagnosis_categories=instance)
+        if pk_set:
+            workups = Workup.objects.filter(pk__in=pk_set)
+        StaleDate.mark(*set(workups.values_list(
+            'clinic_day__clinic_date', flat=True)))
+
+
+@receiver(pre_save, sender=ClinicDate)
+def mark_clinic_dates(sender, instance, raw=False, **kwargs):
+    '''Moving a clinic day changes the rollups of its old and new date.'''
+    if not raw and instance.pk is not None:
+        StaleDate.mark(instance.clinic_date, *ClinicDate.objects.filter(
+            pk=instance.pk).values_list('clinic_date', flat=True))
+
+
+@receiver(post_save, sender=Referral)
+@receiver(post_delete, sender=Referral)
+def mark_referral_date(sender, instance, raw=False, **kwargs):
+    if not raw:
+        StaleDate.mark(localtime(instance.written_datetime).date())
@@ -0,0 +1,9 @@
+from __future__ import unicode_literals
+
+from osler.analytics.models import DailyRollup
+from osler.jobs.queue import task
+
+
+@task('analytics.refresh_rollups')
+def refresh_rollups():
+    DailyRollup.objects.refresh()
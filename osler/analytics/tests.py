@@ -0,0 +1,207 @@
+from __future__ import unicode_literals
+import datetime
+import decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate
+from rest_framework.test import APIClient
+
+from osler.core.models import Patient, ProviderType, ReferralType
+from osler.core.tests.test_views import build_provider
+from osler.referral.models import Referral
+from osler.workup import models as workup_models
+from osler.workup.tests import wu_dict
+
+from .models import DailyRollup, StaleDate
+
+
+class AnalyticsTest(TestCase):
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.provider = build_provider(["Coordinator"])
+        self.client = APIClient()
+        self.client.force_authenticate(self.provider.associated_user)
+
+        self.today = localdate()
+        self.clinic_type = workup_models.ClinicType.objects.first()
+        self.other_type = workup_models.ClinicType.objects.create(
+            name="Psych Night")
+        self.clinic_day = workup_models.ClinicDate.objects.create(
+            clinic_type=self.clinic_type, clinic_date=self.today)
+        self.other_day = workup_models.ClinicDate.objects.create(
+            clinic_type=self.other_type,
+            clinic_date=self.today - datetime.timedelta(days=1))
+
+        self.diagnosis = workup_models.DiagnosisType.objects.first()
+        self.patients = list(Patient.objects.all()[:2])
+
+        self.workups = []
+        for pt, day, voucher in [(self.patients[0], self.clinic_day, 10),
+                                 (self.patients[0], self.clinic_day, None),
+                                 (self.patients[-1], self.other_day, 5)]:
+            wu = workup_models.Workup.objects.create(**dict(
+                wu_dict(), clinic_day=day, patient=pt,
+                author=self.provider,
+                got_voucher=voucher is not None, voucher_amount=voucher))
+            wu.diagnosis_categories.add(self.diagnosis)
+            self.workups.append(wu)
+
+        self.reftype = ReferralType.objects.create(name="Specialty")
+        for status in [Referral.STATUS_SUCCESSFUL, Referral.STATUS_SUCCESSFUL,
+                       Referral.STATUS_UNSUCCESSFUL, Referral.STATUS_PENDING]:
+            Referral.objects.create(
+                status=status, kind=self.reftype, author=self.provider,
+                author_type=ProviderType.objects.first(),
+                patient=self.patients[0])
+
+    def get(self, name, **params):
+        response = self.client.get(reverse('api:analytics-%s' % name),
+                                   params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['results']
+
+    def test_signals_mark_dates(self):
+        self.assertEqual(
+            set(StaleDate.objects.values_list('date', flat=True)),
+            {self.today, self.other_day.clinic_date})
+
+        DailyRollup.objects.refresh()
+        self.assertFalse(StaleDate.objects.exists())
+
+        # moving a workup to another day makes both days stale
+        wu = self.workups[0]
+        wu.clinic_day = self.other_day
+        wu.save()
+        self.assertEqual(
+            set(StaleDate.objects.values_list('date', flat=True)),
+            {self.today, self.other_day.clinic_date})
+
+    def test_marked_again_during_refresh(self):
+        compute = DailyRollup.objects.compute
+
+        def compute_while_marking(dates=None):
+            # a workup on today is saved while the rollups are computed
+            StaleDate.mark(self.today)
+            return compute(dates)
+
+        with mock.patch.object(DailyRollup.objects, 'compute',
+                               side_effect=compute_while_marking):
+            self.assertEqual(DailyRollup.objects.refresh(), 2)
+
+        self.assertEqual(list(StaleDate.objects.values_list('date',
+                                                            flat=True)),
+                         [self.today])
+
+    def test_staff_only(self):
+        clinical = build_provider(["Clinical"])
+        self.client.force_authenticate(clinical.associated_user)
+        for name in ['volume', 'diagnoses', 'referrals', 'demographics']:
+            response = self.client.get(reverse('api:analytics-%s' % name))
+            self.assertEqual(response.status_code, 403)
+
+        # staff acting in a role that isn't
+        self.client.force_authenticate(None)
+        provider = build_provider(["Coordinator", "Clinical"])
+        self.client.login(username=provider.associated_user.username,
+                          password='password')
+        session = self.client.session
+        session['clintype_pk'] = 'Clinical'
+        session.save()
+        response = self.client.get(reverse('api:analytics-volume'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_refresh_matches_rebuild(self):
+        DailyRollup.objects.refresh()
+        self.workups[1].delete()
+        self.workups[0].diagnosis_categories.clear()
+        DailyRollup.objects.refresh()
+
+        def rollups():
+            return sorted(DailyRollup.objects.values_list(
+                'date', 'clinic_type', 'metric', 'key', 'count', 'amount'),
+                key=str)
+
+        refreshed = rollups()
+        DailyRollup.objects.rebuild()
+        self.assertEqual(refreshed, rollups())
+
+    def test_volume(self):
+        results = self.get('volume', group_by='day')
+
+        self.assertEqual(len(results), 2)
+        by_type = {row['clinic_type']: row for row in results}
+
+        today = by_type[str(self.clinic_type)]
+        self.assertEqual(today['period'], self.today)
+        self.assertEqual(today['workups'], 2)
+        self.assertEqual(today['patient_visits'], 1)
+        self.assertEqual(today['vouchers'], 1)
+        self.assertEqual(decimal.Decimal(str(today['voucher_total'])), 10)
+
+        self.assertEqual(by_type[str(self.other_type)]['workups'], 1)
+
+        # the refreshed rollups follow changes
+        self.workups[1].delete()
+        results = self.get('volume', group_by='day',
+                           clinic_type=self.clinic_type.pk)
+        self.assertEqual([row['workups'] for row in results], [1])
+
+    def test_diagnoses(self):
+        results = self.get('diagnoses', group_by='year')
+
+        self.assertEqual(results, [{
+            'period': self.today.replace(month=1, day=1),
+            'diagnosis': self.diagnosis.pk,
+            'count': 3}])
+
+    def test_referrals(self):
+        results = self.get('referrals', group_by='day')
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['referral_type'], self.reftype.pk)
+        self.assertEqual(results[0]['successful'], 2)
+        self.assertEqual(results[0]['pending'], 1)
+        self.assertEqual(results[0]['unsuccessful'], 1)
+        self.assertEqual(results[0]['success_rate'], 0.5)
+
+    def test_demographics(self):
+        results = self.get('demographics', by='gender')
+
+        self.assertEqual(sum(row['patients'] for row in results),
+                         len(set(self.patients)))
+
+    def test_report_queries(self):
+        '''Reports read rollups, so their queries don't grow with the
+        number of workups.'''
+        self.get('volume')
+        with CaptureQueriesContext(connection) as queries:
+            self.get('volume')
+        n_queries = len(queries)
+
+        for wu in self.workups:
+            wu.pk = None
+            wu.save()
+        self.get('volume')
+
+        with self.assertNumQueries(n_queries):
+            self.get('volume')
+
+    def test_invalid_query(self):
+        response = self.client.get(reverse('api:analytics-volume'), {
+            'start': self.today, 'end': self.today - datetime.timedelta(1)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_refresh_command(self):
+        out = StringIO()
+        call_command('refresh_analytics', stdout=out)
+        self.assertIn("Refreshed the rollups of 2 dates", out.getvalue())
+
+        call_command('refresh_analytics', rebuild=True, stdout=out)
+        self.assertTrue(DailyRollup.objects.exists())
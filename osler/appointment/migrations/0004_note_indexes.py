@@ -0,0 +1,21 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0003_auto_20200509_2315'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-written_datetime'], name='appointment_patient_dd48ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='appointment_written_64acda_idx'),
+        ),
+    ]
@@ -18,7 +18,7 @@ def generate_default_appointment_time():
 
 class Appointment(Note):
 
-    class Meta:
+    class Meta(Note.Meta):
         ordering = ["-clindate", "-clintime"]
 
     PSYCH_NIGHT = 'PSYCH_NIGHT'
@@ -1,7 +1,7 @@
 from __future__ import unicode_literals
 from django.contrib import admin
 
-from .models import PageviewRecord
+from .models import PageviewRecord, PageviewRollup
 
 
 class PageviewRecordAdmin(admin.ModelAdmin):
@@ -33,6 +33,9 @@ class PageviewRecordAdmin(admin.ModelAdmin):
         'url', 'role__short_name'
     )
 
+    # counting every row for the "N total" link is a full scan
+    show_full_result_count = False
+
     # change_list_template = 'admin/pageview-log-summary.html'
     # date_hierarchy = 'timestamp'
 
@@ -55,4 +58,21 @@ class PageviewRecordAdmin(admin.ModelAdmin):
         return False
 
 
+class PageviewRollupAdmin(PageviewRecordAdmin):
+
+    list_filter = ()
+
+    list_display = (
+        'date',
+        'user',
+        'url',
+        'count',
+    )
+
+    search_fields = (
+        'user__username', 'user__first_name', 'user__last_name', 'url'
+    )
+
+
 admin.site.register(PageviewRecord, PageviewRecordAdmin)
+admin.site.register(PageviewRollup, PageviewRollupAdmin)
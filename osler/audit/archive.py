@@ -0,0 +1,98 @@
+'''Monthly archiving of PageviewRecords.
+
+Each month of records older than the retention window is written to a
+gzipped JSON-lines file and deleted from the database. Records that arrived
+after their day was rolled up (see PageviewRollupManager.roll_up) are added
+to the PageviewRollups first. This keeps the PageviewRecord table to a bounded number of months
+on any database backend.
+'''
+from __future__ import unicode_literals
+import datetime
+import gzip
+import json
+import os
+
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils.timezone import localtime
+
+from osler.audit.models import (PageviewRecord, PageviewRollup,
+                                PageviewRollupDay, start_of_day)
+
+
+def next_month(day):
+    '''The first day of the month after day's month.'''
+    return (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def months_before(cutoff):
+    '''Yield the first day of each month that has PageviewRecords and ends
+    on or before the month containing cutoff begins.'''
+
+    first = PageviewRecord.objects.aggregate(first=Min('timestamp'))['first']
+    if first is None:
+        return
+
+    month = localtime(first).date().replace(day=1)
+    cutoff = cutoff.replace(day=1)
+    while month < cutoff:
+        yield month
+        month = next_month(month)
+
+
+def archive_path(archive_dir, month):
+    '''An unused file name for month's archive. Later archives of the same
+    month (e.g. of records that arrived late) get a numeric suffix.'''
+
+    stem = os.path.join(archive_dir, 'pageviews-%s' % month.strftime('%Y-%m'))
+    path = stem + '.jsonl.gz'
+    n = 1
+    while os.path.exists(path):
+        path = '%s.%s.jsonl.gz' % (stem, n)
+        n += 1
+
+    return path
+
+
+def archive_month(month, archive_dir, chunk_size=2000):
+    '''Archive and delete the PageviewRecords of the month beginning on
+    month, rolling up those not rolled up yet. Returns the number of
+    records archived.'''
+
+    end = next_month(month)
+    records = PageviewRecord.objects.filter(
+        timestamp__gte=start_of_day(month), timestamp__lt=start_of_day(end))
+
+    last_pk = records.aggregate(last=Max('pk'))['last']
+    if last_pk is None:
+        return 0
+    # records written while we archive are left for the next run
+    records = records.filter(pk__lte=last_pk)
+
+    path = archive_path(archive_dir, month)
+    tmp_path = path + '.part'
+    n_records = 0
+    with gzip.open(tmp_path, 'wt') as archive:
+        for row in records.order_by('pk').values().iterator(
+                chunk_size=chunk_size):
+            archive.write(json.dumps(row, default=str) + '\n')
+            n_records += 1
+    os.replace(tmp_path, path)
+
+    # counted in the same transaction as the delete, so that records
+    # archived twice (if the delete fails) are only counted once.
+    with transaction.atomic():
+        counted = Q()
+        for rolled_up in PageviewRollupDay.objects.select_for_update() \
+                .filter(date__gte=month, date__lt=end):
+            counted |= Q(
+                timestamp__gte=start_of_day(rolled_up.date),
+                timestamp__lt=start_of_day(
+                    rolled_up.date + datetime.timedelta(days=1)),
+                pk__lte=rolled_up.last_pk)
+
+        PageviewRollup.objects.add_counts(
+            records.exclude(counted) if counted else records)
+        records.delete()
+
+    return n_records
@@ -0,0 +1,49 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import localdate
+
+from osler.audit import tasks
+from osler.audit.archive import archive_month, months_before
+
+
+class Command(BaseCommand):
+    help = '''Roll up and archive PageviewRecords from months older than
+    OSLER_AUDIT_RETENTION_MONTHS to gzipped files, deleting them from the
+    database. Run monthly.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--archive-dir', default=settings.OSLER_AUDIT_ARCHIVE_DIR,
+            help="Defaults to OSLER_AUDIT_ARCHIVE_DIR.")
+        parser.add_argument(
+            '--months', type=int,
+            default=settings.OSLER_AUDIT_RETENTION_MONTHS,
+            help="Number of months (including this one) to keep in the "
+                 "database. Defaults to OSLER_AUDIT_RETENTION_MONTHS.")
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue the archiving as a background job.")
+
+    def handle(self, *args, **options):
+        if options['archive_dir'] is None:
+            raise CommandError("No archive directory given and "
+                               "OSLER_AUDIT_ARCHIVE_DIR is not set.")
+        if options['months'] < 1:
+            raise CommandError("At least this month must be kept.")
+
+        cutoff = localdate().replace(day=1)
+        for i in range(options['months'] - 1):
+            cutoff = (cutoff - datetime.timedelta(days=1)).replace(day=1)
+
+        if options['background']:
+            job = tasks.archive_pageviews.delay(
+                options['archive_dir'], cutoff.isoformat())
+            self.stdout.write("Queued job %s." % job.pk)
+            return
+
+        for month in months_before(cutoff):
+            n = archive_month(month, options['archive_dir'])
+            self.stdout.write("Archived %s pageviews from %s." %
+                              (n, month.strftime('%B %Y')))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from osler.audit import tasks
+from osler.audit.sinks import replay_spool
+
+
+class Command(BaseCommand):
+    help = '''Save audit records that the buffered audit sink spooled to
+    disk because they couldn't be written to the database. Records that
+    still can't be saved are moved to the spool directory's dead-letter
+    file.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir', default=settings.OSLER_AUDIT_SPOOL_DIR,
+            help="Defaults to OSLER_AUDIT_SPOOL_DIR.")
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue the replay as a background job.")
+
+    def handle(self, *args, **options):
+        if options['spool_dir'] is None:
+            raise CommandError("No spool directory given and "
+                               "OSLER_AUDIT_SPOOL_DIR is not set.")
+
+        if options['background']:
+            job = tasks.replay_audit_spool.delay(options['spool_dir'])
+            self.stdout.write("Queued job %s." % job.pk)
+            return
+
+        n = replay_spool(options['spool_dir'])
+        self.stdout.write("Saved %s spooled audit records." % n)
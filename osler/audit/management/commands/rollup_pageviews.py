@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from osler.audit import tasks
+from osler.audit.models import PageviewRollup
+
+
+class Command(BaseCommand):
+    help = '''Add the PageviewRecords of each completed day written since
+    the last run to the PageviewRollups. Safe to run again. Run daily.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue the rollup as a background job.")
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = tasks.rollup_pageviews.delay()
+            self.stdout.write("Queued job %s." % job.pk)
+            return
+
+        n = PageviewRollup.objects.roll_up()
+        self.stdout.write("Rolled up %s pageviews." % n)
@@ -1,9 +1,8 @@
 from __future__ import unicode_literals
-from django.contrib.auth.models import AnonymousUser
 from django.conf import settings
-from django.apps import apps
+from django.utils.timezone import now
 
-from osler.core.models import ProviderType
+from osler.audit.sinks import get_sink
 
 
 class AuditMiddleware:
@@ -23,24 +22,19 @@ class AuditMiddleware:
         else:
             user_ip = request.META.get('REMOTE_ADDR')
 
-        role = request.session.get('clintype_pk', None)
-
-        if role is not None:
-            role = ProviderType.objects.get(pk=role)
-
         if user_ip not in settings.OSLER_AUDIT_BLACK_LIST:
-            PageviewRecord = apps.get_app_config('audit').get_model(
-                model_name='PageviewRecord')
-
-            PageviewRecord.objects.create(
-                user=(None if isinstance(request.user, AnonymousUser)
-                      else request.user),
-                role=role,
+            # the session stores the ProviderType's primary key, so there's
+            # no need to look it up to record it.
+            get_sink().record(
+                user_id=(request.user.pk if request.user.is_authenticated
+                         else None),
+                role_id=request.session.get('clintype_pk', None),
                 user_ip=user_ip,
                 method=request.method,
                 url=request.get_full_path(),
                 referrer=request.META.get('HTTP_REFERER', None),
-                status_code=response.status_code
+                status_code=response.status_code,
+                timestamp=now()
             )
 
         return response
@@ -0,0 +1,46 @@
+# Generated by Django 3.0.5 on 2026-10-17 16:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audit', '0004_pageviewrecord_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageviewRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('url', models.URLField(max_length=256)),
+                ('count', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='pageviewrecord',
+            index=models.Index(fields=['timestamp'], name='audit_pv_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageviewrecord',
+            index=models.Index(fields=['user', 'timestamp'], name='audit_pv_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageviewrecord',
+            index=models.Index(fields=['url', 'timestamp'], name='audit_pv_url_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pageviewrollup',
+            index=models.Index(fields=['url', 'date'], name='audit_rollup_url_date_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pageviewrollup',
+            unique_together={('date', 'user', 'url')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.0.5 on 2026-10-17 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_pageview_indexes_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageviewRollupDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('last_pk', models.PositiveIntegerField()),
+            ],
+        ),
+    ]
@@ -1,13 +1,32 @@
 from __future__ import unicode_literals
+import datetime
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
 from django.conf import settings
+from django.utils.timezone import localdate, now, make_aware
 
 from osler.core import models as core_models
 
 
+def start_of_day(day):
+    '''The aware datetime of midnight at the start of day, so that ranges
+    of days can filter on the (indexed) timestamp column directly.'''
+    return make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
 class PageviewRecord(models.Model):
 
+    class Meta(object):
+        indexes = [
+            models.Index(fields=['timestamp'], name='audit_pv_ts_idx'),
+            models.Index(fields=['user', 'timestamp'],
+                         name='audit_pv_user_ts_idx'),
+            models.Index(fields=['url', 'timestamp'],
+                         name='audit_pv_url_ts_idx'),
+        ]
+
     HTTP_METHODS = ['GET', 'POST', 'HEAD', 'PUT', 'PATCH', 'DELETE',
                     'CONNECT', 'OPTIONS', 'TRACE']
 
@@ -31,8 +50,134 @@ class PageviewRecord(models.Model):
 
     status_code = models.PositiveSmallIntegerField()
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # not auto_now_add, so that records written in batches by the buffered
+    # audit sink keep the time of the request rather than of the write.
+    timestamp = models.DateTimeField(default=now)
 
     def __str__(self):
         return '%s by %s to %s at %s' % (self.method, self.user, self.url,
                                          self.timestamp)
+
+
+class PageviewRollupManager(models.Manager):
+
+    def add_counts(self, records):
+        '''Add the daily per-user, per-url counts of the PageviewRecord
+        queryset records to the rollups, with one aggregate query. Returns
+        the number of rollup rows written.'''
+
+        day_counts = records \
+            .annotate(date=TruncDate('timestamp')) \
+            .values('date', 'user', 'url') \
+            .annotate(count=Count('pk')) \
+            .order_by()
+        day_counts = {(row['date'], row['user'], row['url']): row['count']
+                      for row in day_counts}
+
+        if not day_counts:
+            return 0
+
+        dates = [date for date, _, _ in day_counts]
+        existing = self.get_queryset().filter(
+            date__gte=min(dates), date__lte=max(dates))
+
+        updated = []
+        for rollup in existing:
+            key = (rollup.date, rollup.user_id, rollup.url)
+            if key in day_counts:
+                rollup.count += day_counts.pop(key)
+                updated.append(rollup)
+
+        created = [self.model(date=date, user_id=user_id, url=url,
+                              count=count)
+                   for (date, user_id, url), count in day_counts.items()]
+
+        with transaction.atomic():
+            self.bulk_update(updated, ['count'])
+            self.bulk_create(created)
+
+        return len(updated) + len(created)
+
+    def roll_up_day(self, day):
+        '''Add the PageviewRecords of day that haven't been counted yet to
+        the rollups. The last record counted is remembered, so this is
+        safe to run again, e.g. once late records have arrived. Returns the
+        number of records counted.'''
+
+        with transaction.atomic():
+            PageviewRollupDay.objects.bulk_create(
+                [PageviewRollupDay(date=day, last_pk=0)],
+                ignore_conflicts=True)
+            rolled_up = PageviewRollupDay.objects.select_for_update() \
+                .get(date=day)
+
+            records = PageviewRecord.objects.filter(
+                timestamp__gte=start_of_day(day),
+                timestamp__lt=start_of_day(day + datetime.timedelta(days=1)),
+                pk__gt=rolled_up.last_pk)
+            new = records.aggregate(last=Max('pk'), count=Count('pk'))
+            if new['last'] is None:
+                return 0
+
+            self.add_counts(records.filter(pk__lte=new['last']))
+            rolled_up.last_pk = new['last']
+            rolled_up.save()
+
+        return new['count']
+
+    def roll_up(self, today=None):
+        '''Roll up each day before today (by default, the current date)
+        with PageviewRecords written since the last roll up. Returns the
+        number of records counted.'''
+
+        if today is None:
+            today = localdate()
+
+        last_pk = PageviewRollupDay.objects.aggregate(
+            last=Max('last_pk'))['last'] or 0
+        days = PageviewRecord.objects \
+            .filter(pk__gt=last_pk, timestamp__lt=start_of_day(today)) \
+            .annotate(date=TruncDate('timestamp')) \
+            .values_list('date', flat=True) \
+            .distinct() \
+            .order_by('date')
+
+        return sum(self.roll_up_day(day) for day in list(days))
+
+
+class PageviewRollup(models.Model):
+    '''Daily count of pageviews per user and url. Each completed day is
+    rolled up by the rollup_pageviews command; records that arrive after
+    their day was rolled up are counted when they're archived (see
+    audit.archive). Rollups are kept.'''
+
+    class Meta(object):
+        unique_together = [('date', 'user', 'url')]
+        indexes = [models.Index(fields=['url', 'date'],
+                                name='audit_rollup_url_date_idx')]
+
+    date = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        blank=True, null=True,
+        on_delete=models.DO_NOTHING
+    )
+    url = models.URLField(max_length=256)
+    count = models.PositiveIntegerField()
+
+    objects = PageviewRollupManager()
+
+    def __str__(self):
+        return '%s views by %s of %s on %s' % (self.count, self.user,
+                                               self.url, self.date)
+
+
+class PageviewRollupDay(models.Model):
+    '''A day whose PageviewRecords have been added to the PageviewRollups,
+    up to and including the record with pk last_pk.'''
+
+    date = models.DateField(unique=True)
+    last_pk = models.PositiveIntegerField()
+
+    def __str__(self):
+        return '%s rolled up to %s' % (self.date, self.last_pk)
@@ -0,0 +1,316 @@
+'''Destinations for the PageviewRecords produced by AuditMiddleware.
+
+The synchronous sink writes each record inside the response path, which is
+the strictest mode. The buffered sink queues records in-process and writes
+them in batches with bulk_create; records that can't be written (e.g. the
+database is unreachable) are spooled to a local file and can be replayed
+with the replay_audit_spool management command.
+
+Each process appends to its own spool file, under an exclusive lock. To
+replay a file, it is first claimed by renaming it, so that the process
+spooling to it starts a new file, and then read under the same lock, so
+that no record being appended as it was claimed is missed. Records that
+still can't be saved (e.g. a user they refer to has been deleted) are
+moved to a dead-letter file, DEAD_LETTER_FILE, rather than being retried
+on every replay.
+'''
+from __future__ import unicode_literals
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where spool files aren't locked
+    fcntl = None
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
+from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+SPOOL_GLOB = 'pageviews-*.jsonl'
+# spool files claimed by replay_spool, kept until their records are saved
+CLAIMED_GLOB = 'replaying-*.jsonl'
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+
+
+def get_pageview_model():
+    return apps.get_app_config('audit').get_model(
+        model_name='PageviewRecord')
+
+
+class AuditSink(object):
+    '''Base class for audit sinks. Records are passed as keyword
+    arguments matching the fields of PageviewRecord (using user_id and
+    role_id for the foreign keys).'''
+
+    def record(self, **fields):
+        raise NotImplementedError(
+            "All AuditSinks must implement record().")
+
+    def flush(self):
+        '''Write out any pending records. Returns the number written.'''
+        return 0
+
+
+class SynchronousSink(AuditSink):
+    '''Write every record to the database immediately.'''
+
+    def record(self, **fields):
+        get_pageview_model().objects.create(**fields)
+
+
+class BufferedSink(AuditSink):
+    '''Queue records in memory, writing them with bulk_create once
+    buffer_size records are queued or flush_interval seconds have passed.
+
+    A daemon thread flushes on the time threshold even if no requests come
+    in, and the buffer is flushed when the interpreter exits. If spool_dir
+    is set, records that fail to write are appended there instead of being
+    lost.
+    '''
+
+    def __init__(self, buffer_size=50, flush_interval=5, spool_dir=None,
+                 start_thread=True):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+
+        atexit.register(self.flush)
+
+        if start_thread and flush_interval:
+            self._thread = threading.Thread(
+                target=self._flush_periodically, name='audit-flush',
+                daemon=True)
+            self._thread.start()
+
+    def record(self, **fields):
+        with self._lock:
+            self._buffer.append(fields)
+            buffer_full = len(self._buffer) >= self.buffer_size
+
+        if buffer_full:
+            self.flush()
+
+    def pending(self):
+        '''The number of records waiting to be written.'''
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+
+        if not records:
+            return 0
+
+        PageviewRecord = get_pageview_model()
+        try:
+            PageviewRecord.objects.bulk_create(
+                [PageviewRecord(**r) for r in records])
+        except DatabaseError:
+            logger.exception("Failed to write %s audit records.",
+                             len(records))
+            self.spool(records)
+            return 0
+
+        return len(records)
+
+    def spool(self, records):
+        '''Append records to this process's spool file, if spooling is
+        configured.'''
+
+        if self.spool_dir is None:
+            logger.error("No OSLER_AUDIT_SPOOL_DIR; dropping %s audit "
+                         "records.", len(records))
+            return
+
+        path = os.path.join(self.spool_dir, 'pageviews-%s.jsonl' % os.getpid())
+        with open_locked(path) as spool_file:
+            append_records(spool_file, records)
+
+    def stop(self):
+        self._stop.set()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                continue
+            close_old_connections()
+            self.flush()
+
+
+def lock(spool_file):
+    if fcntl is not None:
+        fcntl.flock(spool_file, fcntl.LOCK_EX)
+
+
+def open_locked(path):
+    '''Open the spool file at path for appending, with an exclusive lock
+    (released when it's closed).'''
+
+    while True:
+        spool_file = open(path, 'a')
+        lock(spool_file)
+        # the file may have been claimed by replay_spool before it was
+        # locked, in which case records go in a new file
+        try:
+            if os.path.samestat(os.fstat(spool_file.fileno()),
+                                os.stat(path)):
+                return spool_file
+        except FileNotFoundError:
+            pass
+        spool_file.close()
+
+
+def append_records(spool_file, records):
+    for r in records:
+        spool_file.write(json.dumps(r, default=str) + '\n')
+    spool_file.flush()
+    os.fsync(spool_file.fileno())
+
+
+def read_records(spool_file):
+    '''The PageviewRecords of a spool file, and the lines that couldn't
+    be read as records.'''
+
+    PageviewRecord = get_pageview_model()
+
+    records, unreadable = [], []
+    for line in spool_file:
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+            fields['timestamp'] = parse_datetime(fields['timestamp'])
+            records.append(PageviewRecord(**fields))
+        except (ValueError, TypeError, KeyError):
+            unreadable.append(line)
+    return records, unreadable
+
+
+def save_records(records):
+    '''Save records, one at a time if they can't all be saved together.
+    Returns the records that couldn't be saved.'''
+
+    PageviewRecord = get_pageview_model()
+
+    try:
+        with transaction.atomic():
+            PageviewRecord.objects.bulk_create(records)
+        return []
+    except IntegrityError:
+        pass
+
+    failed = []
+    for record in records:
+        try:
+            with transaction.atomic():
+                record.save()
+        except IntegrityError:
+            failed.append(record)
+    return failed
+
+
+def record_fields(record):
+    return {f.attname: getattr(record, f.attname)
+            for f in record._meta.concrete_fields if not f.primary_key}
+
+
+def claim_spool_files(spool_dir):
+    '''Rename the spool files in spool_dir, so that they are no longer
+    appended to, and return the paths of all claimed files (including
+    those claimed by earlier replays that didn't finish).'''
+
+    for path in glob.glob(os.path.join(spool_dir, SPOOL_GLOB)):
+        claimed = os.path.join(spool_dir, 'replaying-%s-%s.jsonl' % (
+            os.path.basename(path)[:-len('.jsonl')], uuid.uuid4().hex))
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            # claimed by another replay
+            pass
+
+    return sorted(glob.glob(os.path.join(spool_dir, CLAIMED_GLOB)))
+
+
+def replay_spool(spool_dir):
+    '''Write all spooled records in spool_dir to the database, deleting
+    each spool file once its records are saved or moved to the dead-letter
+    file. Returns the number of records written.'''
+
+    n_written = 0
+    for path in claim_spool_files(spool_dir):
+        with open(path) as spool_file:
+            # wait for any record being appended as the file was claimed
+            lock(spool_file)
+            records, unreadable = read_records(spool_file)
+
+        failed = save_records(records)
+        if failed or unreadable:
+            logger.error("Moving %s audit records that can't be saved "
+                         "to %s.", len(failed) + len(unreadable),
+                         DEAD_LETTER_FILE)
+            with open_locked(os.path.join(spool_dir,
+                                          DEAD_LETTER_FILE)) as dead:
+                append_records(dead, [record_fields(r) for r in failed])
+                dead.writelines(unreadable)
+                dead.flush()
+                os.fsync(dead.fileno())
+
+        os.remove(path)
+        n_written += len(records) - len(failed)
+
+    return n_written
+
+
+_sink = None
+
+
+def get_sink():
+    '''Return the process-wide sink configured by OSLER_AUDIT_MODE, which
+    is either 'synchronous' or 'buffered'.'''
+    global _sink
+
+    if _sink is None:
+        mode = settings.OSLER_AUDIT_MODE
+        if mode == 'synchronous':
+            _sink = SynchronousSink()
+        elif mode == 'buffered':
+            _sink = BufferedSink(
+                buffer_size=settings.OSLER_AUDIT_BUFFER_SIZE,
+                flush_interval=settings.OSLER_AUDIT_FLUSH_INTERVAL,
+                spool_dir=settings.OSLER_AUDIT_SPOOL_DIR)
+        else:
+            raise ValueError("Unknown OSLER_AUDIT_MODE '%s'" % mode)
+
+    return _sink
+
+
+@receiver(setting_changed)
+def reset_sink(setting, **kwargs):
+    '''Rebuild the sink when audit settings are overridden (in tests).'''
+    global _sink
+
+    if setting.startswith('OSLER_AUDIT_') and _sink is not None:
+        _sink.flush()
+        if isinstance(_sink, BufferedSink):
+            _sink.stop()
+        _sink = None
@@ -0,0 +1,27 @@
+from __future__ import unicode_literals
+
+from django.utils.dateparse import parse_date
+
+from osler.audit.archive import archive_month, months_before
+from osler.audit.models import PageviewRollup
+from osler.audit.sinks import replay_spool
+from osler.jobs.queue import task
+
+
+# not retried, since a failed run may have written some months' archives
+@task('audit.archive_pageviews', max_attempts=1)
+def archive_pageviews(archive_dir, cutoff):
+    '''Archive the PageviewRecords of the months before cutoff, an ISO
+    date.'''
+    for month in months_before(parse_date(cutoff)):
+        archive_month(month, archive_dir)
+
+
+@task('audit.rollup_pageviews')
+def rollup_pageviews():
+    PageviewRollup.objects.roll_up()
+
+
+@task('audit.replay_spool')
+def replay_audit_spool(spool_dir):
+    replay_spool(spool_dir)
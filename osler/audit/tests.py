@@ -1,13 +1,28 @@
 from __future__ import unicode_literals
 from builtins import str
+from builtins import range
+from io import StringIO
+from unittest import mock
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
 from django.test import TestCase, override_settings, Client
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.utils.timezone import localdate, now
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from osler.core.models import ProviderType
 from osler.core.tests.test_views import build_provider, log_in_provider
 
-from .models import PageviewRecord
+from .models import PageviewRecord, PageviewRollup, start_of_day
+from . import sinks
+from .sinks import BufferedSink, get_sink
 
 
 class TestAudit(TestCase):
@@ -98,3 +113,206 @@ class TestAudit(TestCase):
 
         n_records = PageviewRecord.objects.count()
         self.assertEqual(n_records, 0)
+
+
+class TestBufferedSink(TestCase):
+
+    fixtures = ['core.json']
+
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.sink = BufferedSink(buffer_size=3, flush_interval=None,
+                                 spool_dir=self.spool_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def record(self, n=1):
+        for i in range(n):
+            self.sink.record(
+                user_id=None,
+                role_id=ProviderType.objects.first().pk,
+                user_ip='128.0.0.1',
+                method='GET',
+                url=reverse('home'),
+                referrer=None,
+                status_code=200,
+                timestamp=now())
+
+    def test_flush_on_buffer_size(self):
+        self.record(2)
+        self.assertEqual(PageviewRecord.objects.count(), 0)
+        self.assertEqual(self.sink.pending(), 2)
+
+        self.record()
+        self.assertEqual(PageviewRecord.objects.count(), 3)
+        self.assertEqual(self.sink.pending(), 0)
+
+    def test_explicit_flush(self):
+        self.record()
+        self.assertEqual(self.sink.flush(), 1)
+        self.assertEqual(PageviewRecord.objects.count(), 1)
+
+    def test_spool_and_replay(self):
+        self.record(2)
+
+        with mock.patch.object(PageviewRecord.objects, 'bulk_create',
+                               side_effect=DatabaseError):
+            self.assertEqual(self.sink.flush(), 0)
+
+        self.assertEqual(PageviewRecord.objects.count(), 0)
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+
+        call_command('replay_audit_spool', spool_dir=self.spool_dir,
+                     stdout=StringIO())
+
+        self.assertEqual(PageviewRecord.objects.count(), 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def spool(self, n=1, **fields):
+        record = dict(
+            user_id=None,
+            role_id=ProviderType.objects.first().pk,
+            user_ip='128.0.0.1',
+            method='GET',
+            url=reverse('home'),
+            referrer=None,
+            status_code=200,
+            timestamp=now())
+        record.update(fields)
+        self.sink.spool([record] * n)
+
+    def test_records_spooled_during_replay(self):
+        self.spool(2)
+        claimed = sinks.claim_spool_files(self.spool_dir)
+        self.assertEqual(len(claimed), 1)
+
+        # the process spooling to the claimed file starts a new one
+        self.spool()
+        self.assertEqual(len(os.listdir(self.spool_dir)), 2)
+
+        # and both files are replayed, including the one already claimed
+        self.assertEqual(sinks.replay_spool(self.spool_dir), 3)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_dead_letters(self):
+        self.spool(2)
+        self.spool(status_code=None)
+        path = os.path.join(self.spool_dir, os.listdir(self.spool_dir)[0])
+        with open(path, 'a') as spool_file:
+            spool_file.write('{"truncated\n')
+
+        self.assertEqual(sinks.replay_spool(self.spool_dir), 2)
+        self.assertEqual(os.listdir(self.spool_dir),
+                         [sinks.DEAD_LETTER_FILE])
+        dead_letter = os.path.join(self.spool_dir, sinks.DEAD_LETTER_FILE)
+        with open(dead_letter) as dead:
+            lines = dead.readlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIsNone(json.loads(lines[0])['status_code'])
+
+        # dead letters aren't retried
+        self.assertEqual(sinks.replay_spool(self.spool_dir), 0)
+        self.assertEqual(PageviewRecord.objects.count(), 2)
+
+    @override_settings(OSLER_AUDIT_MODE='buffered',
+                       OSLER_AUDIT_FLUSH_INTERVAL=None)
+    def test_middleware_buffers(self):
+        log_in_provider(self.client, build_provider(["Attending"]))
+        self.client.get(reverse('home'))
+
+        self.assertEqual(PageviewRecord.objects.count(), 0)
+        get_sink().flush()
+        self.assertEqual(PageviewRecord.objects.count(), 1)
+        self.assertEqual(PageviewRecord.objects.get().role.short_name,
+                         'Attending')
+
+
+class TestArchive(TestCase):
+
+    fixtures = ['core.json']
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.user = build_provider(["Attending"]).associated_user
+
+    def tearDown(self):
+        shutil.rmtree(self.archive_dir)
+
+    def record(self, timestamp, url='/'):
+        return PageviewRecord.objects.create(
+            user=self.user, user_ip='128.0.0.1', method='GET', url=url,
+            status_code=200, timestamp=timestamp)
+
+    def archive(self, months=2):
+        call_command('archive_pageviews', archive_dir=self.archive_dir,
+                     months=months, stdout=StringIO())
+
+    def roll_up(self):
+        call_command('rollup_pageviews', stdout=StringIO())
+
+    def test_archive_old_months(self):
+        old = now() - datetime.timedelta(days=100)
+        for i in range(3):
+            self.record(old)
+        self.record(old, url='/other/')
+        recent = self.record(now())
+
+        self.archive()
+
+        self.assertEqual(list(PageviewRecord.objects.all()), [recent])
+
+        rollup = PageviewRollup.objects.get(url='/')
+        self.assertEqual(rollup.count, 3)
+        self.assertEqual(rollup.user, self.user)
+        self.assertEqual(PageviewRollup.objects.get(url='/other/').count, 1)
+
+        files = os.listdir(self.archive_dir)
+        self.assertEqual(len(files), 1)
+        with gzip.open(os.path.join(self.archive_dir, files[0]), 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['user_id'], self.user.pk)
+
+    def test_late_records_add_to_rollups(self):
+        old = now() - datetime.timedelta(days=100)
+        self.record(old)
+        self.archive()
+
+        self.record(old)
+        self.archive()
+
+        self.assertEqual(PageviewRecord.objects.count(), 0)
+        self.assertEqual(PageviewRollup.objects.get().count, 2)
+        self.assertEqual(len(os.listdir(self.archive_dir)), 2)
+
+    def test_rollup_completed_days(self):
+        yesterday = localdate() - datetime.timedelta(days=1)
+        for i in range(2):
+            self.record(start_of_day(yesterday) + datetime.timedelta(hours=9))
+        self.record(now())
+
+        self.roll_up()
+        rollup = PageviewRollup.objects.get()
+        self.assertEqual((rollup.date, rollup.count), (yesterday, 2))
+
+        # running again counts only records that arrived since
+        self.roll_up()
+        self.assertEqual(PageviewRollup.objects.get().count, 2)
+        self.record(start_of_day(yesterday) + datetime.timedelta(hours=10))
+        self.roll_up()
+        self.assertEqual(PageviewRollup.objects.get().count, 3)
+
+        self.assertEqual(PageviewRecord.objects.count(), 4)
+
+    def test_archive_counts_records_not_rolled_up(self):
+        old = now() - datetime.timedelta(days=100)
+        self.record(old)
+        self.record(old)
+        self.roll_up()
+        self.record(old)
+
+        self.archive()
+
+        self.assertEqual(PageviewRecord.objects.count(), 0)
+        self.assertEqual(PageviewRollup.objects.get().count, 3)
@@ -0,0 +1,180 @@
+'''The filters of the patient list (PtList), by the name given in its
+filter parameter.
+
+Each filter narrows a queryset of patients in the database, so that
+however the list is filtered it stays one lazy queryset, which is
+paginated with a cursor and sorted by the database.
+
+The action item filters look at the open items of every todo model (see
+OSLER_TODO_LIST_MANAGERS) through correlated subqueries, one per model,
+each served by the (patient, completion_author, due_date) index of
+CompletableMixin. Those that list patients by urgency annotate
+soonest_due_date, the due date of the patient's soonest matching item
+of any model, and are sorted by it.
+
+Filters compose: given several names, separated by commas, PtList lists
+the patients that match all of them, e.g. 'user_cases,ai_active' for the
+patients a provider manages that have overdue items.
+'''
+from __future__ import unicode_literals
+from functools import reduce
+import datetime
+import operator
+
+from django.db.models import DateField, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils.timezone import now
+
+from osler.core.models import todo_models
+from osler.workup.models import Workup
+
+# stands in for the soonest due date of patients with no matching items,
+# since NULLs are ignored by LEAST on some databases but not on others
+NO_DUE_DATE = datetime.date.max
+
+
+class PatientFilter(object):
+    '''A filter of the patient list: filter_func(queryset, user) narrows
+    a queryset of patients, and ordering is how the patients it lists
+    are sorted when no sort is asked for.'''
+
+    def __init__(self, filter_func, ordering=None):
+        self.filter_func = filter_func
+        self.ordering = ordering
+
+    def __call__(self, queryset, user):
+        return self.filter_func(queryset, user)
+
+
+def open_items(model, **filters):
+    '''The open items of a todo model matching filters, of the patient of
+    the outer query.'''
+
+    return model.objects.filter(patient=OuterRef('pk'),
+                                completion_author=None,
+                                **filters)
+
+
+def has_open_items(queryset, **filters):
+    '''The patients with an open item matching filters of any todo model
+    that has the fields filtered on.'''
+
+    field_names = {lookup.split('__')[0] for lookup in filters}
+    exists = [Q(Exists(open_items(model, **filters)))
+              for model in todo_models()
+              if field_names <= {f.name for f in model._meta.fields}]
+
+    return queryset.filter(reduce(operator.or_, exists))
+
+
+def soonest_due_date(**filters):
+    '''An expression for the soonest due date of a patient's open items
+    matching filters, of every todo model, or NO_DUE_DATE if there are
+    none.'''
+
+    dates = [
+        Coalesce(Subquery(open_items(model, **filters)
+                          .order_by('due_date')
+                          .values('due_date')[:1]),
+                 Value(NO_DUE_DATE),
+                 output_field=DateField())
+        for model in todo_models()]
+
+    if len(dates) == 1:
+        return dates[0]
+    return Least(*dates, output_field=DateField())
+
+
+def with_soonest_due_date(queryset, **filters):
+    '''The patients with an open item matching filters, annotated with
+    soonest_due_date.'''
+
+    return queryset \
+        .annotate(soonest_due_date=soonest_due_date(**filters)) \
+        .filter(soonest_due_date__lt=NO_DUE_DATE)
+
+
+def all_patients(queryset, user):
+    return queryset
+
+
+def active_patients(queryset, user):
+    '''Patients listed as active. This is used to display a subset of
+    patients for volunteers giving care on a particular clinic day (to
+    hide the giant list of pts).'''
+
+    return queryset.filter(needs_workup=True)
+
+
+def active_ai_patients(queryset, user):
+    '''Patients with overdue action items.'''
+
+    return with_soonest_due_date(queryset, due_date__lte=now().date())
+
+
+def inactive_ai_patients(queryset, user):
+    '''Patients with action items due in the future.'''
+
+    return with_soonest_due_date(queryset, due_date__gt=now().date())
+
+
+def priority_ai_patients(queryset, user):
+    '''Patients with a high priority action item, whenever it is due.'''
+
+    return has_open_items(queryset, priority=True)
+
+
+def unsigned_workup_patients(queryset, user):
+    '''Patients with an unsigned workup, each listed once however many
+    they have.'''
+
+    return queryset.filter(Exists(
+        Workup.objects.filter(patient=OuterRef('pk'), signer=None)))
+
+
+def user_cases(queryset, user):
+    '''Patients that user is the case manager for.'''
+
+    return queryset.filter(case_managers=user.provider)
+
+
+BY_SOONEST_DUE_DATE = ('soonest_due_date', 'pk')
+
+PATIENT_FILTERS = {
+    None: PatientFilter(all_patients),
+    'active': PatientFilter(active_patients),
+    'ai_active': PatientFilter(active_ai_patients, BY_SOONEST_DUE_DATE),
+    'ai_inactive': PatientFilter(inactive_ai_patients, BY_SOONEST_DUE_DATE),
+    'ai_priority': PatientFilter(priority_ai_patients),
+    'unsigned_workup': PatientFilter(unsigned_workup_patients),
+    'user_cases': PatientFilter(user_cases),
+}
+
+FILTER_SEPARATOR = ','
+
+
+def get_filters(names):
+    '''The filters named by names, a string of filter names separated by
+    FILTER_SEPARATOR, or None for all patients. Raises KeyError with the
+    first unknown name.'''
+
+    if names is None:
+        return [PATIENT_FILTERS[None]]
+
+    return [PATIENT_FILTERS[name.strip()]
+            for name in names.split(FILTER_SEPARATOR) if name.strip()]
+
+
+def apply_filters(filters, queryset, user):
+    for patient_filter in filters:
+        queryset = patient_filter(queryset, user)
+    return queryset
+
+
+def default_ordering(filters):
+    '''The ordering of the first of filters that has one, if any.'''
+
+    for patient_filter in filters:
+        if patient_filter.ordering is not None:
+            return patient_filter.ordering
+    return None
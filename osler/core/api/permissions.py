@@ -0,0 +1,22 @@
+from __future__ import unicode_literals
+
+from rest_framework import permissions
+
+
+class IsStaffProvider(permissions.BasePermission):
+    '''Allows providers acting in a role with staff_view: the role chosen
+    for their session, or, for clients without one (e.g. authenticated
+    by token), any of their roles.'''
+
+    message = "Only staff may see this."
+
+    def has_permission(self, request, view):
+        provider = getattr(request.user, 'provider', None)
+        if provider is None:
+            return False
+
+        roles = provider.clinical_roles.filter(staff_view=True)
+        role_pk = getattr(request, 'session', {}).get('clintype_pk')
+        if role_pk is not None:
+            roles = roles.filter(pk=role_pk)
+        return roles.exists()
@@ -0,0 +1,36 @@
+'''A compact JSON renderer for the API's large responses, e.g. pages of
+the patient list.
+
+With orjson installed (it's optional), responses are encoded by orjson,
+which is several times faster than the standard library's json.
+Otherwise they're encoded as by DRF's JSONRenderer, which is already
+compact unless indentation is asked for.
+'''
+from __future__ import unicode_literals
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class CompactJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super(CompactJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type,
+                           renderer_context or {}) is not None:
+            option = orjson.OPT_INDENT_2
+        else:
+            option = 0
+
+        # orjson encodes what JSONEncoder does but for lazy strings,
+        # decimals and the like, which it passes to the encoder
+        return orjson.dumps(data, default=JSONEncoder().default,
+                            option=option)
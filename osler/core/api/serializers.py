@@ -1,6 +1,21 @@
+from django.urls import reverse
+from django.utils.timezone import now
 from rest_framework import serializers
+
 from osler.core import models
 from osler.workup.api.serializers import WorkupSerializer
+from osler.workup.models import Workup
+
+# named sets of the fields of a patient, chosen with PtList's profile
+# parameter; None is every field
+FIELD_PROFILES = {
+    'full': None,
+    # what the patient list table shows
+    'list': ['id', 'pk', 'name', 'age', 'gender', 'case_managers',
+             'latest_workup', 'history', 'status', 'needs_workup',
+             'detail_url', 'update_url', 'activate_url'],
+    'minimal': ['pk', 'name', 'detail_url'],
+}
 
 
 class LastHistorySerializer(serializers.Serializer):
@@ -8,7 +23,17 @@ class LastHistorySerializer(serializers.Serializer):
 
 
 class HistorySerializer(serializers.Serializer):
-    last = LastHistorySerializer()
+    '''Serializes a patient annotated by HistoryQuerySet.with_history_dates
+    in the shape of its history manager, i.e. with history.last being
+    the patient\'s oldest historical record.'''
+
+    last = serializers.SerializerMethodField()
+
+    def get_last(self, patient):
+        if patient.first_history_date is None:
+            return None
+        return LastHistorySerializer(
+            {'history_date': patient.first_history_date}).data
 
 
 class CaseManagerSerializer(serializers.ModelSerializer):
@@ -24,7 +49,7 @@ class PatientSerializer(serializers.ModelSerializer):
         model = models.Patient
         exclude = []
 
-    history = HistorySerializer()
+    history = HistorySerializer(source='*')
     latest_workup = WorkupSerializer()
     gender = serializers.StringRelatedField(read_only=True)
     age = serializers.StringRelatedField(read_only=True)
@@ -37,3 +62,235 @@ class PatientSerializer(serializers.ModelSerializer):
     detail_url = serializers.StringRelatedField(read_only=True)
     update_url = serializers.StringRelatedField(read_only=True)
     activate_url = serializers.StringRelatedField(read_only=True)
+
+    def __init__(self, *args, **kwargs):
+        '''Takes an optional fields argument, a list of the names of the
+        fields to include. Other fields are neither computed nor output.'''
+
+        fields = kwargs.pop('fields', None)
+        super(PatientSerializer, self).__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class URLTemplate(object):
+    '''A URL taking one pk, reversed once and then filled in for each
+    row, since reversing is slow next to everything else a row needs.'''
+
+    PLACEHOLDER = '2147483647'
+
+    def __init__(self, viewname):
+        self.prefix, self.suffix = reverse(
+            viewname, args=(self.PLACEHOLDER,)).split(self.PLACEHOLDER)
+
+    def format(self, pk):
+        return '%s%s%s' % (self.prefix, pk, self.suffix)
+
+
+class PatientRowListSerializer(serializers.ListSerializer):
+    '''Reads what the rows of a page need from other tables (workups,
+    case managers, languages and ethnicities) with one query per table
+    for the whole page, then serializes each row.'''
+
+    def to_representation(self, data):
+        rows = list(data)
+        self.child.read_related([row['pk'] for row in rows])
+        return [self.child.to_representation(row) for row in rows]
+
+
+class PatientRowSerializer(serializers.BaseSerializer):
+    '''A read-only PatientSerializer for patients read as rows of
+    Patient.objects.with_history_dates().values(*columns(fields)) rather
+    than as model instances. Its output is the same as
+    PatientSerializer\'s, but it makes a fixed number of queries per
+    page, where PatientSerializer makes several per patient, and skips
+    DRF\'s field machinery.
+
+    Like PatientSerializer, it takes an optional fields argument, a list
+    of the names of the fields to include.
+    '''
+
+    class Meta(object):
+        list_serializer_class = PatientRowListSerializer
+
+    # the columns read for each field that isn't a Patient column
+    COLUMNS = {
+        'pk': [],
+        'name': ['first_name', 'last_name', 'middle_name'],
+        'age': ['date_of_birth'],
+        'status': ['status_summary__as_of', 'status_summary__n_done',
+                   'status_summary__open_due_dates'],
+        'history': ['first_history_date'],
+        'detail_url': [],
+        'update_url': [],
+        'activate_url': [],
+        'latest_workup': [],
+    }
+
+    URLS = {
+        'detail_url': 'core:patient-detail',
+        'update_url': 'core:patient-update',
+        'activate_url': 'core:patient-activate-home',
+    }
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super(PatientRowSerializer, self).__init__(*args, **kwargs)
+
+        self.field_names = [f for f in self.all_field_names()
+                            if fields is None or f in fields]
+        self.urls = {name: URLTemplate(viewname)
+                     for name, viewname in self.URLS.items()
+                     if name in self.field_names}
+        self.workup_url = URLTemplate('workup')
+        self.datetime_field = serializers.DateTimeField()
+        self.today = now().date()
+        self.related = {}
+
+    @classmethod
+    def all_field_names(cls):
+        return ([f.name for f in models.Patient._meta.concrete_fields] +
+                [f.name for f in models.Patient._meta.many_to_many] +
+                list(cls.COLUMNS))
+
+    @classmethod
+    def columns(cls, fields=None):
+        '''The names to pass to values() for fields, by default all.'''
+
+        columns = ['pk']
+        for field in models.Patient._meta.concrete_fields:
+            if fields is None or field.name in fields:
+                columns.append(field.attname)
+        for name, field_columns in cls.COLUMNS.items():
+            if fields is None or name in fields:
+                columns.extend(field_columns)
+
+        return list(dict.fromkeys(columns))
+
+    def read_related(self, pks):
+        '''Read the fields held in other tables for the patients pks.'''
+
+        if 'latest_workup' in self.field_names:
+            # the workup on the earliest clinic day, as
+            # Patient.latest_workup gives
+            workups = {}
+            for workup in Workup.objects \
+                    .filter(patient__in=pks) \
+                    .order_by('patient', 'clinic_day__clinic_date', 'pk') \
+                    .values('patient', 'pk', 'chief_complaint',
+                            'clinic_day', 'clinic_day__clinic_type',
+                            'clinic_day__clinic_date', 'signer',
+                            'signer__first_name', 'signer__last_name',
+                            'signer__middle_name'):
+                workups.setdefault(workup['patient'], workup)
+            self.related['latest_workup'] = workups
+
+        if 'case_managers' in self.field_names:
+            through = models.Patient.case_managers.through
+            case_managers = {pk: [] for pk in pks}
+            for patient_id, first, last, middle in through.objects \
+                    .filter(patient__in=pks) \
+                    .order_by('pk') \
+                    .values_list('patient', 'provider__first_name',
+                                 'provider__last_name',
+                                 'provider__middle_name'):
+                case_managers[patient_id].append(
+                    {'name': models.format_name(first, last, middle)})
+            self.related['case_managers'] = case_managers
+
+        for field in models.Patient._meta.many_to_many:
+            if field.name in self.field_names and field.name not in \
+                    self.related:
+                options = {pk: [] for pk in pks}
+                for patient_id, option in field.remote_field.through \
+                        .objects \
+                        .filter(**{field.m2m_field_name() + '__in': pks}) \
+                        .order_by('pk') \
+                        .values_list(field.m2m_field_name(),
+                                     field.m2m_reverse_field_name()):
+                    options[patient_id].append(option)
+                self.related[field.name] = options
+
+    def to_representation(self, row):
+        pk = row['pk']
+        out = {}
+
+        for name in self.field_names:
+            if name in self.related:
+                out[name] = self.related[name].get(pk)
+            elif name in self.urls:
+                out[name] = self.urls[name].format(pk)
+            else:
+                out[name] = getattr(self, 'get_' + name,
+                                    self.get_column)(name, row)
+
+        if 'latest_workup' in out:
+            out['latest_workup'] = self.latest_workup(out['latest_workup'])
+
+        return out
+
+    def get_column(self, name, row):
+        value = row[models.Patient._meta.get_field(name).attname]
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def get_pk(self, name, row):
+        return str(row['pk'])
+
+    def get_name(self, name, row):
+        return models.format_name(row['first_name'], row['last_name'],
+                                  row['middle_name'])
+
+    def get_age(self, name, row):
+        # as Patient.age
+        return str((self.today - row['date_of_birth']).days // 365)
+
+    def get_status(self, name, row):
+        if row['status_summary__as_of'] is None:
+            # as Patient.status, for patients predating their summary
+            return models.PatientStatusSummary.objects.refresh(
+                row['pk']).status()
+
+        return models.PatientStatusSummary.describe(
+            models.PatientStatusSummary.parse_due_dates(
+                row['status_summary__open_due_dates']),
+            row['status_summary__n_done'], self.today)
+
+    def get_history(self, name, row):
+        if row['first_history_date'] is None:
+            return {'last': None}
+        return {'last': {'history_date': self.datetime_field
+                         .to_representation(row['first_history_date'])}}
+
+    def latest_workup(self, workup):
+        if workup is None:
+            return None
+
+        if workup['signer'] is None:
+            signer = None
+        else:
+            signer = models.format_name(workup['signer__first_name'],
+                                        workup['signer__last_name'],
+                                        workup['signer__middle_name'])
+
+        return {
+            'chief_complaint': workup['chief_complaint'],
+            'clinic_day': {
+                'id': workup['clinic_day'],
+                'clinic_type': workup['clinic_day__clinic_type'],
+                'clinic_date': workup['clinic_day__clinic_date'].isoformat(),
+            },
+            'pk': workup['pk'],
+            'url': self.workup_url.format(workup['pk']),
+            'signer': signer,
+        }
+
+
+class TimelineEntrySerializer(serializers.ModelSerializer):
+    class Meta(object):
+        model = models.PatientTimelineEntry
+        fields = ['written_datetime', 'kind', 'short_text', 'author_name',
+                  'url']
@@ -1,190 +1,166 @@
 from __future__ import unicode_literals
 from builtins import str
-from functools import partial
+import datetime
 
-import django.utils.timezone
-from django.db.models import Min
+from django.db.models import OuterRef, Subquery, Value, DateField
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.decorators import method_decorator
 
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import BrowsableAPIRenderer
 
+from osler.core import conditional
 from osler.core import models as coremodels
 from osler.workup import models as workupmodels
-from referral import models as referrals
 
-from . import serializers
+from . import filters, renderers, serializers
 
 
-def active_patients_filter(qs):
-    '''Filter a queryset of patients for those that are listed as
-    active. This is used to display a subset of patients for voluneers
-    giving care on a particular clinic day (to hide the giant list of
-    pts).
+def annotate_latest_activity(qs):
+    '''Annotate a queryset of patients with latest_activity: the date of
+    their latest workup or, if they have none, the date they were first
+    entered.
     '''
 
-    return qs.filter(needs_workup__exact=True).order_by('last_name')
+    latest_workup_date = workupmodels.Workup.objects \
+        .filter(patient=OuterRef('pk')) \
+        .order_by('-clinic_day__clinic_date') \
+        .values('clinic_day__clinic_date')[:1]
 
+    return qs.annotate(latest_activity=Coalesce(
+        Subquery(latest_workup_date),
+        TruncDate(coremodels.history_subquery(
+            coremodels.Patient, 'history_date')),
+        # patients loaded without history (e.g. from fixtures) sort last
+        Value(datetime.date.min),
+        output_field=DateField()))
 
-def merge_pt_querysets_by_soonest_date(qs1, qs2):
-    '''Utility function to merge two patient querysets by the
-    soonest due date. Called by active_ai_patients_filter and
-    inactive_ai_patients_filter. Requires that inputs both
-    have soonest_due_date annotated.
-    '''
-
-    patient_dict = {p: p.soonest_due_date for p in qs1}
-
-    for p in qs2:
-        if p not in patient_dict:
-            patient_dict[p] = p.soonest_due_date
-        else:
-            patient_dict[p] = min(patient_dict[p], p.soonest_due_date)
-
-    out_list = [t[0] for t in sorted(
-        [(p, soonest_due_date) for p, soonest_due_date
-         in list(patient_dict.items())],
-        key=lambda x: x[1])
-    ]
-
-    return out_list
 
-
-def active_ai_patients_filter(qs):
-    '''Filter a queryset of patients for those that have overdue action
-    items.
+class PtListPagination(CursorPagination):
+    '''Cursor pagination in the order chosen by the view\'s sort
+    parameter.
     '''
 
-    ai_qs = coremodels.ActionItem.objects \
-        .filter(due_date__lte=django.utils.timezone.now().date()) \
-        .filter(completion_date=None) \
-        .select_related('patient')
-
-    pts_with_active_ais = coremodels.Patient.objects \
-        .filter(actionitem__in=ai_qs) \
-        .distinct().annotate(soonest_due_date=Min('actionitem__due_date'))
-
-    referral_qs = referrals.FollowupRequest.objects \
-        .filter(due_date__lte=django.utils.timezone.now().date()) \
-        .filter(completion_date=None) \
-        .select_related('patient')
-
-    pts_with_active_referrals = coremodels.Patient.objects \
-        .filter(followuprequest__in=referral_qs) \
-        .distinct().annotate(soonest_due_date=Min('followuprequest__due_date'))
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
 
-    out_list = merge_pt_querysets_by_soonest_date(
-        pts_with_active_ais, pts_with_active_referrals)
+    def get_ordering(self, request, queryset, view):
+        return view.get_ordering()
 
-    return out_list
 
-
-def inactive_ai_patients_filter(qs):
-    '''Build a queryset of patients for those that have active action
-    items due in the future.
+class PtList(generics.ListAPIView):  # read only
     '''
-
-    future_ai_pts = coremodels.Patient.objects.filter(
-        actionitem__in=coremodels.ActionItem.objects
-            .filter(due_date__gt=django.utils.timezone.now().date())
-            .filter(completion_date=None)
-            .select_related('patient')
-    ).annotate(soonest_due_date=Min('actionitem__due_date'))
-
-    future_referral_pts = coremodels.Patient.objects.filter(
-        followuprequest__in=referrals.FollowupRequest.objects
-            .filter(due_date__gt=django.utils.timezone.now().date())
-            .filter(completion_date=None)
-            .select_related('patient')
-    ).annotate(soonest_due_date=Min('followuprequest__due_date'))
-
-    out_list = merge_pt_querysets_by_soonest_date(
-        future_ai_pts, future_referral_pts)
-
-    return out_list
-
-
-def unsigned_workup_patients_filter(qs):
-    '''Build a queryset that returs a list of patients with an unsigned
-    workup.
+    List patients, a page at a time.
+
+    Query parameters:
+    - filter: the name of a filter in filters.PATIENT_FILTERS, or several
+      separated by commas for the patients matching all of them
+    - sort: 'latest_workup' (most recent activity first) or a Patient field
+      name, optionally prefixed with '-'. Defaults to the filter's
+      ordering (soonest due date first for the action item filters), or
+      else to last name.
+    - profile: the name of a set of fields to return, from
+      serializers.FIELD_PROFILES, e.g. 'list' for those the patient list
+      shows. Defaults to all fields.
+    - fields: comma-separated names of the fields to return, e.g.
+      'pk,name,status', instead of a profile.
+    - page_size, cursor: see PtListPagination
+
+    Conditional GETs are answered with 304 Not Modified while no patient's
+    chart has changed (see core.conditional).
+
+    Patients are read as rows of values rather than model instances, and
+    serialized by PatientRowSerializer, so a page takes a fixed number of
+    queries however many patients it lists.
     '''
 
-    wu_qs = workupmodels.Workup.objects \
-        .filter(signer__isnull=True) \
-        .order_by('last_name') \
-        .select_related('patient')  # optimization only
+    serializer_class = serializers.PatientRowSerializer
+    pagination_class = PtListPagination
+    renderer_classes = [renderers.CompactJSONRenderer, BrowsableAPIRenderer]
 
-    return coremodels.Patient.objects.filter(workup__in=wu_qs)
+    @method_decorator(conditional.conditional_page)
+    def get(self, request, *args, **kwargs):
+        return super(PtList, self).get(request, *args, **kwargs)
 
+    def get_ordering(self):
+        '''The ordering requested by the sort parameter, ending in a unique
+        field so that pages are stable.'''
 
-def priority_ai_patients_filter(qs):
-    '''Build a queryset that returs a list of patients with a high priority
-    action item.
-    '''
+        sort = self.request.query_params.get('sort', None)
 
-    priority_ai_pts = coremodels.Patient.objects.filter(
-        actionitem__in=coremodels.ActionItem.objects
-        .filter(priority=True)
-        .filter(completion_date=None)
-        .select_related('patient')
-    ).distinct()
+        if sort is None:
+            return (filters.default_ordering(self.get_filters()) or
+                    ('last_name', 'pk'))
+        if str(sort) == 'latest_workup':
+            return ('-latest_activity', '-pk')
+
+        field_names = [f.name for f in coremodels.Patient._meta.concrete_fields]
+        if sort.lstrip('-') not in field_names:
+            raise ValidationError({'sort': "Unknown sort '%s'." % sort})
+
+        return (sort, 'pk')
+
+    def get_filters(self):
+        names = self.request.query_params.get('filter', None)
+        try:
+            return filters.get_filters(names)
+        except KeyError as e:
+            raise ValidationError(
+                {'filter': "Unknown filter '%s'." % e.args[0]})
+
+    def get_fields(self):
+        fields = self.request.query_params.get('fields', None)
+        if fields is not None:
+            return [f for f in fields.split(',') if f]
+
+        profile = self.request.query_params.get('profile', 'full')
+        if profile not in serializers.FIELD_PROFILES:
+            raise ValidationError({'profile': "Unknown profile '%s'." %
+                                   profile})
+        return serializers.FIELD_PROFILES[profile]
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super(PtList, self).get_serializer(*args, **kwargs)
 
-    return priority_ai_pts
+    def get_queryset(self):
+        '''
+        Restricts returned patients according to query params
+        '''
 
+        queryset = filters.apply_filters(
+            self.get_filters(),
+            coremodels.Patient.objects.with_history_dates(),
+            self.request.user)
 
-def user_cases(user, qs):
-    '''Build a queryset of the pateints that this user is the case
-    manager for
-    '''
+        ordering = self.get_ordering()
+        if 'latest_activity' in ordering[0]:
+            queryset = annotate_latest_activity(queryset)
 
-    qs = coremodels.Patient.objects.filter(
-        case_managers=user.provider
-    )
+        # the cursor is read from the rows, so they hold what they're
+        # ordered by
+        columns = self.get_serializer_class().columns(self.get_fields())
+        return queryset.values(*columns + [ordering[0].lstrip('-')])
 
-    return qs
 
+class TimelinePagination(CursorPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-written_datetime', '-pk')
 
-class PtList(generics.ListAPIView):  # read only
+
+class PatientTimeline(generics.ListAPIView):  # read only
     '''
-    List patients
+    List a patient's notes, most recent first, a page at a time. Each page
+    is one indexed query, however long the patient's chart.
     '''
-
-    serializer_class = serializers.PatientSerializer
+    serializer_class = serializers.TimelineEntrySerializer
+    pagination_class = TimelinePagination
 
     def get_queryset(self):
-        '''
-        Restricts returned patients according to query params
-        '''
-
-        filter_funcs = {
-            None: lambda x: x,
-            'active': active_patients_filter,
-            'ai_active': active_ai_patients_filter,
-            'ai_inactive': inactive_ai_patients_filter,
-            'unsigned_workup': unsigned_workup_patients_filter,
-            'user_cases': partial(user_cases, self.request.user),
-            'ai_priority': priority_ai_patients_filter
-        }
-
-        # This doesn't sort by latest time, just latest date
-        def bylatestKey(pt):
-            latestwu = pt.latest_workup()
-            if latestwu is None:
-                latestdate = pt.history.last().history_date.date()
-            else:
-                latestdate = latestwu.clinic_day.clinic_date
-            return latestdate
-
-        queryset = coremodels.Patient.objects
-        sort = self.request.query_params.get('sort', None)
-        filter_name = self.request.query_params.get('filter', None)
-
-        if sort is not None:
-            if str(sort) == 'latest_workup':
-                pt_list_latest = list(coremodels.Patient.objects.all())
-                pt_list_latest.sort(key=bylatestKey, reverse=True)
-                queryset = pt_list_latest
-            else:
-                queryset = queryset.order_by(sort)
-
-        queryset = filter_funcs[filter_name](queryset)
-
-        return queryset
+        return coremodels.PatientTimelineEntry.objects.filter(
+            patient=self.kwargs['pk'])
@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class CoreConfig(AppConfig):
     name = "osler.core"
     verbose_name = _("Core")
+
+    def ready(self):
+        import osler.core.signals  # noqa F401
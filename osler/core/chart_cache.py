@@ -0,0 +1,97 @@
+'''A cache of the rendered sections of patient charts (see
+views.patient_detail).
+
+Fragments are stored in the default cache under a per-patient version,
+which signals in osler.core.signals replace whenever one of the patient's
+notes (workups, action items, referrals, appointments, ...) is saved or
+deleted, so stale fragments are never read and simply expire.
+
+Hits and misses of each section are counted in the cache too, so that they
+are shared by all processes; see the chart_cache_stats command.
+'''
+from __future__ import unicode_literals
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+SECTIONS = ['referrals', 'notes', 'action_items', 'appointments']
+
+
+def version_key(patient_id):
+    return 'osler:chart:%s:version' % patient_id
+
+
+def counter_key(section, outcome):
+    return 'osler:chart-stats:%s:%s' % (section, outcome)
+
+
+def invalidate(patient_id):
+    '''Make all cached sections of a patient's chart stale.'''
+    cache.set(version_key(patient_id), uuid.uuid4().hex, None)
+
+
+def invalidate_on_commit(patient_id):
+    '''Make a patient's cached sections stale when their notes change:
+    at once, for the rest of the current transaction, and again when it
+    commits, since other requests may render (and cache, under the new
+    version) the chart as it was before the commit until then.'''
+    invalidate(patient_id)
+    transaction.on_commit(lambda: invalidate(patient_id))
+
+
+def count(section, outcome):
+    key = counter_key(section, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # evicted between add and incr; losing a count is harmless
+        pass
+
+
+def fragment(patient_id, section, variant, render):
+    '''The section of a patient's chart rendered by render(), a function
+    returning HTML, from the cache if possible. variant distinguishes
+    renderings of the section that depend on more than the patient's
+    notes (e.g. the date, or whether staff controls are shown).'''
+
+    if not settings.OSLER_CHART_CACHE_ENABLED:
+        return render()
+
+    version = cache.get(version_key(patient_id))
+    if version is None:
+        invalidate(patient_id)
+        version = cache.get(version_key(patient_id))
+        if version is None:
+            # the cache is unavailable
+            return render()
+
+    key = 'osler:chart:%s:%s:%s:%s' % (patient_id, version, section, variant)
+    html = cache.get(key)
+    if html is not None:
+        count(section, 'hits')
+        return html
+
+    count(section, 'misses')
+    html = render()
+    cache.set(key, html, settings.OSLER_CHART_CACHE_TIMEOUT)
+
+    return html
+
+
+def stats():
+    '''A dict of the (hits, misses) of each section.'''
+    counts = cache.get_many([counter_key(section, outcome)
+                             for section in SECTIONS
+                             for outcome in ['hits', 'misses']])
+    return {section: (counts.get(counter_key(section, 'hits'), 0),
+                      counts.get(counter_key(section, 'misses'), 0))
+            for section in SECTIONS}
+
+
+def reset_stats():
+    cache.delete_many([counter_key(section, outcome)
+                       for section in SECTIONS
+                       for outcome in ['hits', 'misses']])
@@ -0,0 +1,74 @@
+'''Conditional GET for the pages that clinic laptops reload all night (a
+patient's chart, the list of all patients, and the patient list API):
+when nothing they show has changed since the browser last loaded them,
+they're answered with 304 Not Modified without being rendered.
+
+Whether anything has changed is read from PatientChangeMark, one row per
+patient recording when their chart last changed: a chart is current as
+long as its patient's mark is, and lists of patients as long as the
+latest mark of all is. Both drive the ETag and Last-Modified headers of
+Django's condition decorator.
+
+Pages also depend on the date (e.g. how many days items are overdue), so
+they're taken to change at midnight too, and on who is asking and in
+which role, which are part of the ETag. Requests with messages waiting
+to be shown always get the full page, so that the messages are shown.
+'''
+from __future__ import unicode_literals
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.timezone import localtime
+from django.views.decorators.http import condition
+
+from osler.core.models import PatientChangeMark
+
+
+def change_mark(request, pk=None):
+    '''When the charts shown by request last changed: the patient pk's
+    chart, or with no pk, any chart. Read once per request.'''
+
+    if not hasattr(request, '_osler_change_mark'):
+        request._osler_change_mark = \
+            PatientChangeMark.objects.last_changed(pk)
+    return request._osler_change_mark
+
+
+def last_modified(request, pk=None):
+    if not settings.OSLER_CONDITIONAL_GET_ENABLED or \
+            len(get_messages(request)):
+        return None
+
+    mark = change_mark(request, pk)
+    if mark is None:
+        return None
+
+    midnight = localtime().replace(hour=0, minute=0, second=0,
+                                   microsecond=0)
+    return max(mark, midnight)
+
+
+def etag(request, pk=None):
+    modified = last_modified(request, pk)
+    if modified is None:
+        return None
+
+    # API clients authenticated by token have no session
+    session = getattr(request, 'session', {})
+    parts = [
+        modified.isoformat(),
+        request.get_full_path(),
+        request.user.pk,
+        getattr(session, 'session_key', None),
+        session.get('clintype_pk'),
+        session.get('staff_view'),
+    ]
+    return hashlib.sha1(
+        ':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def conditional_page(view):
+    '''Answer conditional GETs of view, a view of the patient pk's chart
+    or, if it takes no pk, of all patients.'''
+    return condition(etag_func=etag, last_modified_func=last_modified)(view)
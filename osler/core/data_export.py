@@ -0,0 +1,221 @@
+'''Streaming exports of clinical records as CSV or JSON lines, for
+research and QA.
+
+Each dataset is one model, exported with one column per concrete field
+(foreign keys as ids; many-to-many fields are left out). Rows are read
+with QuerySet.iterator() and written as they are read, so an export of
+any size runs in constant memory.
+
+With deidentify, the export follows HIPAA's Safe Harbor method: direct
+identifiers (names, contact details, addresses), all free-text fields
+and the ids of clinic days (which give away dates of service) are
+dropped, zip codes are cut to their first three digits, and every date
+and time to its year, with the birth years of patients over 89 put
+together as one year. Patient and provider ids are replaced by keyed
+pseudonyms, which are the same in every export made with the same key,
+so deidentified datasets can still be joined on patient or provider.
+'''
+from __future__ import unicode_literals
+from functools import partial
+import csv
+import datetime
+import decimal
+import hashlib
+import hmac
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+
+def zip3(value):
+    return value[:3] if value else value
+
+
+def year(value):
+    return value.year if value else value
+
+
+# patients older than this are all given the same birth year
+OLDEST_AGE = 89
+
+
+def birth_year(value):
+    '''The year of a date of birth, or for patients over OLDEST_AGE, the
+    latest year they could have been born in.'''
+    if not value:
+        return value
+    return max(value.year, datetime.date.today().year - OLDEST_AGE - 1)
+
+
+class Dataset(object):
+
+    def __init__(self, model, identifiers=(), transforms=None):
+        self.model_label = model
+        self.identifiers = set(identifiers)
+        self.transforms = transforms or {}
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def pseudonymized_columns(self):
+        '''The columns holding ids that are pseudonymized, by column, with
+        the kind of id they hold.'''
+        columns = {}
+        if self.model._meta.label_lower in PSEUDONYMIZED:
+            columns['id'] = PSEUDONYMIZED[self.model._meta.label_lower]
+        for field in self.model._meta.concrete_fields:
+            if field.is_relation and \
+                    field.related_model._meta.label_lower in PSEUDONYMIZED:
+                columns[field.attname] = PSEUDONYMIZED[
+                    field.related_model._meta.label_lower]
+        return columns
+
+    def is_identifier(self, field):
+        return (field.name in self.identifiers or
+                isinstance(field, models.TextField) or
+                (field.is_relation and
+                 field.related_model._meta.label_lower in DROPPED_RELATIONS))
+
+    def columns(self, deidentify=False):
+        columns = []
+        for field in self.model._meta.concrete_fields:
+            if deidentify and self.is_identifier(field):
+                continue
+            columns.append(field.attname)
+        return columns
+
+    def deidentifying_transforms(self, columns, key=None):
+        '''(index, transform) for each of columns that is changed when
+        deidentifying.'''
+
+        fields = {f.attname: f for f in self.model._meta.concrete_fields}
+        pseudonymized = self.pseudonymized_columns()
+
+        transforms = []
+        for i, column in enumerate(columns):
+            if column in self.transforms:
+                transforms.append((i, self.transforms[column]))
+            elif column in pseudonymized:
+                transforms.append((i, partial(
+                    pseudonym, key=key, kind=pseudonymized[column])))
+            elif isinstance(fields[column], models.DateField):
+                # includes DateTimeField
+                transforms.append((i, year))
+        return transforms
+
+
+# the ids replaced by pseudonyms, by model, with the kind of id they are
+PSEUDONYMIZED = {
+    'core.patient': 'patient',
+    'core.provider': 'provider',
+}
+# models that foreign keys to are dropped, since their ids identify dates
+DROPPED_RELATIONS = {'workup.clinicdate'}
+
+
+PERSON_IDENTIFIERS = ['first_name', 'last_name', 'middle_name', 'phone']
+
+DATASETS = {
+    'patients': Dataset(
+        'core.Patient',
+        identifiers=PERSON_IDENTIFIERS + [
+            'address', 'city', 'email',
+            'alternate_phone_1_owner', 'alternate_phone_1',
+            'alternate_phone_2_owner', 'alternate_phone_2',
+            'alternate_phone_3_owner', 'alternate_phone_3',
+            'alternate_phone_4_owner', 'alternate_phone_4'],
+        transforms={'zip_code': zip3, 'pcp_preferred_zip': zip3,
+                    'date_of_birth': birth_year}),
+    'demographics': Dataset('demographics.Demographics'),
+    'workups': Dataset('workup.Workup',
+                       identifiers=['chief_complaint', 'diagnosis']),
+    'referrals': Dataset('referral.Referral'),
+    'patient_contacts': Dataset('referral.PatientContact'),
+    'vaccine_series': Dataset('vaccine.VaccineSeries'),
+    'vaccine_doses': Dataset('vaccine.VaccineDose'),
+}
+
+FORMATS = ['csv', 'jsonl']
+
+
+def pseudonym(pk, key=None, kind='patient'):
+    '''A stable, unguessable stand-in for the id of a patient (or of
+    another kind of record).'''
+    if pk is None:
+        return None
+    key = (key or settings.SECRET_KEY).encode('utf-8')
+    return hmac.new(key, ('%s:%d' % (kind, pk)).encode('utf-8'),
+                    hashlib.sha256).hexdigest()[:16]
+
+
+def to_text(value):
+    '''Values as they're written to the export.'''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, datetime.timedelta)):
+        return str(value)
+    return value
+
+
+def rows(dataset, deidentify=False, key=None, chunk_size=None):
+    '''Generate the header and then each row of a dataset.'''
+
+    if chunk_size is None:
+        chunk_size = settings.OSLER_EXPORT_CHUNK_SIZE
+
+    columns = dataset.columns(deidentify)
+    yield columns
+
+    transforms = []
+    if deidentify:
+        transforms = dataset.deidentifying_transforms(columns, key)
+
+    for row in dataset.model.objects \
+            .order_by('pk') \
+            .values_list(*columns) \
+            .iterator(chunk_size=chunk_size):
+        row = list(row)
+        for i, transform in transforms:
+            row[i] = transform(row[i])
+        yield [to_text(value) for value in row]
+
+
+class _Echo(object):
+    '''A file whose write returns what is written, so that csv.writer
+    produces lines instead of writing them.'''
+
+    def write(self, value):
+        return value
+
+
+def stream(dataset, format='csv', deidentify=False, key=None,
+           chunk_size=None):
+    '''Generate the text of an export of a dataset, a chunk of rows at a
+    time.'''
+
+    if chunk_size is None:
+        chunk_size = settings.OSLER_EXPORT_CHUNK_SIZE
+
+    dataset_rows = rows(dataset, deidentify, key, chunk_size)
+
+    if format == 'csv':
+        writer = csv.writer(_Echo())
+        lines = (writer.writerow(row) for row in dataset_rows)
+    elif format == 'jsonl':
+        columns = next(dataset_rows)
+        lines = (json.dumps(dict(zip(columns, row))) + '\n'
+                 for row in dataset_rows)
+    else:
+        raise ValueError("Unknown export format '%s'" % format)
+
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
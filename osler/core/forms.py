@@ -6,7 +6,8 @@ from builtins import range
 from builtins import object
 
 from django.forms import (Form, CharField, ModelForm, EmailField,
-                          CheckboxSelectMultiple, ModelMultipleChoiceField, CheckboxInput)
+                          CheckboxSelectMultiple, ModelMultipleChoiceField, CheckboxInput,
+                          BooleanField, FileField)
 from django.contrib.auth.forms import AuthenticationForm
 
 from crispy_forms.helper import FormHelper
@@ -38,6 +39,25 @@ class DuplicatePatientForm(Form):
         self.helper.add_input(Submit('submit', 'Submit'))
 
 
+class PatientImportForm(Form):
+    csv_file = FileField(
+        label='CSV file',
+        help_text="One patient per row, with a header row naming the "
+                  "columns (first_name, last_name, gender, date_of_birth, "
+                  "address, zip_code, languages, ethnicities, ...).")
+    allow_duplicates = BooleanField(
+        required=False,
+        help_text="Import rows even if they may be duplicate patients.")
+    dry_run = BooleanField(
+        required=False,
+        help_text="Check the rows without importing them.")
+
+    def __init__(self, *args, **kwargs):
+        super(PatientImportForm, self).__init__(*args, **kwargs)
+        self.helper = FormHelper(self)
+        self.helper.add_input(Submit('submit', 'Import'))
+
+
 class PatientForm(ModelForm):
     class Meta(object):
         model = models.Patient
@@ -1,28 +1,36 @@
 from __future__ import unicode_literals
-from django.core.management.base import BaseCommand, CommandError
-from django.core.mail import EmailMessage
-import django.utils.timezone
-from osler.core import models
+from django.core.management.base import BaseCommand
+
+from osler.core import notifications
+
 
 class Command(BaseCommand):
-	help = '''Sends email to case managers or author of the action item 
-	when action item is due...currently everyday?'''
+    help = '''Email each case manager a digest of their patients' overdue
+    action items, referral followups and vaccine action items. Case
+    managers are only emailed when an item is newly overdue or a reminder
+    is due (see OSLER_ACTION_ITEM_REMINDER_DAYS); run this daily.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Show who would be emailed, without sending or recording "
+                 "anything.")
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue each email as a background job instead of sending "
+                 "it now.")
 
-	def handle(self, *args, **options):
-		providerEmails = []
-		#all action items that are past due and incomplete
-		actionItemList = models.ActionItem.objects.filter(due_date__lte=django.utils.timezone.now().date()).filter(completion_date=None)
-		for actionItem in actionItemList:
-			try:
-				for coordinator in actionItem.patient.case_managers.all():
-					email = coordinator.associated_user.email
-					if email not in providerEmails:
-						providerEmails = providerEmails + [email]
-			except AttributeError:
-				pass
-		message = '''Hello Case Manager! You have an action item due. Please do it otherwise you will
-		 continue to be spammed. Thanks! If you are recieving this message but you really don't have
-		 an action item due, please contact your current Tech Tsar to relieve you of your misery.'''
-		email = EmailMessage('SNHC: Action Item Due', message, to=providerEmails)
-		email.send()
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for digest in notifications.build_digests():
+                self.stdout.write("%s: %s items, %s new" % (
+                    digest.provider.associated_user.email,
+                    len(digest.items), len(digest.new_items)))
+            return
 
+        if options['background']:
+            digests = notifications.send_digests(background=True)
+            self.stdout.write("Queued %s action item digests." % len(digests))
+        else:
+            digests = notifications.send_digests()
+            self.stdout.write("Sent %s action item digests." % len(digests))
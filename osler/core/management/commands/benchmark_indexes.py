@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from osler.core import query_plans
+from osler.core.models import Patient, Provider
+
+
+class Command(BaseCommand):
+    help = '''EXPLAIN the hot queries over notes and completables (a
+    patient's notes, their active, inactive and completed items, and the
+    clinic's open items) and report which plans read whole tables rather
+    than indexes. With --patients, synthetic patients are added first, in
+    a transaction that is rolled back, so that the planner sees a clinic
+    of that size; this can be run against a copy of a real database. Use
+    -v 2 to print the plans.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patients', type=int, default=0,
+            help="Number of synthetic patients to add before planning.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in query_plans.SEQUENTIAL_SCANS:
+            raise CommandError("Reading %s query plans isn't supported." %
+                               connection.vendor)
+
+        with transaction.atomic():
+            if options['patients']:
+                # synthetic.py is shared with the query-count benchmarks
+                from osler.core.tests.synthetic import seed_clinic
+
+                provider = Provider.objects.exclude(
+                    clinical_roles=None).first()
+                if provider is None:
+                    raise CommandError(
+                        "Synthetic patients need a provider with a role.")
+                seed_clinic(provider, options['patients'])
+
+            # give the planner current statistics
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            patient = Patient.objects.order_by('-pk').first()
+            if patient is None:
+                raise CommandError("There are no patients to plan queries "
+                                   "for; add some with --patients.")
+
+            reports = query_plans.plan_reports(patient)
+            transaction.set_rollback(True)
+
+        for report in reports:
+            if report.uses_indexes:
+                status = "index"
+            else:
+                status = "SEQ SCAN of %s" % ", ".join(
+                    report.sequential_scans)
+            if report.sorts:
+                status += ", sorted"
+            self.stdout.write("%s: %s" % (report.label, status))
+            if options['verbosity'] > 1:
+                for line in report.plan.splitlines():
+                    self.stdout.write("    " + line)
+
+        self.stdout.write("%s of %s hot queries read whole tables." % (
+            sum(not report.uses_indexes for report in reports),
+            len(reports)))
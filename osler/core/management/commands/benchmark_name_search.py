@@ -0,0 +1,69 @@
+import datetime
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from osler.core import utils
+from osler.core.models import Gender, Patient, PatientNameKey
+
+
+def random_name(rng):
+    return rng.choice(string.ascii_uppercase) + ''.join(
+        rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+class Command(BaseCommand):
+    help = '''Compare the indexed duplicate-patient search with the original
+    all_variations search on databases of synthetic patients. Patients are
+    created in a transaction that is rolled back, so this can be run
+    against a copy of a real database.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes', nargs='*', type=int,
+            default=[10000, 100000, 1000000],
+            help="Numbers of patients to benchmark with.")
+        parser.add_argument(
+            '--searches', type=int, default=20,
+            help="Number of searches to time at each size.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            gender, _ = Gender.objects.get_or_create(
+                long_name="Benchmark", short_name="b")
+
+            n_patients = 0
+            for size in sorted(options['sizes']):
+                last_pk = Patient.objects.aggregate(last=Max('pk'))['last']
+                Patient.objects.bulk_create(
+                    [Patient(first_name=random_name(rng),
+                             last_name=random_name(rng),
+                             gender=gender, address="", zip_code="00000",
+                             date_of_birth=datetime.date(1990, 1, 1))
+                     for _ in range(size - n_patients)],
+                    batch_size=1000)
+                n_patients = size
+                PatientNameKey.objects.rebuild(
+                    Patient.objects.filter(pk__gt=last_pk or 0))
+
+                searches = [(random_name(rng), random_name(rng))
+                            for _ in range(options['searches'])]
+
+                self.stdout.write("%s patients:" % size)
+                for search in [utils.return_duplicates_by_variations,
+                               utils.return_duplicates]:
+                    start = time.perf_counter()
+                    for first_name, last_name in searches:
+                        len(search(first_name, last_name))
+                    elapsed = (time.perf_counter() - start) / len(searches)
+                    self.stdout.write("  %s: %.1f ms per search" %
+                                      (search.__name__, elapsed * 1000))
+
+            transaction.set_rollback(True)
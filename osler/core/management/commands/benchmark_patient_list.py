@@ -0,0 +1,84 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from osler.core.api import renderers, serializers
+from osler.core.models import Patient, Provider
+
+
+class QueryCounter(object):
+    '''Counts queries, which, unlike CaptureQueriesContext, it can do past
+    the 9000 that Django logs.'''
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = '''Compare serializing and rendering the patient list with
+    PatientSerializer, from model instances, and with PatientRowSerializer
+    and CompactJSONRenderer, from rows of values, as the patient list API
+    does. Synthetic patients are added first, in a transaction that is
+    rolled back, so this can be run against a copy of a real database.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patients', type=int, default=5000,
+            help="Number of synthetic patients to add.")
+        parser.add_argument(
+            '--profile', default='list',
+            choices=sorted(serializers.FIELD_PROFILES),
+            help="The fields to serialize.")
+
+    def instances(self, fields):
+        queryset = Patient.objects.with_history_dates() \
+            .select_related('gender', 'status_summary') \
+            .prefetch_related('case_managers') \
+            .order_by('last_name', 'pk')
+        data = serializers.PatientSerializer(
+            queryset, many=True, fields=fields).data
+        return JSONRenderer().render(data)
+
+    def rows(self, fields):
+        queryset = Patient.objects.with_history_dates() \
+            .values(*serializers.PatientRowSerializer.columns(fields)) \
+            .order_by('last_name', 'pk')
+        data = serializers.PatientRowSerializer(
+            queryset, many=True, fields=fields).data
+        return renderers.CompactJSONRenderer().render(data)
+
+    def handle(self, *args, **options):
+        fields = serializers.FIELD_PROFILES[options['profile']]
+
+        with transaction.atomic():
+            if options['patients']:
+                # synthetic.py is shared with the query-count benchmarks
+                from osler.core.tests.synthetic import seed_clinic
+
+                provider = Provider.objects.exclude(
+                    clinical_roles=None).first()
+                if provider is None:
+                    raise CommandError(
+                        "Synthetic patients need a provider with a role.")
+                seed_clinic(provider, options['patients'])
+
+            self.stdout.write("%s patients, %s profile:" % (
+                Patient.objects.count(), options['profile']))
+            for serialize in [self.instances, self.rows]:
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    start = time.perf_counter()
+                    size = len(serialize(fields))
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    "  %s: %.0f ms, %s queries, %s bytes" % (
+                        serialize.__name__, elapsed * 1000, queries.count,
+                        size))
+
+            transaction.set_rollback(True)
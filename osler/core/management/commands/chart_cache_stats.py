@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from osler.core import chart_cache
+
+
+class Command(BaseCommand):
+    help = '''Show the hits and misses of each cached section of patient
+    charts since the counts were last reset.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help="Reset the counts after showing them.")
+
+    def handle(self, *args, **options):
+        for section, (hits, misses) in chart_cache.stats().items():
+            total = hits + misses
+            self.stdout.write("%s: %s hits, %s misses (%.0f%% hit rate)" % (
+                section, hits, misses, 100.0 * hits / total if total else 0))
+
+        if options['reset']:
+            chart_cache.reset_stats()
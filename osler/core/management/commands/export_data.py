@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from osler.core import data_export
+
+
+class Command(BaseCommand):
+    help = '''Write one dataset of clinical records (patients, workups,
+    referrals, ...) as CSV or JSON lines, reading and writing a chunk of
+    rows at a time. With --deidentify, identifiers and free text are
+    removed, dates are cut to the year, and patient and provider ids are
+    pseudonymized.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dataset', choices=sorted(data_export.DATASETS))
+        parser.add_argument(
+            '--format', choices=data_export.FORMATS, default='csv')
+        parser.add_argument(
+            '--deidentify', action='store_true',
+            help="Remove identifiers, cut dates to the year, and "
+                 "pseudonymize patient and provider ids.")
+        parser.add_argument(
+            '--key', default=None,
+            help="Key for pseudonyms. Exports with the same key can be "
+                 "joined on patient or provider; defaults to SECRET_KEY.")
+        parser.add_argument(
+            '--output', default=None,
+            help="File to write to. Defaults to stdout.")
+
+    def handle(self, *args, **options):
+        chunks = data_export.stream(
+            data_export.DATASETS[options['dataset']], options['format'],
+            options['deidentify'], options['key'])
+
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stdout.write("Exported %s to %s." % (
+            options['dataset'], options['output']))
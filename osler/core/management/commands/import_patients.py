@@ -0,0 +1,40 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from osler.core import patient_import
+
+
+class Command(BaseCommand):
+    help = '''Import patients from a CSV with a header row of Patient
+    fields, validating and writing them in batches. Rows with errors, or
+    whose names are like those of existing patients, are reported and
+    skipped.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Rows validated and written at a time. Defaults to "
+                 "OSLER_IMPORT_BATCH_SIZE.")
+        parser.add_argument(
+            '--allow-duplicates', action='store_true',
+            help="Import rows even if they may be duplicate patients.")
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Check the rows without importing them.")
+
+    def handle(self, *args, **options):
+        with open(options['csv_file'], newline='',
+                  encoding='utf-8-sig') as f:
+            try:
+                result = patient_import.import_patients(
+                    f, options['batch_size'], options['allow_duplicates'],
+                    options['dry_run'])
+            except ValidationError as e:
+                raise CommandError(e.messages[0])
+
+        for line in result.error_lines():
+            self.stderr.write(line)
+        self.stdout.write("%s %s patients; %s rows had errors." % (
+            "Would import" if options['dry_run'] else "Imported",
+            len(result.patients), len(result.errors)))
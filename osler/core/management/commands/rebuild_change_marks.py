@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from osler.core.models import PatientChangeMark
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the marks of when each patient's chart last changed,
+    which answer conditional GETs of charts and patient lists, from the
+    history and last_modified times of patients and their notes. Run
+    after migrating, or after charts are changed in bulk in a way that
+    bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = PatientChangeMark.objects.rebuild()
+        self.stdout.write("Rebuilt %s change marks." % n)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from osler.core.models import PatientNameKey
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the name keys used to search for duplicate patients.
+    Run after migrating, or after patient names are changed in bulk in a
+    way that bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = PatientNameKey.objects.rebuild()
+        self.stdout.write("Rebuilt name keys for %s patients." % n)
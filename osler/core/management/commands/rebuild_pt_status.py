@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from osler.core.models import PatientStatusSummary
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the denormalized status summary of every patient.
+    Run after migrating, or after completables are changed in bulk (e.g.
+    with queryset.update()) in a way that bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = PatientStatusSummary.objects.rebuild()
+        self.stdout.write("Rebuilt status summaries for %s patients." % n)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from osler.core.models import PatientTimelineEntry
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the patient timelines listed on patient charts. Run
+    after migrating, or after notes are changed in bulk in a way that
+    bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = PatientTimelineEntry.objects.rebuild()
+        self.stdout.write("Rebuilt %s timeline entries." % n)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from osler.core.models import PatientStatusSummary
+
+
+class Command(BaseCommand):
+    help = '''Move action items that came due since the last run from
+    pending to overdue in the patient status summaries. Run nightly.'''
+
+    def handle(self, *args, **options):
+        n = PatientStatusSummary.objects.rollover()
+        self.stdout.write("Rolled over status summaries for %s patients." % n)
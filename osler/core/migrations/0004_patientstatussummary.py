@@ -0,0 +1,27 @@
+# Generated by Django 3.0.5 on 2026-10-17 16:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20200612_1103'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientStatusSummary',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='status_summary', serialize=False, to='core.Patient')),
+                ('n_done', models.PositiveIntegerField(default=0)),
+                ('n_overdue', models.PositiveIntegerField(default=0)),
+                ('n_pending', models.PositiveIntegerField(default=0)),
+                ('soonest_due_date', models.DateField(blank=True, db_index=True, null=True)),
+                ('next_pending_due_date', models.DateField(blank=True, db_index=True, null=True)),
+                ('open_due_dates', models.TextField(blank=True, default='')),
+                ('as_of', models.DateField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.0.5 on 2026-10-17 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_patientstatussummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientNameKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=110)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_keys', to='core.Patient')),
+            ],
+        ),
+    ]
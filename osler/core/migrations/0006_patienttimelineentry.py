@@ -0,0 +1,40 @@
+# Generated by Django 3.0.5 on 2026-10-17 17:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0005_patientnamekey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientTimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('written_datetime', models.DateTimeField()),
+                ('kind', models.CharField(max_length=100)),
+                ('short_text', models.CharField(blank=True, max_length=200)),
+                ('author_name', models.CharField(max_length=200)),
+                ('url', models.CharField(blank=True, max_length=200)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='core.Patient')),
+            ],
+            options={
+                'ordering': ['-written_datetime', '-pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='patienttimelineentry',
+            index=models.Index(fields=['patient', '-written_datetime'], name='core_timeline_pt_written_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='patienttimelineentry',
+            unique_together={('content_type', 'object_id')},
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.5 on 2026-10-17 17:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0006_patienttimelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActionItemNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('last_sent', models.DateTimeField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Provider')),
+            ],
+            options={
+                'unique_together': {('provider', 'content_type', 'object_id')},
+            },
+        ),
+    ]
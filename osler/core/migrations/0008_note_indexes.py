@@ -0,0 +1,37 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_actionitemnotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['patient', '-written_datetime'], name='core_action_patient_193952_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='core_action_written_24553a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['patient', 'completion_author', 'due_date'], name='core_action_patient_e06c93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['completion_author', 'due_date'], name='core_action_complet_a756ca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['patient', '-written_datetime'], name='core_docume_patient_7cf178_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='core_docume_written_728d2d_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_note_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientChangeMark',
+            fields=[
+                ('patient_id', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('changed', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -2,13 +2,17 @@
 from __future__ import unicode_literals
 import os
 import uuid
+import datetime
 
 from builtins import str
 from builtins import range
 from builtins import object
-from itertools import chain
 
-from django.db import models
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models import Max, OuterRef, Subquery
 from django.conf import settings
 from django.utils.timezone import now
 from django.utils.text import slugify
@@ -16,7 +20,7 @@ from django.urls import reverse
 
 from simple_history.models import HistoricalRecords
 
-from osler.core import validators
+from osler.core import names, validators
 
 
 def make_filepath(instance, filename):
@@ -133,6 +137,59 @@ class Outcome(models.Model):
         return self.name
 
 
+def history_subquery(model, field, newest=False, outer_ref='pk'):
+    """A subquery of field of the oldest (or, if newest, the newest)
+    historical record of each row of an outer queryset of model. To
+    annotate a queryset of another model, give the field of that model
+    referring to model as outer_ref."""
+
+    history = model.history.model.objects \
+        .filter(**{model._meta.pk.attname: OuterRef(outer_ref)}) \
+        .order_by(('-' if newest else '') + 'history_date',
+                  ('-' if newest else '') + 'history_id')
+
+    return Subquery(history.values(field)[:1])
+
+
+class HistoryQuerySet(models.QuerySet):
+    """A QuerySet for models with simple-history HistoricalRecords."""
+
+    def with_history_dates(self):
+        """Annotate first_history_date (when each row was created),
+        last_history_date and last_history_user_id, with subqueries
+        rather than a query per row to model.history.
+
+        simple-history lists records newest first, so the
+        history.last.history_date used in templates is first_history_date.
+        """
+        return self.annotate(
+            first_history_date=history_subquery(
+                self.model, 'history_date'),
+            last_history_date=history_subquery(
+                self.model, 'history_date', newest=True),
+            last_history_user_id=history_subquery(
+                self.model, 'history_user', newest=True))
+
+
+def format_name(first_name, last_name, middle_name, reverse=True,
+                middle_short=True):
+    """A person's name as shown everywhere, e.g. "Doe, John Q."."""
+
+    if middle_name:
+        if middle_short:
+            middle = "".join([mname[0] + "." for mname
+                              in middle_name.split()])
+        else:
+            middle = middle_name
+    else:
+        middle = ""
+
+    if reverse:
+        return " ".join([last_name + ",", first_name, middle])
+    else:
+        return " ".join([first_name, middle, last_name])
+
+
 class Person(models.Model):
 
     class Meta(object):
@@ -154,23 +211,8 @@ class Person(models.Model):
     gender = models.ForeignKey(Gender, on_delete=models.PROTECT)
 
     def name(self, reverse=True, middle_short=True):
-        if self.middle_name:
-            if middle_short:
-                middle = "".join([mname[0] + "." for mname
-                                  in self.middle_name.split()])
-            else:
-                middle = self.middle_name
-        else:
-            middle = ""
-
-        if reverse:
-            return " ".join([self.last_name + ",",
-                             self.first_name,
-                             middle])
-        else:
-            return " ".join([self.first_name,
-                             middle,
-                             self.last_name])
+        return format_name(self.first_name, self.last_name, self.middle_name,
+                           reverse, middle_short)
 
 
 class Provider(Person):
@@ -186,6 +228,8 @@ class Provider(Person):
 
     history = HistoricalRecords()
 
+    objects = HistoryQuerySet.as_manager()
+
     @property
     def username(self):
         return self.associated_user.username
@@ -255,6 +299,8 @@ class Patient(Person):
 
     history = HistoricalRecords()
 
+    objects = HistoryQuerySet.as_manager()
+
     def age(self):
         return (now().date() - self.date_of_birth).days // 365
 
@@ -291,34 +337,20 @@ class Patient(Person):
             key=lambda ai: ai.due_date)
 
     def status(self):
-        # The active_action_items, done_action_items, and inactive_action_items
-        # aren't a big deal to use when getting just one patient
-        # For the all_patients page though (one of the pages that use status),
-        # hitting the db three times per patient adds up.
-        # Here, we only hit the db once by asking the db for all action items
-        # for a patient, then sorting them in memory.
-
-        # Combine action items with referral followup requests for status
-        patient_action_items = self.actionitem_set.all()
-        referral_followup_requests = self.followuprequest_set.all()
-        patient_action_items = list(chain(patient_action_items,
-                                          referral_followup_requests))
-
-        done = [ai for ai in patient_action_items if ai.completion_author is not None]
-        overdue = [ai for ai in patient_action_items if ai.completion_author is None and ai.due_date <= now().date()]
-        pending = [ai for ai in patient_action_items if ai.completion_author is None and ai.due_date > now().date()]
+        """A short description of the state of this patient's action
+        items, e.g. "Action items 3, 0 days past due".
 
-        if len(overdue) > 0:
-            due_dates = ", ".join([str((now().date()-ai.due_date).days) for ai in overdue])
-            return "Action items " + due_dates + " days past due"
-        elif len(pending) > 0:
-            next_item = min(pending, key=lambda k: k.due_date)
-            tdelta = next_item.due_date - now().date()
-            return "next action in "+str(tdelta.days)+" days"
-        elif len(done) > 0:
-            return "all actions complete"
-        else:
-            return "no pending actions"
+        This reads the denormalized PatientStatusSummary (one row, which
+        all_patients select_related()s) rather than every completable. If
+        the summary is missing, e.g. for patients predating it, it is
+        built on the spot.
+        """
+        try:
+            summary = self.status_summary
+        except PatientStatusSummary.DoesNotExist:
+            summary = PatientStatusSummary.objects.refresh(self)
+
+        return summary.status()
 
     def followup_set(self):
         followups = []
@@ -393,6 +425,15 @@ class Note(models.Model):
     class Meta(object):
         abstract = True
         ordering = ["-written_datetime", "-last_modified"]
+        # Subclasses declaring their own Meta should extend Note.Meta, or
+        # include these indexes, to keep them. They are named per model
+        # when the model is created.
+        indexes = [
+            # a patient's notes, newest first
+            models.Index(fields=['patient', '-written_datetime']),
+            # all notes in the default ordering
+            models.Index(fields=['-written_datetime', '-last_modified']),
+        ]
 
     author = models.ForeignKey(Provider, on_delete=models.PROTECT)
     author_type = models.ForeignKey(ProviderType, on_delete=models.PROTECT)
@@ -424,10 +465,78 @@ class Document(Note):
     def short_text(self):
         return self.title
 
+    def detail_url(self):
+        return reverse('core:document-detail', args=(self.pk,))
+
+
+def todo_models():
+    """The completable models listed on patients' todo lists, in the order
+    set by OSLER_TODO_LIST_MANAGERS."""
+    return [apps.get_model(app, model)
+            for app, model in settings.OSLER_TODO_LIST_MANAGERS]
+
+
+class TodoList(object):
+    """A patient's completables from every todo model, partitioned into
+    active (due), pending (due in the future) and done items."""
+
+    def __init__(self):
+        self.active = []
+        self.pending = []
+        self.done = []
+
+    def add(self, item, today):
+        if item.completion_author_id is not None:
+            self.done.append(item)
+        elif item.due_date <= today:
+            self.active.append(item)
+        else:
+            self.pending.append(item)
+
+    def __len__(self):
+        return len(self.active) + len(self.pending) + len(self.done)
+
+
+def todo_lists(patients, today=None):
+    """Build the TodoLists of many patients (a queryset or list of patients
+    or their pks) with one query per todo model. Returns a dict of
+    TodoLists keyed by patient pk; patients without completables have an
+    empty TodoList."""
+
+    if today is None:
+        today = now().date()
+
+    patient_ids = [getattr(pt, 'pk', pt) for pt in patients]
+    lists = {pk: TodoList() for pk in patient_ids}
+
+    for model in todo_models():
+        for item in model.objects.todo_items(patient__in=patient_ids):
+            lists[item.patient_id].add(item, today)
+
+    return lists
+
+
+def todo_list(patient, today=None):
+    """Build one patient's TodoList with one query per todo model."""
+    patient_id = getattr(patient, 'pk', patient)
+    return todo_lists([patient_id], today)[patient_id]
+
 
 class CompletableManager(models.Manager):
     """ Class that handles queryset filers for Completable classes."""
 
+    def todo_items(self, **filters):
+        """Completables matching filters, with the related objects shown on
+        todo lists selected, in the order they are listed."""
+
+        related = [f.name for f in self.model._meta.concrete_fields
+                   if f.is_relation]
+
+        return self.get_queryset()\
+            .filter(**filters)\
+            .select_related(*related)\
+            .order_by('completion_date', 'pk')
+
     def get_active(self, patient):
         """ Returns all active elements of Completable class."""
         return self.get_queryset()\
@@ -460,6 +569,13 @@ class CompletableMixin(models.Model):
 
     class Meta(object):
         abstract = True
+        indexes = [
+            # a patient's active, inactive or completed items
+            # (CompletableManager.get_active and co.)
+            models.Index(fields=['patient', 'completion_author', 'due_date']),
+            # every open item due by a date, clinic-wide
+            models.Index(fields=['completion_author', 'due_date']),
+        ]
 
     objects = CompletableManager()
 
@@ -507,6 +623,7 @@ class CompletableMixin(models.Model):
 class AbstractActionItem(Note, CompletableMixin):
     class Meta(object):
         abstract = True
+        indexes = Note.Meta.indexes + CompletableMixin.Meta.indexes
 
     instruction = models.ForeignKey(ActionInstruction,
                                     on_delete=models.PROTECT)
@@ -549,3 +666,476 @@ class ActionItem(AbstractActionItem):
     def __str__(self):
         return " ".join(["AI for", str(self.patient) + ":",
                          str(self.instruction), "due on", str(self.due_date)])
+
+
+class PatientStatusSummaryManager(models.Manager):
+    """Maintains the denormalized PatientStatusSummary rows."""
+
+    def refresh(self, patient):
+        """Recompute and store the summary for one patient (or patient pk).
+
+        Issues one query per completable model, regardless of how many
+        items the patient has accumulated.
+        """
+        patient_id = getattr(patient, 'pk', patient)
+
+        n_done = 0
+        open_due_dates = []
+        for model in todo_models():
+            items = model.objects \
+                .filter(patient=patient_id) \
+                .order_by('-written_datetime', '-last_modified') \
+                .values_list('due_date', 'completion_author')
+
+            for due_date, completion_author in items:
+                if completion_author is None:
+                    open_due_dates.append(due_date)
+                else:
+                    n_done += 1
+
+        summary = self.model(patient_id=patient_id, n_done=n_done)
+        summary.set_open_due_dates(open_due_dates)
+        summary.save()
+
+        return summary
+
+    def rebuild(self, patients=None):
+        """Recompute summaries for all patients (or a given queryset).
+        Returns the number of summaries written."""
+
+        if patients is None:
+            patients = Patient.objects.all()
+
+        count = 0
+        for patient_id in patients.values_list('pk', flat=True).iterator():
+            self.refresh(patient_id)
+            count += 1
+
+        return count
+
+    def rollover(self, today=None):
+        """Move items whose due date has arrived from pending to overdue.
+
+        Only touches summaries with a pending item due on or before today,
+        and recomputes them from the stored due dates, so no completable
+        tables are read. Returns the number of summaries updated.
+        """
+        if today is None:
+            today = now().date()
+
+        stale = self.get_queryset().filter(next_pending_due_date__lte=today)
+
+        count = 0
+        for summary in stale.iterator():
+            summary.set_open_due_dates(summary.open_due_date_list(), today)
+            summary.save()
+            count += 1
+
+        return count
+
+
+class PatientStatusSummary(models.Model):
+    """A materialized digest of a patient's completables (ActionItems,
+    FollowupRequests, etc.) used to render Patient.status() without
+    loading every item.
+
+    Rows are kept current by signals in osler.core.signals; the overdue
+    and pending counts are relative to as_of, and are rolled forward each
+    night by the rollover_pt_status command.
+    """
+
+    patient = models.OneToOneField(
+        Patient,
+        primary_key=True,
+        related_name='status_summary',
+        on_delete=models.CASCADE)
+
+    n_done = models.PositiveIntegerField(default=0)
+    n_overdue = models.PositiveIntegerField(default=0)
+    n_pending = models.PositiveIntegerField(default=0)
+
+    # soonest due date over all incomplete items, overdue or not
+    soonest_due_date = models.DateField(
+        blank=True, null=True, db_index=True)
+    # soonest due date of the items that were not yet overdue on as_of
+    next_pending_due_date = models.DateField(
+        blank=True, null=True, db_index=True)
+
+    # ISO-formatted due dates of all incomplete items, comma separated, in
+    # the order they are listed in the status text.
+    open_due_dates = models.TextField(blank=True, default="")
+
+    as_of = models.DateField()
+
+    objects = PatientStatusSummaryManager()
+
+    def __str__(self):
+        return "Status of %s as of %s" % (self.patient, self.as_of)
+
+    @staticmethod
+    def parse_due_dates(open_due_dates):
+        if not open_due_dates:
+            return []
+        return [datetime.date.fromisoformat(d)
+                for d in open_due_dates.split(',')]
+
+    def open_due_date_list(self):
+        return self.parse_due_dates(self.open_due_dates)
+
+    def set_open_due_dates(self, due_dates, today=None):
+        '''Store the due dates of the open items and recompute the counts
+        relative to today.'''
+        if today is None:
+            today = now().date()
+
+        overdue = [d for d in due_dates if d <= today]
+        pending = [d for d in due_dates if d > today]
+
+        self.open_due_dates = ",".join(d.isoformat() for d in due_dates)
+        self.n_overdue = len(overdue)
+        self.n_pending = len(pending)
+        self.soonest_due_date = min(due_dates) if due_dates else None
+        self.next_pending_due_date = min(pending) if pending else None
+        self.as_of = today
+
+    def status(self, today=None):
+        '''The status text shown for the patient. This is computed from
+        the stored due dates, so it is correct even if the nightly
+        rollover hasn't yet run.'''
+        return self.describe(self.open_due_date_list(), self.n_done, today)
+
+    @staticmethod
+    def describe(due_dates, n_done, today=None):
+        '''The status text of a patient with open items due_dates and
+        n_done completed items, without a PatientStatusSummary at hand.'''
+        if today is None:
+            today = now().date()
+
+        overdue = [d for d in due_dates if d <= today]
+        pending = [d for d in due_dates if d > today]
+
+        if len(overdue) > 0:
+            due_dates = ", ".join([str((today - d).days) for d in overdue])
+            return "Action items " + due_dates + " days past due"
+        elif len(pending) > 0:
+            tdelta = min(pending) - today
+            return "next action in " + str(tdelta.days) + " days"
+        elif n_done > 0:
+            return "all actions complete"
+        else:
+            return "no pending actions"
+
+
+class PatientNameKeyManager(models.Manager):
+    """Maintains the PatientNameKey rows and searches them."""
+
+    def keys_for(self, first_name, last_name):
+        return (names.first_name_keys(first_name) |
+                names.last_name_keys(last_name))
+
+    def refresh(self, patient):
+        """Bring one patient's keys up to date with their name. Only
+        writes if the name's keys have changed."""
+
+        keys = self.keys_for(patient.first_name, patient.last_name)
+        existing = set(self.get_queryset().filter(patient=patient.pk)
+                       .values_list('key', flat=True))
+
+        if keys != existing:
+            self.get_queryset().filter(
+                patient=patient.pk, key__in=existing - keys).delete()
+            self.bulk_create([self.model(patient_id=patient.pk, key=k)
+                              for k in keys - existing])
+
+    def rebuild(self, patients=None, batch_size=1000):
+        """Recompute the keys of all patients (or a given queryset).
+        Returns the number of patients indexed."""
+
+        if patients is None:
+            patients = Patient.objects.all()
+
+        self.get_queryset().filter(patient__in=patients).delete()
+
+        count = 0
+        batch = []
+        for pk, first_name, last_name in patients.values_list(
+                'pk', 'first_name', 'last_name').iterator():
+            batch.extend(self.model(patient_id=pk, key=k)
+                         for k in self.keys_for(first_name, last_name))
+            count += 1
+            if len(batch) >= batch_size:
+                self.bulk_create(batch)
+                batch = []
+
+        self.bulk_create(batch)
+
+        return count
+
+    def similar_patients(self, first_name, last_name, patients=None):
+        """Patients (from patients, by default all) whose first name is one
+        letter off of, or begins with, first_name and whose last name is
+        one letter off of, or sounds like, last_name. They are listed
+        closest name first.
+
+        Both names are matched by indexed lookups on the keys, in one
+        query.
+        """
+
+        if patients is None:
+            patients = Patient.objects.all()
+
+        first_matches = self.get_queryset() \
+            .filter(key__in=names.first_name_query_keys(first_name)) \
+            .values('patient')
+        last_matches = self.get_queryset() \
+            .filter(key__in=names.last_name_query_keys(last_name)) \
+            .values('patient')
+
+        matches = patients \
+            .filter(pk__in=first_matches) \
+            .filter(pk__in=last_matches)
+
+        return sorted(
+            matches,
+            key=lambda pt: (names.name_distance(first_name, last_name, pt),
+                            pt.last_name, pt.first_name))
+
+
+class PatientNameKey(models.Model):
+    """A key under which a patient's name is indexed for duplicate
+    searches (see osler.core.names). Each patient has a few dozen keys.
+
+    Rows are kept current by a signal in osler.core.signals.
+    """
+
+    patient = models.ForeignKey(
+        Patient,
+        related_name='name_keys',
+        on_delete=models.CASCADE)
+
+    key = models.CharField(max_length=110, db_index=True)
+
+    objects = PatientNameKeyManager()
+
+    def __str__(self):
+        return "%s: %s" % (self.patient_id, self.key)
+
+
+def timeline_models():
+    """The note models listed on patients' timelines, as set by
+    OSLER_TIMELINE_NOTES."""
+    return [apps.get_model(app, model)
+            for app, model in settings.OSLER_TIMELINE_NOTES]
+
+
+class PatientTimelineEntryManager(models.Manager):
+    """Maintains the PatientTimelineEntry rows."""
+
+    def entry_for(self, note, content_type=None):
+        """An unsaved entry describing note."""
+
+        if content_type is None:
+            content_type = ContentType.objects.get_for_model(note)
+
+        if hasattr(note, 'short_text'):
+            text = note.short_text() or ""
+        else:
+            text = str(note)
+        max_length = self.model._meta.get_field('short_text').max_length
+        if len(text) > max_length:
+            text = text[:max_length - 3] + "..."
+
+        return self.model(
+            patient_id=note.patient_id,
+            content_type=content_type,
+            object_id=note.pk,
+            written_datetime=note.written_datetime,
+            kind=note._meta.verbose_name.title(),
+            short_text=text,
+            author_name=note.author.name(),
+            url=note.detail_url() if hasattr(note, 'detail_url') else "")
+
+    def refresh(self, note):
+        """Create or update the entry for one note."""
+
+        entry = self.entry_for(note)
+        entry.pk = self.get_queryset() \
+            .filter(content_type=entry.content_type, object_id=note.pk) \
+            .values_list('pk', flat=True).first()
+        entry.save()
+
+        return entry
+
+    def forget(self, note):
+        """Delete the entry for a note that has been deleted."""
+        self.get_queryset().filter(
+            content_type=ContentType.objects.get_for_model(note),
+            object_id=note.pk).delete()
+
+    def rebuild(self, patients=None, batch_size=1000):
+        """Recreate the entries of all patients (or a given queryset).
+        Returns the number of entries written."""
+
+        if patients is None:
+            patients = Patient.objects.all()
+
+        self.get_queryset().filter(patient__in=patients).delete()
+
+        count = 0
+        for model in timeline_models():
+            content_type = ContentType.objects.get_for_model(model)
+            notes = model.objects \
+                .filter(patient__in=patients) \
+                .select_related('author') \
+                .order_by('pk')
+
+            batch = []
+            for note in notes.iterator():
+                batch.append(self.entry_for(note, content_type))
+                if len(batch) >= batch_size:
+                    count += len(self.bulk_create(batch))
+                    batch = []
+            count += len(self.bulk_create(batch))
+
+        return count
+
+
+class PatientTimelineEntry(models.Model):
+    """One note on a patient's chart, with what's needed to list it,
+    so that the chart can be listed a page at a time with one indexed
+    query however many notes a patient has accumulated.
+
+    Rows are kept current by signals in osler.core.signals for the models
+    in OSLER_TIMELINE_NOTES.
+    """
+
+    class Meta(object):
+        ordering = ['-written_datetime', '-pk']
+        unique_together = [('content_type', 'object_id')]
+        indexes = [
+            models.Index(fields=['patient', '-written_datetime'],
+                         name='core_timeline_pt_written_idx'),
+        ]
+
+    patient = models.ForeignKey(
+        Patient,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE)
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    note = GenericForeignKey('content_type', 'object_id')
+
+    written_datetime = models.DateTimeField()
+    kind = models.CharField(max_length=100)
+    short_text = models.CharField(max_length=200, blank=True)
+    author_name = models.CharField(max_length=200)
+    url = models.CharField(max_length=200, blank=True)
+
+    objects = PatientTimelineEntryManager()
+
+    def __str__(self):
+        return "%s for %s on %s" % (self.kind, self.patient_id,
+                                    self.written_datetime)
+
+
+class ActionItemNotification(models.Model):
+    """A record that a provider was emailed about an overdue completable
+    (see osler.core.notifications), so that they aren't emailed about it
+    again until it is due again or a reminder is due."""
+
+    class Meta(object):
+        unique_together = [('provider', 'content_type', 'object_id')]
+
+    provider = models.ForeignKey(Provider, on_delete=models.CASCADE)
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    item = GenericForeignKey('content_type', 'object_id')
+
+    # the item's due date when the provider was last notified
+    due_date = models.DateField()
+    last_sent = models.DateTimeField()
+
+    def __str__(self):
+        return "%s notified about %s %s on %s" % (
+            self.provider, self.content_type, self.object_id, self.last_sent)
+
+
+class PatientChangeMarkManager(models.Manager):
+    """Maintains the PatientChangeMark rows."""
+
+    def touch(self, patient_id, changed=None):
+        """Record that something on a patient's chart changed (by default,
+        now)."""
+        if changed is None:
+            changed = now()
+
+        if not self.get_queryset().filter(patient_id=patient_id) \
+                .update(changed=changed):
+            # a concurrent touch may have created the row meanwhile, and
+            # its time is as good as this one
+            self.bulk_create(
+                [self.model(patient_id=patient_id, changed=changed)],
+                ignore_conflicts=True)
+
+    def last_changed(self, patient_id=None):
+        """When a patient's chart, or with no patient, any chart, last
+        changed; None if that isn't known."""
+        if patient_id is None:
+            return self.get_queryset().aggregate(
+                last=Max('changed'))['last']
+        return self.get_queryset().filter(patient_id=patient_id) \
+            .values_list('changed', flat=True).first()
+
+    def rebuild(self):
+        """Recreate every mark from the patients' and notes' history and
+        last_modified times. Returns the number of marks written."""
+
+        sources = [(Patient.history.model, 'id', 'history_date')]
+        for model in apps.get_models():
+            if issubclass(model, Note):
+                sources.append((model, 'patient', 'last_modified'))
+                history = getattr(model, 'history', None)
+                if history is not None:
+                    # including the records of deleted notes
+                    sources.append((history.model, 'patient',
+                                    'history_date'))
+
+        marks = {}
+        for model, patient, changed in sources:
+            for patient_id, last in model.objects \
+                    .order_by() \
+                    .values_list(patient) \
+                    .annotate(last=Max(changed)):
+                if patient_id not in marks or last > marks[patient_id]:
+                    marks[patient_id] = last
+
+        with transaction.atomic():
+            self.get_queryset().delete()
+            self.bulk_create(
+                [self.model(patient_id=patient_id, changed=changed)
+                 for patient_id, changed in marks.items()],
+                batch_size=1000)
+
+        return len(marks)
+
+
+class PatientChangeMark(models.Model):
+    """When anything on a patient's chart (the patient, or any of their
+    notes, including action items, referrals and appointments) last
+    changed, so that pages showing charts can answer conditional GETs
+    without rendering them (see osler.core.conditional).
+
+    Rows are kept current by signals in osler.core.signals.
+    """
+
+    # not a foreign key, so that the mark of a deleted patient remains, and
+    # the latest mark of all never moves back in time
+    patient_id = models.PositiveIntegerField(primary_key=True)
+    changed = models.DateTimeField(db_index=True)
+
+    objects = PatientChangeMarkManager()
+
+    def __str__(self):
+        return "Patient %s changed at %s" % (self.patient_id, self.changed)
@@ -0,0 +1,127 @@
+'''Keys for finding patients with similar names, used to catch duplicate
+patients at intake.
+
+Names are normalized (accents stripped, lowercased, split into tokens on
+anything other than a letter) and each name is indexed under:
+
+- its one-letter deletions, other than of the first letter. Two names
+  share a deletion key exactly when one can be turned into the other by
+  adding, removing or changing one letter after the first, so looking
+  up a name's own deletion keys finds every such name with one indexed
+  IN query of len(name) keys.
+- for first names, its prefixes, so that abbreviations ("ben" for
+  "benjamin") match.
+- for last names, its Soundex code, so that names that sound alike
+  ("Meyer", "Maier") match.
+'''
+from __future__ import unicode_literals
+import re
+import unicodedata
+
+SOUNDEX_CODES = dict(
+    [(c, '1') for c in 'bfpv'] +
+    [(c, '2') for c in 'cgjkqsxz'] +
+    [(c, '3') for c in 'dt'] +
+    [('l', '4')] +
+    [(c, '5') for c in 'mn'] +
+    [('r', '6')])
+
+
+def name_tokens(name):
+    '''The normalized forms under which name is indexed: the whole name
+    with non-letters removed and, if it has several parts (e.g.
+    "Smith-Jones"), each of the parts.'''
+
+    if not name:
+        return []
+
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    parts = [p for p in re.split(r'[\W\d_]+', name.lower()) if p]
+
+    if len(parts) > 1:
+        return [''.join(parts)] + parts
+    return parts
+
+
+def deletions(token):
+    '''token and all of its one-letter deletions, excluding the first
+    letter.'''
+    return {token} | {token[:i] + token[i+1:] for i in range(1, len(token))}
+
+
+def soundex(token):
+    '''The American Soundex code of token, e.g. "r163" for "robert".'''
+
+    code = token[0]
+    last = SOUNDEX_CODES.get(token[0])
+    for c in token[1:]:
+        digit = SOUNDEX_CODES.get(c)
+        if digit is not None and digit != last:
+            code += digit
+        # 'h' and 'w' don't separate letters with the same code; vowels do
+        if c not in 'hw':
+            last = digit
+
+    return (code + '000')[:4]
+
+
+def first_name_keys(first_name):
+    keys = set()
+    for token in name_tokens(first_name):
+        keys.update('f:' + d for d in deletions(token))
+        keys.update('fp:' + token[:i] for i in range(1, len(token) + 1))
+    return keys
+
+
+def last_name_keys(last_name):
+    keys = set()
+    for token in name_tokens(last_name):
+        keys.update('l:' + d for d in deletions(token))
+        keys.add('ls:' + soundex(token))
+    return keys
+
+
+def first_name_query_keys(first_name):
+    '''The keys of first names that are one letter off of first_name, or
+    that begin with it.'''
+    keys = set()
+    for token in name_tokens(first_name):
+        keys.update('f:' + d for d in deletions(token))
+        keys.add('fp:' + token)
+    return keys
+
+
+def last_name_query_keys(last_name):
+    '''The keys of last names that are one letter off of last_name, or
+    that sound like it.'''
+    return last_name_keys(last_name)
+
+
+def edit_distance(a, b):
+    '''The Levenshtein distance between strings a and b.'''
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+
+    return previous[-1]
+
+
+def name_distance(first_name, last_name, patient):
+    '''How far patient's name is from the name searched for. A first name
+    that begins with the one searched for counts as an exact match.'''
+
+    first, last = name_tokens(first_name)[0], name_tokens(last_name)[0]
+    pt_first = ''.join(name_tokens(patient.first_name)[:1])
+    pt_last = ''.join(name_tokens(patient.last_name)[:1])
+
+    first_distance = (0 if pt_first.startswith(first)
+                      else edit_distance(first, pt_first))
+
+    return first_distance + edit_distance(last, pt_last)
@@ -0,0 +1,177 @@
+'''Email digests of overdue action items for case managers.
+
+Each case manager gets one email listing the overdue, incomplete items
+(of every model in OSLER_TODO_LIST_MANAGERS) of the patients they manage.
+A digest is only sent if it has an item the case manager hasn't been told
+about: one that is newly overdue, whose due date has changed, or about
+which they were last told OSLER_ACTION_ITEM_REMINDER_DAYS or more days ago.
+What was sent is recorded as ActionItemNotifications.
+
+Digests are computed with a fixed number of queries, however many items
+and case managers there are, and sent over one SMTP connection, or queued
+as one background job per digest.
+'''
+from __future__ import unicode_literals
+import collections
+import datetime
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sites.models import Site
+from django.core.mail import get_connection, send_mass_mail
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+
+from osler.core import tasks
+from osler.core.models import (ActionItemNotification, Patient, Provider,
+                               todo_models)
+
+
+class Digest(object):
+    '''The overdue items to email a case manager about.'''
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.items = []
+        self.new_items = []
+
+    def add(self, item, is_new):
+        self.items.append(item)
+        if is_new:
+            self.new_items.append(item)
+
+    def subject(self):
+        return 'SNHC: %s Action Item%s Due' % (
+            len(self.items), '' if len(self.items) == 1 else 's')
+
+    def message(self, domain, today):
+        return render_to_string('core/action_item_digest.txt', {
+            'provider': self.provider,
+            'items': self.items,
+            'new_items': set(self.new_items),
+            'domain': domain,
+            'today': today,
+        })
+
+
+def overdue_items(today):
+    '''The overdue, incomplete items of all todo models, with their
+    patients and the other objects shown in digests, one query per model.'''
+    items = []
+    for model in todo_models():
+        items.extend(model.objects.todo_items(
+            due_date__lte=today, completion_date=None))
+    return items
+
+
+def build_digests(today=None):
+    '''The digests that are due to be sent, in a constant number of
+    queries.'''
+
+    if today is None:
+        today = now().date()
+    reminder_before = now() - datetime.timedelta(
+        days=settings.OSLER_ACTION_ITEM_REMINDER_DAYS)
+
+    items = overdue_items(today)
+    patient_ids = {item.patient_id for item in items}
+
+    managers = collections.defaultdict(list)
+    for patient_id, provider_id in Patient.case_managers.through.objects \
+            .filter(patient__in=patient_ids) \
+            .values_list('patient', 'provider'):
+        managers[patient_id].append(provider_id)
+
+    providers = Provider.objects \
+        .filter(pk__in={p for ps in managers.values() for p in ps}) \
+        .exclude(associated_user=None) \
+        .exclude(associated_user__email='') \
+        .select_related('associated_user') \
+        .in_bulk()
+
+    content_types = ContentType.objects.get_for_models(*todo_models())
+    sent = {(n.provider_id, n.content_type_id, n.object_id): n
+            for n in ActionItemNotification.objects.filter(
+                provider__in=list(providers),
+                content_type__in=content_types.values(),
+                object_id__in={item.pk for item in items})}
+
+    digests = {}
+    for item in items:
+        content_type = content_types[type(item)]
+        for provider_id in managers[item.patient_id]:
+            if provider_id not in providers:
+                continue
+
+            notification = sent.get(
+                (provider_id, content_type.pk, item.pk))
+            is_new = (notification is None or
+                      notification.due_date != item.due_date or
+                      notification.last_sent <= reminder_before)
+
+            if provider_id not in digests:
+                digests[provider_id] = Digest(providers[provider_id])
+            digests[provider_id].add(item, is_new)
+
+    return [d for d in digests.values() if d.new_items]
+
+
+def record_sent(digests):
+    '''Record that the items of digests were sent to their providers.'''
+
+    timestamp = now()
+    content_types = ContentType.objects.get_for_models(*todo_models())
+
+    notifications = {}
+    for digest in digests:
+        for item in digest.items:
+            content_type = content_types[type(item)]
+            notifications[(digest.provider.pk, content_type.pk, item.pk)] = \
+                ActionItemNotification(
+                    provider=digest.provider, content_type=content_type,
+                    object_id=item.pk, due_date=item.due_date,
+                    last_sent=timestamp)
+
+    existing = ActionItemNotification.objects.filter(
+        provider__in=[d.provider for d in digests],
+        object_id__in={key[2] for key in notifications})
+    to_update = []
+    for notification in existing:
+        key = (notification.provider_id, notification.content_type_id,
+               notification.object_id)
+        if key in notifications:
+            notification.due_date = notifications.pop(key).due_date
+            notification.last_sent = timestamp
+            to_update.append(notification)
+
+    ActionItemNotification.objects.bulk_update(
+        to_update, ['due_date', 'last_sent'])
+    ActionItemNotification.objects.bulk_create(notifications.values())
+
+
+def send_digests(today=None, connection=None, background=False):
+    '''Build, send and record the digests that are due. Returns the
+    digests sent. If background, each is sent by a background job
+    instead, which is retried if sending fails.'''
+
+    if today is None:
+        today = now().date()
+
+    digests = build_digests(today)
+    if not digests:
+        return []
+
+    domain = Site.objects.get_current().domain
+    messages = [(digest.subject(), digest.message(domain, today), None,
+                 [digest.provider.associated_user.email])
+                for digest in digests]
+
+    if background:
+        for message in messages:
+            tasks.send_email.delay(*message)
+    else:
+        send_mass_mail(messages, fail_silently=False,
+                       connection=connection or get_connection())
+    record_sent(digests)
+
+    return digests
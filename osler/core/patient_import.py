@@ -0,0 +1,322 @@
+'''Bulk import of patients from CSV, e.g. when a clinic moves its patient
+roster into Osler from a spreadsheet.
+
+The CSV has a header row naming its columns, which are Patient fields
+(see COLUMNS). Gender, preferred contact method, languages and
+ethnicities are given by name; languages and ethnicities may list
+several names separated by MULTIPLE_SEPARATOR.
+
+Rows are read a batch at a time. Each row is checked with Patient's own
+field validators against lookup tables read once per import, and each
+batch is checked for duplicates against the name index (see core.names)
+with a single query, and against the rows imported before it. The
+patients of a batch are then written with bulk_create, along with their
+history records, languages, ethnicities, name keys, status summaries
+and change marks, so a batch takes a handful of queries however many
+rows it has. bulk_create doesn't send signals, so everything the
+Patient signals in core.signals maintain is written here.
+
+Rows with errors aren't imported, but the rest are. Errors are reported
+by the line of the CSV that the row starts on.
+'''
+from __future__ import unicode_literals
+import collections
+import csv
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, models, transaction
+from django.utils.timezone import now
+
+from osler.core import names
+from osler.core.models import (Patient, PatientChangeMark, PatientNameKey,
+                               PatientStatusSummary)
+
+REQUIRED_COLUMNS = ['first_name', 'last_name', 'gender', 'date_of_birth',
+                    'address', 'zip_code', 'languages', 'ethnicities']
+
+COLUMNS = REQUIRED_COLUMNS + [
+    'middle_name', 'phone', 'email', 'city', 'state', 'country',
+    'pcp_preferred_zip', 'patient_comfortable_with_english',
+    'preferred_contact_method',
+    'alternate_phone_1_owner', 'alternate_phone_1',
+    'alternate_phone_2_owner', 'alternate_phone_2',
+    'alternate_phone_3_owner', 'alternate_phone_3',
+    'alternate_phone_4_owner', 'alternate_phone_4']
+
+MULTIPLE_COLUMNS = ['languages', 'ethnicities']
+MULTIPLE_SEPARATOR = ';'
+
+BOOLEANS = {'yes': True, 'y': True, 'true': True, '1': True,
+            'no': False, 'n': False, 'false': False, '0': False}
+
+
+class ImportResult(object):
+    '''The outcome of an import: the patients created (or, in a dry run,
+    that would have been), and the errors of the rows that weren't
+    imported, as {line: {column: [message, ...]}}.'''
+
+    def __init__(self):
+        self.patients = []
+        self.errors = collections.OrderedDict()
+
+    @property
+    def n_rows(self):
+        return len(self.patients) + len(self.errors)
+
+    def error_lines(self):
+        '''Each error as a line of text, in the order of the CSV.'''
+        for line, errors in self.errors.items():
+            for column, messages in errors.items():
+                for message in messages:
+                    yield "Line %s: %s: %s" % (line, column, message)
+
+
+class Lookups(object):
+    '''The names of the options of each foreign key and many-to-many
+    column, read once per import. Names are matched without regard to
+    case.'''
+
+    def __init__(self):
+        self.options = {}
+        for name in COLUMNS:
+            field = Patient._meta.get_field(name)
+            if field.is_relation:
+                self.options[name] = {
+                    str(pk).lower(): pk for pk in
+                    field.related_model.objects.values_list('pk', flat=True)}
+
+    def resolve(self, column, value):
+        try:
+            return self.options[column][value.lower()]
+        except KeyError:
+            raise ValidationError("'%s' is not a known %s." % (
+                value, Patient._meta.get_field(column)
+                .related_model._meta.verbose_name))
+
+
+def clean_row(row, lookups):
+    '''Validate one row of the CSV, returning an unsaved Patient and the
+    pks of its many-to-many options by column. Raises ValidationError
+    with the errors of each column.'''
+
+    values = {}
+    multiples = {}
+    errors = {}
+
+    for column in COLUMNS:
+        field = Patient._meta.get_field(column)
+        raw = (row.get(column) or '').strip()
+
+        try:
+            if field.many_to_many:
+                options = [lookups.resolve(column, name.strip())
+                           for name in raw.split(MULTIPLE_SEPARATOR)
+                           if name.strip()]
+                if not options and not field.blank:
+                    raise ValidationError(
+                        field.error_messages['blank'], code='blank')
+                multiples[column] = options
+            elif field.is_relation:
+                if not raw and not field.blank:
+                    raise ValidationError(
+                        field.error_messages['blank'], code='blank')
+                values[field.attname] = (lookups.resolve(column, raw)
+                                         if raw else None)
+            elif isinstance(field, models.BooleanField):
+                if raw and raw.lower() not in BOOLEANS:
+                    raise ValidationError(
+                        "'%s' is not yes or no." % raw, code='invalid')
+                values[field.attname] = (BOOLEANS[raw.lower()] if raw
+                                         else field.get_default())
+            else:
+                if not raw:
+                    raw = (field.get_default() if field.has_default()
+                           else None if field.null else '')
+                values[field.attname] = field.clean(raw, None)
+        except ValidationError as e:
+            errors[column] = e.messages
+
+    # as in PatientForm, alternate phones and their owners come in pairs
+    for i in range(1, 5):
+        phone = 'alternate_phone_%s' % i
+        owner = phone + '_owner'
+        if values.get(owner) and not values.get(phone):
+            errors.setdefault(phone, []).append(
+                "An Alternate Phone is required if a Alternate Phone "
+                "Owner is specified")
+        if values.get(phone) and not values.get(owner):
+            errors.setdefault(owner, []).append(
+                "An Alternate Phone Owner is required if a Alternate "
+                "Phone is specified")
+
+    if errors:
+        raise ValidationError(errors)
+
+    return Patient(**values), multiples
+
+
+class NameIndex(object):
+    '''The name keys of the rows imported so far, so that duplicates
+    within the CSV are caught as well as duplicates of existing
+    patients.'''
+
+    def __init__(self):
+        self.lines = collections.defaultdict(set)
+
+    def add(self, line, patient):
+        for key in PatientNameKey.objects.keys_for(patient.first_name,
+                                                   patient.last_name):
+            self.lines[key].add(line)
+
+    def matches(self, first_keys, last_keys):
+        return (set().union(*(self.lines.get(k, ()) for k in first_keys)) &
+                set().union(*(self.lines.get(k, ()) for k in last_keys)))
+
+
+def duplicate_patients(batch):
+    '''For each patient of batch, its name's query keys and the pks of
+    the existing patients with similar names, by the same match as
+    PatientNameKeyManager.similar_patients. The existing patients of the
+    whole batch are found with one query.'''
+
+    query_keys = [(names.first_name_query_keys(pt.first_name),
+                   names.last_name_query_keys(pt.last_name))
+                  for pt in batch]
+
+    patients_by_key = collections.defaultdict(set)
+    all_keys = set().union(*(first | last for first, last in query_keys))
+    for patient_id, key in PatientNameKey.objects \
+            .filter(key__in=all_keys) \
+            .values_list('patient', 'key'):
+        patients_by_key[key].add(patient_id)
+
+    return [
+        (first_keys, last_keys,
+         set().union(*(patients_by_key[k] for k in first_keys)) &
+         set().union(*(patients_by_key[k] for k in last_keys)))
+        for first_keys, last_keys in query_keys]
+
+
+def write_batch(patients, multiples, user=None):
+    '''Create the patients, with everything their signals would have
+    written had they been saved one at a time.'''
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Patient.objects.bulk_create(patients)
+    else:
+        # bulk_create can't set the pks of what it inserts on backends
+        # like SQLite, so insert the rows one at a time there. As raw
+        # saves they don't send the signals that bulk_create skips.
+        for patient in patients:
+            patient.save_base(raw=True)
+
+    history_date = now()
+    for patient in patients:
+        patient._history_date = history_date
+        patient._history_user = user
+    Patient.history.bulk_history_create(patients)
+
+    for column in MULTIPLE_COLUMNS:
+        field = Patient._meta.get_field(column)
+        through = field.remote_field.through
+        through.objects.bulk_create([
+            through(**{field.m2m_field_name() + '_id': patient.pk,
+                       field.m2m_reverse_field_name() + '_id': option})
+            for patient, options in zip(patients, multiples)
+            for option in options[column]])
+
+    PatientNameKey.objects.bulk_create([
+        PatientNameKey(patient_id=patient.pk, key=key)
+        for patient in patients
+        for key in PatientNameKey.objects.keys_for(patient.first_name,
+                                                   patient.last_name)])
+
+    summaries = []
+    for patient in patients:
+        summary = PatientStatusSummary(patient_id=patient.pk)
+        summary.set_open_due_dates([])
+        summaries.append(summary)
+    PatientStatusSummary.objects.bulk_create(summaries)
+
+    PatientChangeMark.objects.bulk_create([
+        PatientChangeMark(patient_id=patient.pk, changed=history_date)
+        for patient in patients])
+
+
+def import_batch(batch, lookups, index, result, allow_duplicates=False,
+                 dry_run=False, user=None):
+
+    cleaned = []
+    for line, row in batch:
+        try:
+            cleaned.append((line, clean_row(row, lookups)))
+        except ValidationError as e:
+            result.errors[line] = e.message_dict
+
+    duplicates = duplicate_patients([pt for line, (pt, _) in cleaned])
+
+    patients, multiples = [], []
+    for (line, (pt, pt_multiples)), (first_keys, last_keys, patient_ids) \
+            in zip(cleaned, duplicates):
+        lines = index.matches(first_keys, last_keys)
+        if not allow_duplicates and (patient_ids or lines):
+            message = "Possible duplicate of %s." % ", ".join(
+                ["patient %s" % pk for pk in sorted(patient_ids)] +
+                ["line %s" % dup for dup in sorted(lines)])
+            result.errors[line] = {'name': [message]}
+            continue
+
+        index.add(line, pt)
+        patients.append(pt)
+        multiples.append(pt_multiples)
+
+    if patients and not dry_run:
+        write_batch(patients, multiples, user)
+    result.patients.extend(patients)
+
+
+def import_patients(csv_file, batch_size=None, allow_duplicates=False,
+                    dry_run=False, user=None):
+    '''Import the patients of csv_file, an iterable of lines of text.
+    Rows that are possible duplicates of existing patients, or of earlier
+    rows, aren't imported unless allow_duplicates is set. With dry_run,
+    rows are checked but nothing is written. Returns an ImportResult.
+
+    Each batch is written in its own transaction, so that an import of
+    any size holds locks briefly (the PatientImport view opts out of
+    ATOMIC_REQUESTS for this). Raises ValidationError if the CSV is
+    missing a required column.'''
+
+    if batch_size is None:
+        batch_size = settings.OSLER_IMPORT_BATCH_SIZE
+
+    reader = csv.DictReader(csv_file)
+    missing = [c for c in REQUIRED_COLUMNS
+               if c not in (reader.fieldnames or [])]
+    if missing:
+        raise ValidationError("The CSV is missing the columns %s." %
+                              ", ".join(missing))
+
+    lookups = Lookups()
+    index = NameIndex()
+    result = ImportResult()
+
+    batch = []
+    line = reader.line_num + 1
+    for row in reader:
+        batch.append((line, row))
+        line = reader.line_num + 1
+        if len(batch) >= batch_size:
+            with transaction.atomic():
+                import_batch(batch, lookups, index, result,
+                             allow_duplicates, dry_run, user)
+            batch = []
+
+    if batch:
+        with transaction.atomic():
+            import_batch(batch, lookups, index, result, allow_duplicates,
+                         dry_run, user)
+
+    result.errors = collections.OrderedDict(sorted(result.errors.items()))
+    return result
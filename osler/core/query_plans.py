@@ -0,0 +1,91 @@
+'''The query plans of the hot paths over notes and completables, for
+checking that they are served by indexes (see the benchmark_indexes
+command).
+
+Each hot query is EXPLAINed, and its plan is searched for the steps that
+read a whole table (sequential scans) or sort rows in memory rather
+than reading them in index order. How these steps are written depends
+on the database: PostgreSQL and SQLite are supported.
+'''
+from __future__ import unicode_literals
+import re
+
+from django.apps import apps
+from django.db import connection
+from django.utils.timezone import now
+
+from osler.core.models import CompletableMixin, Note
+
+# the patterns of plan steps that scan a whole table, and that sort,
+# capturing the table's name
+SEQUENTIAL_SCANS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SQLite marks scans of an index, rather than the table, with USING
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?$',
+                         re.MULTILINE),
+}
+SORTS = {
+    'postgresql': re.compile(r'\bSort\b'),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY'),
+}
+
+
+class PlanReport(object):
+    '''The plan of one hot query, and what it says about index use.'''
+
+    def __init__(self, label, queryset, vendor=None):
+        vendor = vendor or connection.vendor
+        if vendor not in SEQUENTIAL_SCANS:
+            raise ValueError("Reading %s query plans isn't supported." %
+                             vendor)
+
+        self.label = label
+        self.plan = queryset.explain()
+        self.sequential_scans = sorted(
+            set(SEQUENTIAL_SCANS[vendor].findall(self.plan)))
+        self.sorts = bool(SORTS[vendor].search(self.plan))
+
+    @property
+    def uses_indexes(self):
+        return not self.sequential_scans
+
+
+def note_models():
+    return [model for model in apps.get_models()
+            if issubclass(model, Note)]
+
+
+def hot_queries(patient, today=None):
+    '''(label, queryset) for each hot query of each note and completable
+    model, for patient's chart and the clinic-wide todo lists.'''
+
+    if today is None:
+        today = now().date()
+
+    queries = []
+    for model in note_models():
+        label = model._meta.label
+        queries.append((
+            "%s: patient's notes, newest first" % label,
+            model.objects.filter(patient=patient)
+            .order_by('-written_datetime')))
+
+        if issubclass(model, CompletableMixin):
+            queries.extend([
+                ("%s: active items" % label,
+                 model.objects.get_active(patient)),
+                ("%s: inactive items" % label,
+                 model.objects.get_inactive(patient)),
+                ("%s: completed items" % label,
+                 model.objects.get_completed(patient)),
+                ("%s: open items due, clinic-wide" % label,
+                 model.objects.filter(completion_author=None,
+                                      due_date__lte=today)),
+            ])
+
+    return queries
+
+
+def plan_reports(patient, today=None):
+    return [PlanReport(label, queryset)
+            for label, queryset in hot_queries(patient, today)]
@@ -0,0 +1,136 @@
+'''Signal handlers that keep denormalized core tables up to date.'''
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from osler.core import chart_cache
+from osler.core.models import (Note, Patient, PatientChangeMark,
+                               PatientNameKey, PatientStatusSummary,
+                               PatientTimelineEntry, timeline_models)
+
+
+@receiver(post_save, sender=Patient)
+def create_status_summary(sender, instance, created, raw=False, **kwargs):
+    '''Give every new patient an (empty) status summary.'''
+    if created and not raw:
+        PatientStatusSummary.objects.refresh(instance)
+
+
+@receiver(post_save, sender=Patient)
+def refresh_name_keys(sender, instance, raw=False, **kwargs):
+    '''Reindex a patient's name for duplicate searches when it changes.'''
+    if not raw:
+        PatientNameKey.objects.refresh(instance)
+
+
+def refresh_status_summary(sender, instance, raw=False, **kwargs):
+    '''Recompute the status summary of the patient owning a completable
+    whenever that completable is saved or deleted.'''
+    if raw:
+        return
+    PatientStatusSummary.objects.refresh(instance.patient_id)
+
+
+for app, model in settings.OSLER_TODO_LIST_MANAGERS:
+    completable = apps.get_model(app, model)
+    post_save.connect(refresh_status_summary, sender=completable,
+                      dispatch_uid='status_summary_save_%s' % model)
+    post_delete.connect(refresh_status_summary, sender=completable,
+                        dispatch_uid='status_summary_delete_%s' % model)
+
+
+def refresh_timeline_entry(sender, instance, raw=False, **kwargs):
+    '''Update a note's entry on its patient's timeline when it is saved.'''
+    if not raw:
+        PatientTimelineEntry.objects.refresh(instance)
+
+
+def refresh_timeline_entry_m2m(sender, instance, action, reverse, **kwargs):
+    '''Update a note's timeline entry when its many-to-many fields, which
+    may appear in its short text, are changed after it was saved.'''
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        PatientTimelineEntry.objects.refresh(instance)
+
+
+def forget_timeline_entry(sender, instance, **kwargs):
+    '''Remove a deleted note from its patient's timeline.'''
+    PatientTimelineEntry.objects.forget(instance)
+
+
+for note_model in timeline_models():
+    name = note_model._meta.label_lower
+    post_save.connect(refresh_timeline_entry, sender=note_model,
+                      dispatch_uid='timeline_save_%s' % name)
+    post_delete.connect(forget_timeline_entry, sender=note_model,
+                        dispatch_uid='timeline_delete_%s' % name)
+    for field in note_model._meta.many_to_many:
+        m2m_changed.connect(
+            refresh_timeline_entry_m2m, sender=field.remote_field.through,
+            dispatch_uid='timeline_m2m_%s_%s' % (name, field.name))
+
+
+def invalidate_chart_cache(sender, instance, raw=False, **kwargs):
+    '''Discard the cached sections of a patient's chart when any of their
+    notes (including action items, referrals and appointments) changes.'''
+    if not raw:
+        chart_cache.invalidate_on_commit(instance.patient_id)
+
+
+def invalidate_chart_cache_m2m(sender, instance, action, reverse, **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        chart_cache.invalidate_on_commit(instance.patient_id)
+
+
+@receiver(post_save, sender=Patient)
+def invalidate_patient_chart_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        chart_cache.invalidate_on_commit(instance.pk)
+
+
+for note_model in apps.get_models():
+    if not issubclass(note_model, Note):
+        continue
+    name = note_model._meta.label_lower
+    post_save.connect(invalidate_chart_cache, sender=note_model,
+                      dispatch_uid='chart_cache_save_%s' % name)
+    post_delete.connect(invalidate_chart_cache, sender=note_model,
+                        dispatch_uid='chart_cache_delete_%s' % name)
+    for field in note_model._meta.many_to_many:
+        m2m_changed.connect(
+            invalidate_chart_cache_m2m, sender=field.remote_field.through,
+            dispatch_uid='chart_cache_m2m_%s_%s' % (name, field.name))
+
+
+def touch_change_mark(sender, instance, raw=False, **kwargs):
+    '''Record a change to a patient's chart whenever they or any of
+    their notes are saved or deleted.'''
+    if not raw:
+        PatientChangeMark.objects.touch(
+            instance.pk if sender is Patient else instance.patient_id)
+
+
+def touch_change_mark_m2m(sender, instance, action, reverse, model, pk_set,
+                          **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        touch_change_mark(type(instance), instance)
+    elif model is Patient and pk_set:
+        # e.g. provider.patient_set.add(patient)
+        for patient_id in pk_set:
+            PatientChangeMark.objects.touch(patient_id)
+
+
+for model in [Patient] + [m for m in apps.get_models()
+                          if issubclass(m, Note)]:
+    name = model._meta.label_lower
+    post_save.connect(touch_change_mark, sender=model,
+                      dispatch_uid='change_mark_save_%s' % name)
+    post_delete.connect(touch_change_mark, sender=model,
+                        dispatch_uid='change_mark_delete_%s' % name)
+    for field in model._meta.many_to_many:
+        m2m_changed.connect(
+            touch_change_mark_m2m, sender=field.remote_field.through,
+            dispatch_uid='change_mark_m2m_%s_%s' % (name, field.name))
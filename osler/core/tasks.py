@@ -0,0 +1,11 @@
+from __future__ import unicode_literals
+
+from django.core.mail import send_mail
+
+from osler.jobs.queue import task
+
+
+@task('core.send_email', max_attempts=5)
+def send_email(subject, message, from_email, recipient_list):
+    send_mail(subject, message, from_email, recipient_list,
+              fail_silently=False)
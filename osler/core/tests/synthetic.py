@@ -0,0 +1,115 @@
+'''A synthetic clinic for benchmarks: patients with a typical chart of
+workups, action items, referrals, vaccines and appointments.'''
+from __future__ import unicode_literals
+import datetime
+
+from django.utils.timezone import now
+
+from osler.core import models
+from osler.appointment.models import Appointment
+from osler.referral.models import Referral, FollowupRequest
+from osler.vaccine import models as vaccine_models
+from osler.workup import models as workup_models
+
+
+def note_kwargs(provider, pt):
+    return {
+        'author': provider,
+        'author_type': provider.clinical_roles.first(),
+        'patient': pt,
+    }
+
+
+def seed_patient(provider, clinic_day, i):
+    '''Create patient number i with one of everything, on clinic_day.'''
+
+    today = now().date()
+    pt = models.Patient.objects.create(
+        first_name="Synthetic%s" % i,
+        last_name="Patient%s" % i,
+        phone='+49 178 236 5288',
+        gender=models.Gender.objects.first(),
+        address='Schulstrasse 9',
+        city='Munich',
+        state='BA',
+        zip_code='63108',
+        date_of_birth=datetime.date(1990, 1, 1),
+        preferred_contact_method=models.ContactMethod.objects.first(),
+        needs_workup=(i % 2 == 0),
+    )
+    pt.case_managers.add(provider)
+    kwargs = note_kwargs(provider, pt)
+
+    workup_models.Workup.objects.create(
+        clinic_day=clinic_day,
+        chief_complaint="SOB", diagnosis="MI",
+        HPI="", PMH_PSH="", meds="", allergies="", fam_hx="", soc_hx="",
+        ros="", pe="", A_and_P="",
+        attending=provider,
+        signer=provider if i % 3 else None,
+        **kwargs)
+
+    models.ActionItem.objects.create(
+        instruction=models.ActionInstruction.objects.first(),
+        comments="",
+        due_date=today + datetime.timedelta(days=(i % 5) - 2),
+        priority=(i % 4 == 0),
+        **kwargs)
+
+    referral = Referral.objects.create(
+        kind=models.ReferralType.objects.first(), **kwargs)
+    referral.location.add(models.ReferralLocation.objects.first())
+    FollowupRequest.objects.create(
+        referral=referral, contact_instructions="Call",
+        due_date=today + datetime.timedelta(days=(i % 7) - 3),
+        **kwargs)
+
+    series_type = vaccine_models.VaccineSeriesType.objects.get(
+        name="Synthetic")
+    series = vaccine_models.VaccineSeries.objects.create(
+        kind=series_type, **kwargs)
+    vaccine_models.VaccineDose.objects.create(
+        series=series, which_dose=series_type.doses()[0], **kwargs)
+    vaccine_models.VaccineActionItem.objects.create(
+        vaccine=series, instruction=models.ActionInstruction.objects.first(),
+        comments="", due_date=today + datetime.timedelta(days=30),
+        **kwargs)
+
+    Appointment.objects.create(
+        clindate=today + datetime.timedelta(days=i % 10),
+        comment="Checkup", **kwargs)
+
+    return pt
+
+
+def seed_clinic(provider, n_patients, patients_per_day=5):
+    '''Add n_patients synthetic patients, seen patients_per_day to a clinic
+    day, with provider as every note's author and attending. Needs the core
+    and workup fixtures. Returns the patients.'''
+
+    series_type, created = vaccine_models.VaccineSeriesType.objects \
+        .get_or_create(name="Synthetic")
+    if created:
+        for days in [0, 30, 180]:
+            vaccine_models.VaccineDoseType.objects.create(
+                kind=series_type,
+                time_from_first=datetime.timedelta(days=days))
+
+    if not models.ReferralLocation.objects.exists():
+        models.ReferralLocation.objects.create(name="Synthetic", address="")
+    if not models.ReferralType.objects.exists():
+        models.ReferralType.objects.create(name="Synthetic")
+
+    clinic_type = workup_models.ClinicType.objects.first()
+    first = models.Patient.objects.count()
+
+    patients = []
+    for i in range(first, first + n_patients):
+        if i % patients_per_day == 0 or not patients:
+            clinic_day = workup_models.ClinicDate.objects.create(
+                clinic_type=clinic_type,
+                clinic_date=now().date() - datetime.timedelta(
+                    days=i // patients_per_day))
+        patients.append(seed_patient(provider, clinic_day, i))
+
+    return patients
@@ -0,0 +1,332 @@
+from __future__ import unicode_literals
+import datetime
+import io
+import json
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from osler.core import models
+from osler.core.api import serializers as api_serializers
+from osler.core.api.renderers import CompactJSONRenderer
+from osler.core.api.views import PtList
+from osler.core.tests.synthetic import seed_clinic
+from osler.core.tests.test_views import build_provider
+from osler.vaccine.models import VaccineActionItem
+from osler.workup import models as workup_models
+from osler.workup.tests import wu_dict
+
+
+def create_pt(first_name, last_name):
+    return models.Patient.objects.create(
+        first_name=first_name,
+        last_name=last_name,
+        middle_name="Bayer",
+        phone='+49 178 236 5288',
+        gender=models.Gender.objects.first(),
+        address='Schulstrasse 9',
+        city='Munich',
+        state='BA',
+        zip_code='63108',
+        pcp_preferred_zip='63018',
+        date_of_birth=datetime.date(1990, 1, 1),
+        patient_comfortable_with_english=False,
+        preferred_contact_method=models.ContactMethod.objects.first(),
+    )
+
+
+class TestPtList(TestCase):
+
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.user = build_provider(["Attending"]).associated_user
+        self.factory = APIRequestFactory()
+
+        clinic_type = workup_models.ClinicType.objects.create(name="Basic")
+        self.pts = [create_pt("Juggie", "Brodeltein"),
+                    create_pt("Asdf", "Lkjh"),
+                    create_pt("No", "Action")]
+
+        # Lkjh was seen tomorrow, Brodeltein five days ago
+        for pt, days in [(self.pts[1], 1), (self.pts[0], -5)]:
+            wu = wu_dict()
+            wu['patient'] = pt
+            wu['clinic_day'] = workup_models.ClinicDate.objects.create(
+                clinic_type=clinic_type,
+                clinic_date=now().date() + datetime.timedelta(days=days))
+            workup_models.Workup.objects.create(**wu)
+
+    def get(self, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        response = PtList.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_sort_by_last_name(self):
+        data = self.get()
+        names = [pt['last_name'] for pt in data['results']]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), models.Patient.objects.count())
+
+    def test_sort_by_latest_workup(self):
+        data = self.get(sort='latest_workup')
+        pks = [int(pt['pk']) for pt in data['results']]
+
+        # the workup tomorrow, then intake today, then the workup five days
+        # ago, then the fixture patient with no history
+        self.assertEqual(pks[:3], [self.pts[1].pk, self.pts[2].pk,
+                                   self.pts[0].pk])
+
+    def test_cursor_pagination(self):
+        seen = []
+        data = self.get(sort='latest_workup', page_size=2)
+        while True:
+            self.assertLessEqual(len(data['results']), 2)
+            seen.extend(int(pt['pk']) for pt in data['results'])
+            if data['next'] is None:
+                break
+            cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+            data = self.get(sort='latest_workup', page_size=2, cursor=cursor)
+
+        self.assertEqual(len(seen), models.Patient.objects.count())
+        self.assertEqual(seen, [int(pt['pk']) for pt in
+                                self.get(sort='latest_workup')['results']])
+
+    def test_field_selection(self):
+        data = self.get(fields='pk,name')
+        self.assertEqual(set(data['results'][0]), {'pk', 'name'})
+
+    def test_history(self):
+        pt = self.pts[2]
+        data = self.get(fields='pk,history')
+        history = {int(d['pk']): d['history'] for d in data['results']}
+        self.assertEqual(
+            history[pt.pk]['last']['history_date'],
+            serializers.DateTimeField().to_representation(
+                pt.history.last().history_date))
+
+    def test_bad_sort(self):
+        request = self.factory.get('/', {'sort': 'history__history_date'})
+        force_authenticate(request, user=self.user)
+        self.assertEqual(PtList.as_view()(request).status_code, 400)
+
+
+class TestPatientTimeline(TestCase):
+
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.user = build_provider(["Attending"]).associated_user
+        self.pt = create_pt("Juggie", "Brodeltein")
+
+        clinic_day = workup_models.ClinicDate.objects.create(
+            clinic_type=workup_models.ClinicType.objects.create(name="Basic"),
+            clinic_date=now().date())
+        for chief_complaint in ["SOB", "Cough", "Fever"]:
+            wu = wu_dict()
+            wu.update(patient=self.pt, clinic_day=clinic_day,
+                      chief_complaint=chief_complaint)
+            workup_models.Workup.objects.create(**wu)
+
+    def get(self, **params):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('api:patient-timeline', args=(self.pt.pk,)), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages(self):
+        data = self.get(page_size=2)
+        self.assertEqual([e['short_text'] for e in data['results']],
+                         ["Fever", "Cough"])
+        self.assertEqual(set(data['results'][0]),
+                         {'written_datetime', 'kind', 'short_text',
+                          'author_name', 'url'})
+
+        cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+        data = self.get(page_size=2, cursor=cursor)
+        self.assertEqual([e['short_text'] for e in data['results']],
+                         ["SOB"])
+        self.assertIsNone(data['next'])
+
+    def test_authentication_required(self):
+        response = self.client.get(
+            reverse('api:patient-timeline', args=(self.pt.pk,)))
+        self.assertIn(response.status_code, (401, 403))
+
+
+class TestPtListFilters(TestCase):
+
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.provider = build_provider(["Attending"])
+        self.factory = APIRequestFactory()
+        self.pts = seed_clinic(self.provider, 12)
+
+        # a second unsigned workup, which mustn't list its patient twice
+        wu = wu_dict()
+        wu['patient'] = self.pts[0]
+        workup_models.Workup.objects.create(**wu)
+
+    def get(self, **params):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.provider.associated_user)
+        return PtList.as_view()(request)
+
+    def pks(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        return [int(pt['pk']) for pt in response.data['results']]
+
+    def soonest_due_dates(self, **filters):
+        '''{patient pk: soonest due date} of the open items of every todo
+        model matching filters, worked out in Python.'''
+
+        dates = {}
+        for model in models.todo_models():
+            for item in model.objects.filter(completion_author=None,
+                                             **filters):
+                dates[item.patient_id] = min(
+                    dates.get(item.patient_id, item.due_date), item.due_date)
+        return dates
+
+    def by_soonest_due_date(self, **filters):
+        dates = self.soonest_due_dates(**filters)
+        return sorted(dates, key=lambda pk: (dates[pk], pk))
+
+    def test_ai_active(self):
+        expected = self.by_soonest_due_date(due_date__lte=now().date())
+        self.assertTrue(expected)
+        self.assertEqual(self.pks(filter='ai_active'), expected)
+
+    def test_ai_inactive(self):
+        # every synthetic patient has a vaccine action item due in 30 days
+        expected = self.by_soonest_due_date(due_date__gt=now().date())
+        self.assertEqual(set(expected), {pt.pk for pt in self.pts})
+        self.assertEqual(self.pks(filter='ai_inactive'), expected)
+
+        for item in VaccineActionItem.objects.filter(
+                patient=self.pts[0]):
+            item.mark_done(self.provider)
+            item.save()
+        self.assertEqual(self.pks(filter='ai_inactive'),
+                         self.by_soonest_due_date(due_date__gt=now().date()))
+
+    def test_unsigned_workup(self):
+        pks = self.pks(filter='unsigned_workup')
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(set(pks), set(
+            workup_models.Workup.objects.filter(signer=None)
+            .values_list('patient', flat=True)))
+
+    def test_ai_priority(self):
+        self.assertEqual(set(self.pks(filter='ai_priority')), set(
+            models.ActionItem.objects.filter(
+                priority=True, completion_author=None)
+            .values_list('patient', flat=True)))
+
+    def test_composed(self):
+        self.pts[0].needs_workup = True
+        self.pts[0].save()
+        active = {pt.pk for pt in self.pts if pt.needs_workup}
+
+        self.assertEqual(
+            self.pks(filter='active,ai_active'),
+            [pk for pk in self.pks(filter='ai_active') if pk in active])
+        self.assertEqual(set(self.pks(filter='user_cases,unsigned_workup')),
+                         set(self.pks(filter='unsigned_workup')))
+
+    def test_cursor_pagination(self):
+        seen = []
+        params = {'filter': 'ai_inactive', 'page_size': 5}
+        while True:
+            response = self.get(**params)
+            seen.extend(int(pt['pk']) for pt in response.data['results'])
+            if response.data['next'] is None:
+                break
+            params['cursor'] = parse_qs(
+                urlparse(response.data['next']).query)['cursor'][0]
+
+        self.assertEqual(seen, self.pks(filter='ai_inactive'))
+
+    def test_bad_filter(self):
+        # one bad request per test, since DRF rolls back the transaction of
+        # a request that fails
+        self.assertEqual(self.get(filter='active,nonsense').status_code, 400)
+
+
+class TestPatientRowSerializer(TestCase):
+
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.provider = build_provider(["Attending"])
+        self.pts = seed_clinic(self.provider, 6)
+        self.pts[0].languages.add(models.Language.objects.first())
+        # one patient without a status summary, as if predating them
+        models.PatientStatusSummary.objects.filter(
+            patient=self.pts[1]).delete()
+        self.queryset = models.Patient.objects.with_history_dates() \
+            .order_by('pk')
+
+    def row_data(self, fields=None):
+        return api_serializers.PatientRowSerializer(
+            self.queryset.values(
+                *api_serializers.PatientRowSerializer.columns(fields)),
+            many=True, fields=fields).data
+
+    def test_same_as_patient_serializer(self):
+        expected = api_serializers.PatientSerializer(
+            self.queryset, many=True).data
+        rows = self.row_data()
+
+        self.assertEqual(len(rows), len(expected))
+        for row, pt in zip(rows, expected):
+            self.assertEqual(row, dict(pt))
+
+    def test_fields(self):
+        fields = api_serializers.FIELD_PROFILES['minimal']
+        for row in self.row_data(fields):
+            self.assertEqual(set(row), set(fields))
+
+    def test_queries(self):
+        '''A page takes a query for its rows and one per related table,
+        however many patients it lists.'''
+
+        models.PatientStatusSummary.objects.rebuild()
+        fields = api_serializers.FIELD_PROFILES['list']
+        with self.assertNumQueries(3):
+            self.row_data(fields)
+
+    def test_profile(self):
+        request = APIRequestFactory().get('/', {'profile': 'list'})
+        force_authenticate(request, user=self.provider.associated_user)
+        response = PtList.as_view()(request)
+        self.assertEqual(set(response.data['results'][0]),
+                         set(api_serializers.FIELD_PROFILES['list']))
+
+        request = APIRequestFactory().get('/', {'profile': 'nonsense'})
+        force_authenticate(request, user=self.provider.associated_user)
+        self.assertEqual(PtList.as_view()(request).status_code, 400)
+
+    def test_compact_renderer(self):
+        data = {'results': self.row_data()}
+        self.assertEqual(
+            json.loads(CompactJSONRenderer().render(data).decode('utf-8')),
+            json.loads(JSONRenderer().render(data).decode('utf-8')))
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_patient_list', patients=2, stdout=out)
+        self.assertIn("instances:", out.getvalue())
+        self.assertIn("rows:", out.getvalue())
+        self.assertEqual(models.Patient.objects.count(), len(self.pts) + 1)
@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from osler.core import chart_cache, models
+from osler.core.tests.test_views import build_provider, log_in_provider
+
+
+@override_settings(OSLER_CHART_CACHE_ENABLED=True)
+class TestChartCache(TestCase):
+    fixtures = ['core.json']
+
+    def setUp(self):
+        cache.clear()
+        self.provider = build_provider()
+        log_in_provider(self.client, self.provider)
+        self.pt = models.Patient.objects.first()
+        self.url = reverse('core:patient-detail', args=(self.pt.pk,))
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def create_action_item(self, comments):
+        return models.ActionItem.objects.create(
+            instruction=models.ActionInstruction.objects.first(),
+            comments=comments,
+            due_date=now().date(),
+            author=self.provider,
+            author_type=self.provider.clinical_roles.first(),
+            patient=self.pt)
+
+    def test_hits_and_invalidation(self):
+        self.create_action_item("Call about labs")
+
+        response, cold_queries = self.get()
+        self.assertContains(response, "<h3>Action Items (1 Total)</h3>")
+        self.assertEqual(chart_cache.stats()['action_items'], (0, 1))
+
+        response, warm_queries = self.get()
+        self.assertContains(response, "<h3>Action Items (1 Total)</h3>")
+        self.assertLess(warm_queries, cold_queries)
+        self.assertEqual(
+            chart_cache.stats(),
+            {section: (1, 1) for section in chart_cache.SECTIONS})
+
+        self.create_action_item("Call about imaging")
+        response, _ = self.get()
+        self.assertContains(response, "<h3>Action Items (2 Total)</h3>")
+        self.assertEqual(chart_cache.stats()['action_items'], (1, 2))
+
+        chart_cache.reset_stats()
+        self.assertEqual(chart_cache.stats()['action_items'], (0, 0))
+
+    def test_staff_view_cached_separately(self):
+        self.get()
+
+        session = self.client.session
+        session['staff_view'] = True
+        session.save()
+        self.get()
+
+        self.assertEqual(chart_cache.stats()['notes'], (0, 2))
+
+    @override_settings(OSLER_CHART_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.get()
+        self.get()
+        self.assertEqual(chart_cache.stats()['notes'], (0, 0))
+
+
+@override_settings(OSLER_CHART_CACHE_ENABLED=True)
+class TestChartCacheOnCommit(TransactionTestCase):
+    fixtures = ['core.json']
+
+    def test_invalidated_again_on_commit(self):
+        cache.clear()
+        provider = build_provider()
+        pt = models.Patient.objects.first()
+
+        with transaction.atomic():
+            models.ActionItem.objects.create(
+                instruction=models.ActionInstruction.objects.first(),
+                comments="", due_date=now().date(), author=provider,
+                author_type=provider.clinical_roles.first(), patient=pt)
+            # what a concurrent request would cache its sections under,
+            # before the commit
+            version = cache.get(chart_cache.version_key(pt.pk))
+            self.assertIsNotNone(version)
+
+        self.assertNotEqual(cache.get(chart_cache.version_key(pt.pk)),
+                            version)
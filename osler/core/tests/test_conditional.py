@@ -0,0 +1,141 @@
+from __future__ import unicode_literals
+
+from django.contrib import messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpRequest, HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from osler.core import models
+from osler.core.api.views import PtList
+from osler.core.tests.test_api import create_pt
+from osler.core.tests.test_views import build_provider, log_in_provider
+
+
+class TestConditionalGet(TestCase):
+    fixtures = ['core']
+
+    def setUp(self):
+        self.provider = build_provider(["Coordinator"])
+        log_in_provider(self.client, self.provider)
+        self.pt = create_pt("Juggie", "Brodeltein")
+        self.other_pt = create_pt("Asdf", "Lkjh")
+
+    def add_action_item(self, pt):
+        return models.ActionItem.objects.create(
+            instruction=models.ActionInstruction.objects.first(),
+            comments="", due_date=now().date(), author=self.provider,
+            author_type=self.provider.clinical_roles.first(), patient=pt)
+
+    def get(self, url, response=None):
+        '''GET url, conditionally on the ETag of an earlier response.'''
+        headers = {}
+        if response is not None:
+            headers['HTTP_IF_NONE_MATCH'] = response['ETag']
+        return self.client.get(url, **headers)
+
+    def test_patient_detail(self):
+        url = reverse('core:patient-detail', args=(self.pt.pk,))
+
+        first = self.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header('Last-Modified'))
+
+        response = self.get(url, first)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # changes to other charts don't matter
+        self.add_action_item(self.other_pt)
+        self.assertEqual(self.get(url, first).status_code, 304)
+
+        item = self.add_action_item(self.pt)
+        second = self.get(url, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+        # deletions leave no last_modified behind, but change the chart
+        item.delete()
+        self.assertEqual(self.get(url, second).status_code, 200)
+
+    def test_all_patients(self):
+        url = reverse('core:all-patients')
+        first = self.get(url)
+        self.assertEqual(self.get(url, first).status_code, 304)
+
+        self.add_action_item(self.other_pt)
+        self.assertEqual(self.get(url, first).status_code, 200)
+
+        first = self.get(url)
+        self.other_pt.case_managers.add(self.provider)
+        self.assertEqual(self.get(url, first).status_code, 200)
+
+        # the deleted patient's mark remains, so the latest mark still moves
+        # on
+        pt = create_pt("No", "Action")
+        first = self.get(url)
+        pt.delete()
+        self.assertEqual(self.get(url, first).status_code, 200)
+
+    def test_per_user(self):
+        url = reverse('core:all-patients')
+        first = self.get(url)
+
+        log_in_provider(self.client, build_provider(["Clinical"]))
+        self.assertEqual(self.get(url, first).status_code, 200)
+
+    def test_pending_messages(self):
+        url = reverse('core:patient-detail', args=(self.pt.pk,))
+        first = self.get(url)
+
+        # a message is waiting to be shown, e.g. after a redirect
+        storage = CookieStorage(HttpRequest())
+        storage.add(messages.INFO, "Patient updated.")
+        cookies = HttpResponse()
+        storage.update(cookies)
+        self.client.cookies['messages'] = \
+            cookies.cookies['messages'].value
+
+        response = self.get(url, first)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_pt_list(self):
+        factory = APIRequestFactory()
+
+        def get(**headers):
+            request = factory.get('/', {'filter': 'active'}, **headers)
+            force_authenticate(request, user=self.provider.associated_user)
+            return PtList.as_view()(request)
+
+        first = get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(get(HTTP_IF_NONE_MATCH=first['ETag']).status_code,
+                         304)
+
+        self.add_action_item(self.pt)
+        self.assertEqual(get(HTTP_IF_NONE_MATCH=first['ETag']).status_code,
+                         200)
+
+    @override_settings(OSLER_CONDITIONAL_GET_ENABLED=False)
+    def test_disabled(self):
+        response = self.get(reverse('core:all-patients'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_rebuild(self):
+        item = self.add_action_item(self.pt)
+        marks = dict(models.PatientChangeMark.objects.values_list(
+            'patient_id', 'changed'))
+
+        self.assertEqual(models.PatientChangeMark.objects.rebuild(),
+                         len(marks))
+        rebuilt = dict(models.PatientChangeMark.objects.values_list(
+            'patient_id', 'changed'))
+        self.assertEqual(set(rebuilt), set(marks))
+        item = models.ActionItem.objects.get(pk=item.pk)
+        self.assertEqual(rebuilt[self.pt.pk],
+                         max(item.last_modified,
+                             item.history.latest().history_date))
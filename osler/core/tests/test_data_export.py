@@ -0,0 +1,136 @@
+from __future__ import unicode_literals
+import csv
+import datetime
+import io
+import json
+import re
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+
+from osler.core import data_export, models
+from osler.core.tests.test_views import build_provider, log_in_provider
+from osler.workup import models as workup_models
+from osler.workup.tests import wu_dict
+
+
+class TestDataExport(TestCase):
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.provider = build_provider(["Coordinator"])
+        log_in_provider(self.client, self.provider)
+
+        workup_models.ClinicDate.objects.create(
+            clinic_type=workup_models.ClinicType.objects.first(),
+            clinic_date=now().date())
+        self.pt = models.Patient.objects.first()
+        self.pt.zip_code = '63108'
+        self.pt.save()
+        self.wu = workup_models.Workup.objects.create(**dict(
+            wu_dict(), author=self.provider, patient=self.pt))
+
+    def export(self, dataset, **kwargs):
+        return ''.join(data_export.stream(data_export.DATASETS[dataset],
+                                          **kwargs))
+
+    def test_all_datasets(self):
+        for name, dataset in data_export.DATASETS.items():
+            out = io.StringIO()
+            call_command('export_data', name, deidentify=True, stdout=out)
+            self.assertEqual(next(csv.reader(io.StringIO(out.getvalue()))),
+                             dataset.columns(deidentify=True))
+
+            out = io.StringIO()
+            call_command('export_data', name, format='jsonl', stdout=out)
+            self.assertEqual(len(out.getvalue().splitlines()),
+                             dataset.model.objects.count())
+
+    def test_csv(self):
+        rows = list(csv.reader(io.StringIO(self.export('patients'))))
+
+        self.assertEqual(rows[0], data_export.DATASETS['patients'].columns())
+        self.assertEqual(len(rows), models.Patient.objects.count() + 1)
+        first = dict(zip(rows[0], rows[1]))
+        self.assertEqual(first['last_name'], self.pt.last_name)
+        self.assertEqual(first['date_of_birth'],
+                         self.pt.date_of_birth.isoformat())
+
+    def test_deidentify(self):
+        patients = [json.loads(line) for line in self.export(
+            'patients', format='jsonl', deidentify=True).splitlines()]
+        workups = [json.loads(line) for line in self.export(
+            'workups', format='jsonl', deidentify=True).splitlines()]
+
+        pt = patients[0]
+        for identifier in ['first_name', 'last_name', 'phone', 'address',
+                           'email']:
+            self.assertNotIn(identifier, pt)
+        self.assertEqual(pt['zip_code'], '631')
+        self.assertEqual(pt['date_of_birth'], self.pt.date_of_birth.year)
+        self.assertEqual(pt['id'], data_export.pseudonym(self.pt.pk))
+
+        # free text is dropped, and workups still join to patients
+        self.assertNotIn('HPI', workups[0])
+        self.assertNotIn('chief_complaint', workups[0])
+        self.assertEqual(workups[0]['patient_id'], pt['id'])
+
+        # a different key gives different pseudonyms
+        other = json.loads(self.export(
+            'patients', format='jsonl', deidentify=True,
+            key='other').splitlines()[0])
+        self.assertNotEqual(other['id'], pt['id'])
+
+    def test_deidentify_dates(self):
+        self.pt.date_of_birth = datetime.date(1920, 5, 17)
+        self.pt.save()
+
+        # no full date (or time) survives in any dataset
+        full_date = re.compile(r'\d{4}-\d{2}-\d{2}')
+        for name in data_export.DATASETS:
+            export = self.export(name, format='jsonl', deidentify=True)
+            self.assertIsNone(full_date.search(export), name)
+
+        pt = json.loads(self.export(
+            'patients', format='jsonl', deidentify=True).splitlines()[0])
+        self.assertEqual(pt['date_of_birth'],
+                         datetime.date.today().year - 90)
+
+        # dates of service are cut to the year, clinic days are dropped,
+        # and providers are pseudonymized
+        wu = json.loads(self.export(
+            'workups', format='jsonl', deidentify=True).splitlines()[0])
+        self.assertEqual(wu['written_datetime'],
+                         self.wu.written_datetime.year)
+        self.assertNotIn('clinic_day_id', wu)
+        self.assertEqual(wu['author_id'], data_export.pseudonym(
+            self.provider.pk, kind='provider'))
+        self.assertNotEqual(wu['author_id'],
+                            data_export.pseudonym(self.provider.pk))
+
+    def test_streamed_in_chunks(self):
+        n_patients = models.Patient.objects.count()
+        chunks = list(data_export.stream(data_export.DATASETS['patients'],
+                                         chunk_size=1))
+        # the header, then one chunk per row
+        self.assertEqual(len(chunks), n_patients + 1)
+
+    def test_view(self):
+        url = reverse('core:export-dataset', args=('workups',))
+
+        response = self.client.get(url, {'format': 'jsonl',
+                                         'deidentify': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('workups-deidentified.jsonl',
+                      response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['id'], self.wu.pk)
+
+        response = self.client.get(
+            reverse('core:export-dataset', args=('nonsense',)))
+        self.assertEqual(response.status_code, 404)
+
+        log_in_provider(self.client, build_provider(["Clinical"]))
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,256 @@
+from __future__ import unicode_literals
+import datetime
+
+from django.test import TestCase
+from django.utils.timezone import now
+from django.core.management import call_command
+
+from osler.core import models
+from osler.core.tests.test_views import build_provider
+from osler.workup import models as workup_models
+from osler.workup.tests import wu_dict
+
+BASIC_FIXTURE = 'core.json'
+
+
+class TestPatientStatusSummary(TestCase):
+    fixtures = [BASIC_FIXTURE]
+
+    def setUp(self):
+        self.provider = build_provider()
+        # the fixture patient is loaded raw, so it has no summary yet
+        self.pt = models.Patient.objects.first()
+
+        self.today = now().date()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+        self.tomorrow = self.today + datetime.timedelta(days=1)
+
+        self.ai_kwargs = {
+            'instruction': models.ActionInstruction.objects.first(),
+            'comments': "",
+            'author': self.provider,
+            'author_type': models.ProviderType.objects.first(),
+            'patient': self.pt,
+        }
+
+    def test_built_on_first_access(self):
+        self.assertFalse(models.PatientStatusSummary.objects.exists())
+
+        self.assertEqual(self.pt.status(), "no pending actions")
+        self.assertTrue(models.PatientStatusSummary.objects.filter(
+            patient=self.pt).exists())
+
+    def test_signals_keep_summary_current(self):
+        ai = models.ActionItem.objects.create(
+            due_date=self.tomorrow, **self.ai_kwargs)
+
+        summary = models.PatientStatusSummary.objects.get(patient=self.pt)
+        self.assertEqual(summary.n_pending, 1)
+        self.assertEqual(summary.soonest_due_date, self.tomorrow)
+        self.assertEqual(summary.status(), "next action in 1 days")
+
+        models.ActionItem.objects.create(
+            due_date=self.yesterday, **self.ai_kwargs)
+        summary.refresh_from_db()
+        self.assertEqual(summary.n_overdue, 1)
+        self.assertEqual(summary.soonest_due_date, self.yesterday)
+        self.assertEqual(summary.status(), "Action items 1 days past due")
+
+        ai.mark_done(self.provider)
+        ai.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.n_done, summary.n_pending), (1, 0))
+
+        models.ActionItem.objects.exclude(pk=ai.pk).get().delete()
+        summary.refresh_from_db()
+        self.assertEqual(summary.status(), "all actions complete")
+
+    def test_rollover(self):
+        models.ActionItem.objects.create(
+            due_date=self.tomorrow, **self.ai_kwargs)
+
+        n = models.PatientStatusSummary.objects.rollover(today=self.today)
+        self.assertEqual(n, 0)
+
+        n = models.PatientStatusSummary.objects.rollover(today=self.tomorrow)
+        self.assertEqual(n, 1)
+
+        summary = models.PatientStatusSummary.objects.get(patient=self.pt)
+        self.assertEqual((summary.n_overdue, summary.n_pending), (1, 0))
+        self.assertEqual(summary.as_of, self.tomorrow)
+        self.assertIsNone(summary.next_pending_due_date)
+
+    def test_rebuild_command(self):
+        models.ActionItem.objects.create(
+            due_date=self.yesterday, **self.ai_kwargs)
+        # bypasses signals, leaving the summary stale
+        models.ActionItem.objects.update(due_date=self.tomorrow)
+
+        call_command('rebuild_pt_status')
+
+        summary = models.PatientStatusSummary.objects.get(patient=self.pt)
+        self.assertEqual(summary.soonest_due_date, self.tomorrow)
+        self.assertEqual(summary.n_pending, 1)
+
+
+class TestTodoList(TestCase):
+    fixtures = [BASIC_FIXTURE]
+
+    def setUp(self):
+        self.provider = build_provider()
+        self.pt = models.Patient.objects.first()
+        self.today = now().date()
+
+        self.ai_kwargs = {
+            'instruction': models.ActionInstruction.objects.first(),
+            'comments': "",
+            'author': self.provider,
+            'author_type': models.ProviderType.objects.first(),
+            'patient': self.pt,
+        }
+
+    def test_partition(self):
+        active = models.ActionItem.objects.create(
+            due_date=self.today, **self.ai_kwargs)
+        pending = models.ActionItem.objects.create(
+            due_date=self.today + datetime.timedelta(days=1),
+            **self.ai_kwargs)
+        done = models.ActionItem.objects.create(
+            due_date=self.today, **self.ai_kwargs)
+        done.mark_done(self.provider)
+        done.save()
+
+        todos = models.todo_list(self.pt)
+        self.assertEqual(todos.active, [active])
+        self.assertEqual(todos.pending, [pending])
+        self.assertEqual(todos.done, [done])
+        self.assertEqual(len(todos), 3)
+
+        # one query per todo model, rendering included
+        with self.assertNumQueries(len(models.todo_models())):
+            todos = models.todo_list(self.pt)
+            for item in todos.active + todos.pending + todos.done:
+                str(item.author)
+                str(item.completion_author)
+                item.short_name()
+                item.mark_done_url()
+
+    def test_many_patients(self):
+        models.ActionItem.objects.create(due_date=self.today,
+                                         **self.ai_kwargs)
+        other = models.Patient.objects.create(
+            first_name="Juggie", last_name="Brodeltein",
+            gender=models.Gender.objects.first(), address="",
+            zip_code="63108", date_of_birth=datetime.date(1990, 1, 1))
+
+        with self.assertNumQueries(len(models.todo_models())):
+            todos = models.todo_lists([self.pt, other])
+
+        self.assertEqual(len(todos[self.pt.pk].active), 1)
+        self.assertEqual(len(todos[other.pk]), 0)
+
+
+class TestPatientTimeline(TestCase):
+    fixtures = ['workup', BASIC_FIXTURE]
+
+    def setUp(self):
+        self.provider = build_provider()
+        self.pt = models.Patient.objects.first()
+
+        self.clinic_day = workup_models.ClinicDate.objects.create(
+            clinic_type=workup_models.ClinicType.objects.first(),
+            clinic_date=now().date())
+
+    def create_workup(self, chief_complaint="SOB"):
+        wu = wu_dict()
+        wu.update(clinic_day=self.clinic_day, author=self.provider,
+                  patient=self.pt, chief_complaint=chief_complaint)
+        return workup_models.Workup.objects.create(**wu)
+
+    def create_document(self):
+        return models.Document.objects.create(
+            title="Prescription", image="prescription.pdf", comments="",
+            document_type=models.DocumentType.objects.create(name="Rx"),
+            author=self.provider,
+            author_type=models.ProviderType.objects.first(),
+            patient=self.pt)
+
+    def test_signals(self):
+        wu = self.create_workup()
+        document = self.create_document()
+
+        entries = list(self.pt.timeline_entries.all())
+        self.assertEqual([e.note for e in entries], [document, wu])
+        self.assertEqual(entries[1].kind, "Workup")
+        self.assertEqual(entries[1].short_text, "SOB")
+        self.assertEqual(entries[1].author_name, self.provider.name())
+        self.assertEqual(entries[1].url, wu.detail_url())
+        self.assertEqual(entries[0].url, document.detail_url())
+
+        wu.chief_complaint = "Cough"
+        wu.save()
+        self.assertEqual(
+            self.pt.timeline_entries.get(object_id=wu.pk,
+                                         kind="Workup").short_text,
+            "Cough")
+
+        document.delete()
+        self.assertEqual([e.note for e in self.pt.timeline_entries.all()],
+                         [wu])
+
+    def test_long_short_text(self):
+        self.create_workup(chief_complaint="x" * 500)
+        entry = self.pt.timeline_entries.get()
+        self.assertEqual(len(entry.short_text), 200)
+        self.assertTrue(entry.short_text.endswith("..."))
+
+    def test_rebuild(self):
+        self.create_workup()
+        self.create_document()
+        expected = list(self.pt.timeline_entries.values_list(
+            'content_type', 'object_id', 'written_datetime', 'kind',
+            'short_text', 'author_name', 'url'))
+
+        models.PatientTimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline')
+
+        self.assertEqual(
+            list(self.pt.timeline_entries.values_list(
+                'content_type', 'object_id', 'written_datetime', 'kind',
+                'short_text', 'author_name', 'url')),
+            expected)
+        self.assertEqual(models.PatientTimelineEntry.objects.rebuild(), 2)
+
+
+class TestHistoryQuerySet(TestCase):
+    fixtures = [BASIC_FIXTURE]
+
+    def test_with_history_dates(self):
+        provider = build_provider()
+        pt = models.Patient.objects.create(
+            first_name="Juggie", last_name="Brodeltein",
+            gender=models.Gender.objects.first(), address="",
+            zip_code="63108", date_of_birth=datetime.date(1990, 1, 1))
+        pt.address = "Schulstrasse 9"
+        pt._history_user = provider.associated_user
+        pt.save()
+
+        with self.assertNumQueries(1):
+            annotated = models.Patient.objects.with_history_dates() \
+                .get(pk=pt.pk)
+
+        # history.last is the oldest record, shown as the intake date
+        history = pt.history.order_by('history_date')
+        self.assertEqual(annotated.first_history_date,
+                         pt.history.last().history_date)
+        self.assertEqual(annotated.first_history_date,
+                         history.first().history_date)
+        self.assertEqual(annotated.last_history_date,
+                         history.last().history_date)
+        self.assertEqual(annotated.last_history_user_id,
+                         provider.associated_user.pk)
+
+        pt.history.all().delete()
+        annotated = models.Patient.objects.with_history_dates().get(pk=pt.pk)
+        self.assertIsNone(annotated.first_history_date)
+        self.assertIsNone(annotated.last_history_user_id)
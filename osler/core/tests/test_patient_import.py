@@ -0,0 +1,184 @@
+from __future__ import unicode_literals
+import csv
+import datetime
+import io
+import os
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from osler.core import models, patient_import
+from osler.core.tests.test_views import build_provider, log_in_provider
+
+ROWS = [
+    ['first_name', 'last_name', 'gender', 'date_of_birth', 'address',
+     'zip_code', 'languages', 'ethnicities', 'preferred_contact_method'],
+    ['Jane', 'Doe', 'Female', '1980-02-03', '1 Main St', '63108',
+     'english; spanish', 'Hispanic or Latino', 'Phone'],
+    ['John', 'Roe', 'male', '1975-06-07', '2 Main St', '63110',
+     'Arabic', 'Asian', ''],
+    ['Ann', 'Poe', 'Nonsense', '2999-01-01', '3 Main St', '631',
+     'Klingon', '', ''],
+    # a duplicate of an existing patient, Frankie McNath
+    ['Frank', 'McNath', 'Male', '1990-01-01', '4 Main St', '63110',
+     'English', 'Asian', ''],
+    # a duplicate of the first row
+    ['Janet', 'Doe', 'Female', '1981-02-03', '5 Main St', '63108',
+     'English', 'Asian', ''],
+]
+
+
+def to_csv(rows):
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue()
+
+
+class TestPatientImport(TestCase):
+    fixtures = ['core']
+
+    def setUp(self):
+        models.Language.objects.get_or_create(name='English')
+        models.Language.objects.get_or_create(name='Spanish')
+        # fixtures are loaded without signals, so index their names
+        models.PatientNameKey.objects.rebuild()
+        self.n_patients = models.Patient.objects.count()
+
+    def run_import(self, rows=ROWS, **kwargs):
+        return patient_import.import_patients(
+            io.StringIO(to_csv(rows)), **kwargs)
+
+    def test_import(self):
+        result = self.run_import()
+
+        self.assertEqual(len(result.patients), 2)
+        self.assertEqual(list(result.errors), [4, 5, 6])
+        self.assertEqual(models.Patient.objects.count(), self.n_patients + 2)
+
+        jane = models.Patient.objects.get(first_name='Jane')
+        self.assertEqual(jane.gender_id, 'Female')
+        self.assertEqual(jane.date_of_birth, datetime.date(1980, 2, 3))
+        self.assertEqual(jane.city, 'St. Louis')
+        self.assertEqual(jane.preferred_contact_method_id, 'Phone')
+        self.assertEqual(set(jane.languages.values_list('name', flat=True)),
+                         {'English', 'Spanish'})
+        self.assertEqual(list(jane.ethnicities.values_list('name', flat=True)),
+                         ['Hispanic or Latino'])
+        self.assertEqual(models.Patient.objects.get(
+            first_name='John').gender_id, 'Male')
+
+        # everything the Patient signals would have written is there
+        self.assertEqual(jane.history.get().history_type, '+')
+        self.assertEqual(jane.status_summary.status(), "no pending actions")
+        self.assertEqual(
+            set(jane.name_keys.values_list('key', flat=True)),
+            models.PatientNameKey.objects.keys_for('Jane', 'Doe'))
+        self.assertIn(jane, models.PatientNameKey.objects.similar_patients(
+            'Jane', 'Doe'))
+
+    def test_errors(self):
+        errors = self.run_import().errors
+
+        self.assertEqual(set(errors[4]), {'gender', 'date_of_birth',
+                                          'zip_code', 'languages',
+                                          'ethnicities'})
+        self.assertEqual(errors[4]['gender'],
+                         ["'Nonsense' is not a known gender."])
+        self.assertEqual(errors[5]['name'], [
+            "Possible duplicate of patient %s." %
+            models.Patient.objects.get(last_name='McNath').pk])
+        self.assertEqual(errors[6]['name'],
+                         ["Possible duplicate of line 2."])
+
+        with self.assertRaises(ValidationError):
+            self.run_import([['first_name', 'last_name']])
+
+    def test_allow_duplicates(self):
+        result = self.run_import(allow_duplicates=True)
+
+        self.assertEqual(len(result.patients), 4)
+        self.assertEqual(list(result.errors), [4])
+
+    def test_dry_run(self):
+        result = self.run_import(dry_run=True)
+
+        self.assertEqual(len(result.patients), 2)
+        self.assertEqual(models.Patient.objects.count(), self.n_patients)
+
+    def test_queries_per_batch(self):
+        '''The queries of a batch don't grow with its number of rows.'''
+
+        def rows(*names):
+            return [ROWS[0]] + [
+                [first, last, 'Female', '1980-01-01', '1 Main St', '63108',
+                 'English', 'Asian', ''] for first, last in names]
+
+        with self.assertNumQueries(4 + 10):
+            self.run_import(rows(('Ada', 'Lovelace')), batch_size=10)
+
+        # the same queries as for one row, but for the patient INSERTs,
+        # which are made one at a time on SQLite (see write_batch)
+        with self.assertNumQueries(4 + 10 + 4):
+            result = self.run_import(rows(
+                ('Grace', 'Hopper'), ('Alan', 'Turing'), ('Emmy', 'Noether'),
+                ('Kurt', 'Godel'), ('Edsger', 'Dijkstra')), batch_size=10)
+        self.assertEqual(len(result.patients), 5)
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(to_csv(ROWS))
+
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            call_command('import_patients', path, dry_run=True,
+                         stdout=out, stderr=err)
+        finally:
+            os.remove(path)
+
+        self.assertIn("Would import 2 patients; 3 rows had errors.",
+                      out.getvalue())
+        self.assertIn("Line 4: gender: 'Nonsense' is not a known gender.",
+                      err.getvalue())
+
+    def test_view(self):
+        url = reverse('core:import-patients')
+        log_in_provider(self.client, build_provider(["Coordinator"]))
+
+        response = self.client.post(url, {'csv_file': SimpleUploadedFile(
+            'patients.csv', to_csv(ROWS).encode('utf-8'))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['result'].patients), 2)
+        self.assertContains(response, "Possible duplicate of line 2.")
+        self.assertEqual(models.Patient.objects.count(), self.n_patients + 2)
+
+        log_in_provider(self.client, build_provider(["Clinical"]))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_view_unreadable_files(self):
+        url = reverse('core:import-patients')
+        log_in_provider(self.client, build_provider(["Coordinator"]))
+
+        # e.g. a CSV saved by Excel in Windows-1252
+        rows = ROWS[:1] + [['Jos\xe9', 'Pe\xf1a'] + ROWS[1][2:]]
+        response = self.client.post(url, {
+            'csv_file': SimpleUploadedFile(
+                'patients.csv', to_csv(rows).encode('cp1252')),
+            'dry_run': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(
+            response, 'form', 'csv_file',
+            "The file isn't UTF-8 text. Save it as \"CSV UTF-8\" and "
+            "upload it again.")
+
+        rows = ROWS[:1] + [['x' * (csv.field_size_limit() + 1)]]
+        response = self.client.post(url, {'csv_file': SimpleUploadedFile(
+            'patients.csv', to_csv(rows).encode('utf-8'))})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("The file isn't a valid CSV",
+                      response.context['form'].errors['csv_file'][0])
+        self.assertEqual(models.Patient.objects.count(), self.n_patients)
@@ -0,0 +1,218 @@
+'''Query-count benchmarks for the pages that list or chart patients.
+
+Each view is requested with a small and a larger synthetic clinic (see
+synthetic.py). A view fails if it issues more queries than its baseline in
+query_baselines.json allows, which is a fixed number plus a number per
+patient in the clinic (zero for views that shouldn't scale with it).
+
+Environment variables:
+- OSLER_BENCHMARK_SIZES: the two clinic sizes, default "4,12".
+- OSLER_RECORD_QUERY_BASELINES: if set, record the measured counts as the
+  new baselines instead of checking them.
+- OSLER_BENCHMARK_REPORT: a file to which query counts, wall time and peak
+  memory of each request are appended as JSON lines.
+'''
+from __future__ import unicode_literals
+import json
+import math
+import os
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from osler.core.api.views import PtList
+from osler.core.tests.synthetic import seed_clinic
+from osler.core.tests.test_views import build_provider, log_in_provider
+from osler.workup.models import Workup
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'query_baselines.json')
+
+
+def benchmark_sizes():
+    sizes = os.environ.get('OSLER_BENCHMARK_SIZES', '4,12')
+    small, large = sorted(int(n) for n in sizes.split(','))
+    return small, large
+
+
+def load_baselines():
+    with open(BASELINES) as f:
+        return json.load(f)
+
+
+def record_baseline(name, measurements):
+    '''Store the smallest baseline that admits the measurements, a list of
+    (n_patients, n_queries) pairs.'''
+
+    (n1, c1), (n2, c2) = measurements
+    per_patient = max(0, int(math.ceil((c2 - c1) / float(n2 - n1))))
+
+    baselines = load_baselines()
+    baselines[name] = {
+        'queries': max(c - per_patient * n for n, c in measurements),
+        'per_patient': per_patient,
+    }
+    with open(BASELINES, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+class QueryCountTest(TestCase):
+
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        self.provider = build_provider(["Attending", "Coordinator"])
+        log_in_provider(self.client, self.provider)
+
+        # pdf_workup is only available to staff
+        session = self.client.session
+        session['clintype_pk'] = 'Coordinator'
+        session.save()
+
+    def measure(self, request):
+        '''Run request(), returning the number of queries it made, and
+        reporting its wall time and peak memory.'''
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 200)
+
+        return len(queries), elapsed, peak
+
+    def assertQueryCounts(self, requests):
+        '''Check the queries made by each of requests, a dict of functions
+        taking the list of synthetic patients keyed by baseline name, in a
+        small and then a large clinic.'''
+
+        patients = []
+        measurements = {name: [] for name in requests}
+        for i, size in enumerate(benchmark_sizes()):
+            patients.extend(seed_clinic(self.provider, size - len(patients)))
+
+            for name, request in requests.items():
+                if i == 0:
+                    # warm up one-time caches (templates, content types)
+                    request(patients)
+
+                n_queries, elapsed, peak = self.measure(
+                    lambda: request(patients))
+                measurements[name].append((size, n_queries))
+
+                report = os.environ.get('OSLER_BENCHMARK_REPORT')
+                if report:
+                    with open(report, 'a') as f:
+                        f.write(json.dumps({
+                            'view': name, 'patients': size,
+                            'queries': n_queries, 'seconds': elapsed,
+                            'peak_kb': peak // 1024}) + '\n')
+
+        for name, counts in measurements.items():
+            if os.environ.get('OSLER_RECORD_QUERY_BASELINES'):
+                record_baseline(name, counts)
+            else:
+                self.assertWithinBaseline(name, counts)
+
+    def assertWithinBaseline(self, name, measurements):
+        baseline = load_baselines()[name]
+
+        (n1, c1), (n2, c2) = measurements
+        self.assertLessEqual(
+            (c2 - c1) / float(n2 - n1), baseline['per_patient'],
+            "%s made %s queries with %s patients but %s with %s." %
+            (name, c1, n1, c2, n2))
+
+        for n, c in measurements:
+            allowed = baseline['queries'] + baseline['per_patient'] * n
+            self.assertLessEqual(
+                c, allowed, "%s made %s queries with %s patients; its "
+                "baseline allows %s." % (name, c, n, allowed))
+
+    def get_pt_list(self, **params):
+        request = APIRequestFactory().get('/', params)
+        force_authenticate(request, user=self.provider.associated_user)
+        return PtList.as_view()(request)
+
+    def test_patient_detail(self):
+        self.assertQueryCounts({
+            'patient_detail': lambda pts: self.client.get(
+                reverse('core:patient-detail', args=(pts[0].pk,)))})
+
+    @override_settings(OSLER_CHART_CACHE_ENABLED=False,
+                       OSLER_CONDITIONAL_GET_ENABLED=False)
+    def test_patient_detail_notes(self):
+        '''The chart takes as many queries however many notes the patient
+        has, including more than fit on the first page of the timeline.'''
+
+        pt = seed_clinic(self.provider, 1)[0]
+        workup = Workup.objects.get(patient=pt)
+        url = reverse('core:patient-detail', args=(pt.pk,))
+        self.client.get(url)  # warm up
+
+        counts = []
+        for n_workups in [1, 30]:
+            while Workup.objects.filter(patient=pt).count() < n_workups:
+                workup.pk = None
+                workup.save()
+            n_queries, _, _ = self.measure(lambda: self.client.get(url))
+            counts.append(n_queries)
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_patient_timeline(self):
+        self.assertQueryCounts({
+            'patient_timeline': lambda pts: self.client.get(
+                reverse('core:patient-timeline', args=(pts[0].pk,)))})
+
+    def test_all_patients(self):
+        self.assertQueryCounts({
+            'all_patients': lambda pts: self.client.get(
+                reverse('core:all-patients'))})
+
+    def test_pt_list(self):
+        requests = {
+            'pt_list_latest_workup':
+                lambda pts: self.get_pt_list(sort='latest_workup')}
+        for filter_name in [None, 'active', 'ai_active', 'ai_inactive',
+                            'unsigned_workup', 'user_cases', 'ai_priority']:
+            params = {'filter': filter_name} if filter_name else {}
+            requests['pt_list_%s' % (filter_name or 'all')] = \
+                lambda pts, params=params: self.get_pt_list(**params)
+
+        self.assertQueryCounts(requests)
+
+    def test_dashboard_attending(self):
+        self.assertQueryCounts({
+            'dashboard_attending': lambda pts: self.client.get(
+                reverse('dashboard-attending'))})
+
+    def test_dashboard_coordinator(self):
+        self.assertQueryCounts({
+            'dashboard_coordinator': lambda pts: self.client.get(
+                reverse('dashboard-coordinator'))})
+
+    def test_clinic_date_list(self):
+        self.assertQueryCounts({
+            'clinic_date_list': lambda pts: self.client.get(
+                reverse('clindate-list'))})
+
+    def test_appointment_list(self):
+        self.assertQueryCounts({
+            'appointment_list': lambda pts: self.client.get(
+                reverse('appointment-list'))})
+
+    def test_pdf_workup(self):
+        self.assertQueryCounts({
+            'pdf_workup': lambda pts: self.client.get(reverse(
+                'workup-pdf', args=(
+                    Workup.objects.filter(patient=pts[0]).get().pk,)))})
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from osler.core import query_plans
+from osler.core.models import ActionItem, Patient
+from osler.core.tests.test_views import build_provider
+
+
+class TestQueryPlans(TestCase):
+    fixtures = ['core', 'workup']
+
+    def setUp(self):
+        if connection.vendor not in query_plans.SEQUENTIAL_SCANS:
+            self.skipTest("Can't read %s query plans." % connection.vendor)
+
+    def test_sequential_scans_found(self):
+        report = query_plans.PlanReport(
+            "unindexed", ActionItem.objects.filter(comments="Call"))
+
+        self.assertFalse(report.uses_indexes)
+        self.assertEqual(report.sequential_scans,
+                         [ActionItem._meta.db_table])
+
+    def test_hot_queries_use_indexes(self):
+        '''The indexes declared on Note and CompletableMixin serve every
+        hot query of every subclass.'''
+        for report in query_plans.plan_reports(Patient.objects.first()):
+            self.assertTrue(report.uses_indexes,
+                            "%s:\n%s" % (report.label, report.plan))
+
+    def test_command(self):
+        build_provider(["Coordinator"])
+        out = StringIO()
+        call_command('benchmark_indexes', stdout=out)
+
+        self.assertIn("core.ActionItem: active items: index",
+                      out.getvalue())
+
+        # synthetic patients are planned for, then rolled back
+        n_patients = Patient.objects.count()
+        call_command('benchmark_indexes', patients=3, stdout=out)
+        self.assertEqual(Patient.objects.count(), n_patients)
+        self.assertIn("0 of %s hot queries read whole tables." %
+                      len(query_plans.hot_queries(Patient.objects.first())),
+                      out.getvalue())
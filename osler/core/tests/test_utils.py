@@ -137,28 +137,36 @@ class return_duplicatesTests(TestCase):
         models.Patient.objects.all().delete()
 
     def test_empty_first_name(self):
-        """If first and last name is empty string should return None
+        """If first and last name is empty string should match no one
         """
         create_pts()
         self.assertEqual(len(models.Patient.objects.all()), 5)
         result = utils.return_duplicates("", "Katz")
-        self.assertEqual(result, None)
+        self.assertEqual(result, [])
 
     def test_empty_last_name(self):
-        """If last name is empty string but first is not should return None
+        """If last name is empty string but first is not should match no one
         """
         create_pts()
         self.assertEqual(len(models.Patient.objects.all()), 5)
         result = utils.return_duplicates("Benjamin", "")
-        self.assertEqual(result, None)
+        self.assertEqual(result, [])
 
     def test_empty_first_last_name(self):
-        """If first name is empty string but last is not should return None
+        """If first name is empty string but last is not should match no one
         """
         create_pts()
         self.assertEqual(len(models.Patient.objects.all()), 5)
         result = utils.return_duplicates("", "")
-        self.assertEqual(result, None)
+        self.assertEqual(result, [])
+
+    def test_no_letters(self):
+        """Names with no letters (e.g. typed into the wrong field) match no
+        one
+        """
+        create_pts()
+        self.assertEqual(utils.return_duplicates("123", "Katz"), [])
+        self.assertEqual(utils.return_duplicates("Benjamin", "--"), [])
 
     def test_identical_first_last_name(self):
         """If first and last name exactly match database entry, it
@@ -240,3 +248,39 @@ class return_duplicatesTests(TestCase):
         assert models.Patient.objects.count() == 5
         result = utils.return_duplicates("art", "meller")
         assert len(result) == 4
+
+    def test_sounds_like_last(self):
+        """Last names that sound alike match even if they are more than
+        one letter apart, and closer names are listed first.
+        """
+        create_pts()
+        result = utils.return_duplicates("artur", "miler")
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0].first_name, "Artur")
+
+    def test_accents_and_case(self):
+        """Names are compared without regard to case or accents"""
+        create_pts()
+        result = utils.return_duplicates("BENJAMÍN", "kätz")
+        self.assertEqual(len(result), 1)
+
+    def test_rename_reindexes(self):
+        """Renaming a patient updates their name keys"""
+        create_pts()
+        pt = models.Patient.objects.get(first_name="Benjamin")
+        pt.last_name = "Schwartz"
+        pt.save()
+
+        self.assertEqual(len(utils.return_duplicates("ben", "katz")), 0)
+        self.assertEqual(len(utils.return_duplicates("ben", "schwarz")), 1)
+
+    def test_rebuild_matches_signals(self):
+        """Rebuilding the index gives the keys the signals maintain"""
+        create_pts()
+        keys = set(models.PatientNameKey.objects.values_list(
+            'patient', 'key'))
+
+        self.assertEqual(models.PatientNameKey.objects.rebuild(), 5)
+        self.assertEqual(
+            set(models.PatientNameKey.objects.values_list('patient', 'key')),
+            keys)
@@ -15,9 +15,12 @@ from django.core import mail, files
 from django.core.management import call_command
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from osler.core import models
+from osler.core import models, notifications
 from osler.followup.models import ContactResult
+from osler.jobs.models import Job
 from osler.referral.models import Referral, FollowupRequest, PatientContact
 from osler.referral.forms import PatientContactForm
 
@@ -180,15 +183,73 @@ class SendEmailTest(TestCase):
         '''
         call_command('action_item_spam')
 
-        # test that 1 message has been sent for the AI due yesterday and
-        # today but only 1 email bc same pt/case manager
-        self.assertEqual(len(mail.outbox), 1)
+        # one digest to each case manager (user1 and user3), each listing
+        # the AIs due yesterday and today
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(sorted(m.to for m in mail.outbox),
+                         [['user1@gmail.com'], ['user3@gmail.com']])
+        for message in mail.outbox:
+            self.assertEqual(message.subject, 'SNHC: 2 Action Items Due')
+            self.assertEqual(message.body.count('[NEW]'), 2)
 
-        #verify that subject is correct
-        self.assertEqual(mail.outbox[0].subject, 'SNHC: Action Item Due')
+        # nothing new, so no more email
+        call_command('action_item_spam')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_sendemail_background(self):
+        call_command('action_item_spam', background=True)
+
+        # tests run jobs eagerly, so the queued email is already sent
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            Job.objects.filter(name='core.send_email',
+                               status=Job.SUCCEEDED).count(), 2)
+
+    def test_sendemail_new_item(self):
+        call_command('action_item_spam')
+
+        models.ActionItem.objects.create(
+            due_date=now().date(),
+            author=models.Provider.objects.first(),
+            instruction=models.ActionInstruction.objects.first(),
+            comments="",
+            author_type=models.ProviderType.objects.first(),
+            patient=models.Patient.objects.first())
+        call_command('action_item_spam')
+
+        self.assertEqual(len(mail.outbox), 4)
+        for message in mail.outbox[2:]:
+            self.assertEqual(message.subject, 'SNHC: 3 Action Items Due')
+            self.assertEqual(message.body.count('[NEW]'), 1)
+
+    def test_sendemail_reminder(self):
+        call_command('action_item_spam')
 
-        #verify that the 1 message is to user1 and user3 (second case manager)
-        self.assertEqual(mail.outbox[0].to, ['user1@gmail.com', 'user3@gmail.com'])
+        models.ActionItemNotification.objects.update(
+            last_sent=now() - datetime.timedelta(
+                days=settings.OSLER_ACTION_ITEM_REMINDER_DAYS))
+        call_command('action_item_spam')
+
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_digest_queries(self):
+        '''Building digests takes the same number of queries however many
+        items and case managers there are.'''
+        notifications.build_digests()  # warm the content type cache
+        with CaptureQueriesContext(connection) as queries:
+            notifications.build_digests()
+        n_queries = len(queries)
+
+        pt = models.Patient.objects.first()
+        for provider in models.Provider.objects.all():
+            pt.case_managers.add(provider)
+        for ai in models.ActionItem.objects.all():
+            ai.pk = None
+            ai.save()
+
+        with self.assertNumQueries(n_queries):
+            digests = notifications.build_digests()
+        self.assertEqual(len(digests), 3)
 
 
 class ViewsExistTest(TestCase):
@@ -222,6 +283,7 @@ class ViewsExistTest(TestCase):
 
     def test_pt_urls(self):
         pt_urls = ['core:patient-detail',
+                   'core:patient-timeline',
                    'core:new-action-item',
                    'core:patient-update',
                    'followup-choice',
@@ -493,6 +555,16 @@ class IntakeTest(TestCase):
             response.context_data['form']['last_name'].value(),
             self.valid_pt_dict['last_name'])
 
+    def test_preintake_name_without_letters(self):
+
+        url = reverse('core:preintake')
+        response = self.client.post(
+            url, {'first_name': "123", 'last_name': "Brodeltein"},
+            follow=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'core/intake.html')
+
     def test_can_intake_pt(self):
 
         n_pt = len(models.Patient.objects.all())
@@ -714,12 +786,9 @@ class ProviderUpdateTest(TestCase):
 
         # Verify that accessing final url no longer redirects
         response = self.client.get(final_url, follow=True)
-
-        with open('tmp.html', 'wb') as w:
-            w.write(response.content)
-
         self.assertRedirects(
-            response, reverse(settings.OSLER_DEFAULT_DASHBOARD))
+            response,
+            reverse(settings.OSLER_PROVIDERTYPE_DASHBOARDS['Clinical']))
 
 
 class TestReferralPatientDetailIntegration(TestCase):
@@ -914,9 +983,8 @@ class TestReferralPatientDetailIntegration(TestCase):
         total_action_items = "Action Items (6 Total)"
         self.assertContains(response, total_action_items)
 
-        # Verify that the followup total has been updated
-        expected_followups = "Followups (1)"
-        self.assertContains(response, expected_followups)
+        # Verify that the followup is listed among the recent notes
+        self.assertContains(response, "<strong>Patient Contact:</strong>")
 
         # There should now be 2 completed action items
         finished_action_items = "Completed Action Items (2)"
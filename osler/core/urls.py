@@ -31,6 +31,10 @@ unwrapped_urlpatterns = [
         r'^(?P<pk>[0-9]+)/$',
         views.patient_detail,
         name='patient-detail'),
+    re_path(
+        r'^(?P<pk>[0-9]+)/timeline/$',
+        views.patient_timeline,
+        name='patient-timeline'),
     re_path(
         r'^patient/update/(?P<pk>[0-9]+)$',
         views.PatientUpdate.as_view(),
@@ -76,6 +80,16 @@ unwrapped_urlpatterns = [
         views.reset_action_item,
         name='reset-action-item'),
 
+    # EXPORTS
+    re_path(
+        r'^export/(?P<dataset>[a-z_]+)/$',
+        views.export_dataset,
+        name='export-dataset'),
+    re_path(
+        r'^import/patients/$',
+        views.PatientImport.as_view(),
+        name='import-patients'),
+
     # DOCUMENTS
     re_path(
         r'^(?P<pt_id>[0-9]+)/document/$',
@@ -2,7 +2,7 @@ from __future__ import unicode_literals
 from builtins import range
 import string
 from django.db.models import Q
-from . import models
+from . import models, names
 
 
 def all_variations(name):
@@ -30,22 +30,39 @@ def all_variations(name):
         return all_vars
 
 
-def return_duplicates(first_name_str, last_name_str):
+def return_duplicates(first_name_str, last_name_str, patients=None):
     """search database for all variations of first and last name off by 1
     letter (except for first letter must be correct) and return matching
     results.  First name may also be abbreviated (to cover cases like
-    ben and benjamin)
+    ben and benjamin), and last names that sound alike also match.
+    Results are sorted closest match first; names with no letters match
+    no one. patients, if given, is the queryset of patients to search.
+
+    This uses the PatientNameKey index; all_variations is kept for
+    comparison (see the benchmark_name_search command).
     """
+    if not names.name_tokens(first_name_str) or \
+            not names.name_tokens(last_name_str):
+        return []
+
+    return models.PatientNameKey.objects.similar_patients(
+        first_name_str, last_name_str, patients)
+
+
+def return_duplicates_by_variations(first_name_str, last_name_str):
+    """The original duplicate search, which queries every variation of the
+    names from all_variations."""
     first_name_var = all_variations(first_name_str.capitalize())
     last_name_var = all_variations(last_name_str.capitalize())
     if len(first_name_var) == 0 or len(last_name_var) == 0:
-        return
+        return models.Patient.objects.none()
 
     return models.Patient.objects.filter(
         (Q(first_name__in=first_name_var) |
          Q(first_name__istartswith=first_name_str.capitalize())) &
         Q(last_name__in=last_name_var))
 
+
 def get_names_from_url_query_dict(request):
     """Get first_name and last_name from a request object in a dict.
     """
@@ -1,25 +1,37 @@
 from builtins import zip
 import collections
+import csv
 import datetime
+import io
+from functools import partial
 
 from django.conf import settings
-from django.apps import apps
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.shortcuts import get_object_or_404, render
-from django.http import HttpResponseRedirect, HttpResponseServerError
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.http import (HttpResponseRedirect, HttpResponseServerError,
+                         StreamingHttpResponse, Http404)
 from django.views.generic.edit import FormView, UpdateView
 from django.views.generic.list import ListView
 from django.urls import reverse
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import (ImproperlyConfigured, PermissionDenied,
+                                    ValidationError)
+from django.db import transaction
 from django.db.models import Prefetch
 from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.timezone import now
 
 from osler.workup import models as workupmodels
-from osler.referral.models import Referral, FollowupRequest, PatientContact
-from osler.vaccine.models import VaccineFollowup
+from osler.referral.models import Referral, FollowupRequest
 from osler.appointment.models import Appointment
 
+from osler.core import chart_cache
+from osler.core import conditional
+from osler.core import data_export
 from osler.core import models as core_models
 from osler.core import forms
+from osler.core import patient_import
 from osler.core import utils
 
 
@@ -193,8 +205,9 @@ class PreIntakeSelect(ListView):
         if (initial.get('first_name', None) is None or
             initial.get('last_name', None) is None):
             return []
-        possible_duplicates = utils.return_duplicates(initial.get(
-            'first_name', None), initial.get('last_name', None))
+        possible_duplicates = utils.return_duplicates(
+            initial.get('first_name', None), initial.get('last_name', None),
+            core_models.Patient.objects.with_history_dates())
         return possible_duplicates
 
     def get_context_data(self, **kwargs):
@@ -371,10 +384,42 @@ def home_page(request):
 #                    'api_url': api_url})
 
 
-def patient_detail(request, pk):
+def referrals_context(pt):
+    # Provide referral list for patient page (includes specialty referrals)
+    referrals = Referral.objects.filter(
+        patient=pt,
+        followuprequest__in=FollowupRequest.objects.all()
+    )
 
-    pt = get_object_or_404(core_models.Patient, pk=pk)
+    # Add FQHC referral status
+    # Note it is possible for a patient to have been referred multiple times
+    # This creates some strage cases (e.g., first referral was lost to followup
+    # but the second one was successful). In these cases, the last referral
+    # status becomes the current status
+    fqhc_referrals = Referral.objects.filter(patient=pt, kind__is_fqhc=True)
+    referral_status_output = Referral.aggregate_referral_status(fqhc_referrals)
+
+    return {'referral_status': referral_status_output,
+            'referrals': referrals}
+
+
+def notes_context(pt):
+    # The most recent page of the patient's notes, read from their
+    # timeline entries so that the chart takes the same queries however
+    # many notes the patient has; the rest are on the patient's timeline.
+    recent_notes = list(pt.timeline_entries.select_related('content_type')[
+        :settings.OSLER_TIMELINE_ENTRIES_PER_PAGE])
+    for entry in recent_notes:
+        entry.admin_url = reverse(
+            'admin:%s_%s_change' % (entry.content_type.app_label,
+                                    entry.content_type.model),
+            args=(entry.object_id,))
 
+    return {'recent_notes': recent_notes,
+            'total_notes': pt.timeline_entries.count()}
+
+
+def action_items_context(pt):
     #   Special zipped list of action item types so they can be looped over.
     #   List 1: Labels for the panel objects of the action items
     #   List 2: Action Item lists based on type (active, pending, completed)
@@ -382,24 +427,16 @@ def patient_detail(request, pk):
     #   List 4: True and False determines if the link should be for
     #           done_action_item or update_action_item
 
-    active_ais = []
-    inactive_ais = []
-    done_ais = []
-
     # Add action items for apps that are turned on in Osler's base settings
     # OSLER_TODO_LIST_MANAGERS contains app names like referral which contain
     # tasks for clinical teams to carry out (e.g., followup with patient)
-    for app, model in settings.OSLER_TODO_LIST_MANAGERS:
-        ai = apps.get_model(app, model)
-
-        active_ais.extend(ai.objects.get_active(patient=pt))
-        inactive_ais.extend(ai.objects.get_inactive(patient=pt))
-        done_ais.extend(ai.objects.get_completed(patient=pt))
+    todos = core_models.todo_list(pt)
+    active_ais, inactive_ais, done_ais = todos.active, todos.pending, todos.done
 
     # Calculate the total number of action items for this patient,
     # This total includes all apps that that have associated
     # tasks requiring clinical followup (e.g., referral followup request)
-    total_ais = len(active_ais) + len(inactive_ais) + len(done_ais)
+    total_ais = len(todos)
 
     zipped_ai_list = list(zip(
         ['collapse6', 'collapse7', 'collapse8'],
@@ -408,26 +445,11 @@ def patient_detail(request, pk):
          'Completed Action Items'],
         [True, True, False]))
 
-    # Provide referral list for patient page (includes specialty referrals)
-    referrals = Referral.objects.filter(
-        patient=pt,
-        followuprequest__in=FollowupRequest.objects.all()
-    )
+    return {'zipped_ai_list': zipped_ai_list,
+            'total_ais': total_ais}
 
-    # Add FQHC referral status
-    # Note it is possible for a patient to have been referred multiple times
-    # This creates some strage cases (e.g., first referral was lost to followup
-    # but the second one was successful). In these cases, the last referral
-    # status becomes the current status
-    fqhc_referrals = Referral.objects.filter(patient=pt, kind__is_fqhc=True)
-    referral_status_output = Referral.aggregate_referral_status(fqhc_referrals)
-
-    # Pass referral follow up set to page
-    referral_followups = PatientContact.objects.filter(patient=pt)
-    #Pass vaccine follow up set to page
-    vaccine_followups = VaccineFollowup.objects.filter(patient=pt)
-    total_followups = referral_followups.count() + len(pt.followup_set()) + vaccine_followups.count()
 
+def appointments_context(pt):
     appointments = Appointment.objects \
         .filter(patient=pt) \
         .order_by('clindate', 'clintime')
@@ -463,38 +485,162 @@ def patient_detail(request, pk):
         ['Future Appointments', 'Past Appointments'],
         [future_apt, previous_apt]))
 
+    return {'appointments_by_date': future_apt,
+            'zipped_apt_list': zipped_apt_list}
+
+
+# the sections of the patient chart that are cached, with the functions
+# computing their context
+CHART_SECTIONS = {
+    'referrals': referrals_context,
+    'notes': notes_context,
+    'action_items': action_items_context,
+    'appointments': appointments_context,
+}
+
+
+@conditional.conditional_page
+def patient_detail(request, pk):
+
+    pt = get_object_or_404(core_models.Patient, pk=pk)
+
+    # Sections are rendered separately so that they can be cached (see
+    # chart_cache). They depend on the date and on whether staff controls
+    # are shown, as well as on the patient's notes.
+    variant = "%s:%s" % (now().date().isoformat(),
+                         bool(request.session.get('staff_view')))
+
+    def render_section(section):
+        context = CHART_SECTIONS[section](pt)
+        context['patient'] = pt
+        return render_to_string('core/patient_detail/%s.html' % section,
+                                context, request)
+
+    sections = {
+        section: mark_safe(chart_cache.fragment(
+            pt.pk, section, variant, partial(render_section, section)))
+        for section in CHART_SECTIONS}
+
     return render(request,
                   'core/patient_detail.html',
-                  {'zipped_ai_list': zipped_ai_list,
-                   'total_ais': total_ais,
-                   'referral_status': referral_status_output,
-                   'referrals': referrals,
-                   'referral_followups': referral_followups,
-                   'vaccine_followups': vaccine_followups,
-                   'total_followups': total_followups,
-                   'patient': pt,
-                   'appointments_by_date': future_apt,
-                   'zipped_apt_list': zipped_apt_list})
+                  {'patient': pt,
+                   'sections': sections})
 
 
+def patient_timeline(request, pk):
+    '''All of a patient's notes, most recent first, a page at a time.'''
+
+    pt = get_object_or_404(core_models.Patient, pk=pk)
+
+    paginator = Paginator(pt.timeline_entries.all(),
+                          per_page=settings.OSLER_TIMELINE_ENTRIES_PER_PAGE)
+    page = request.GET.get('page')
+
+    try:
+        entries = paginator.page(page)
+    except PageNotAnInteger:
+        entries = paginator.page(1)
+    except EmptyPage:
+        entries = paginator.page(paginator.num_pages)
+
+    # link to the nearby pages only, since long charts have many
+    page_range = range(max(1, entries.number - 5),
+                       min(paginator.num_pages, entries.number + 5) + 1)
+
+    return render(request, 'core/patient_timeline.html',
+                  {'patient': pt,
+                   'object_list': entries,
+                   'page_range': page_range})
+
+
+def export_dataset(request, dataset):
+    '''Stream a dataset (see core.data_export) as CSV or JSON lines, given
+    by the format parameter. With deidentify=1, identifiers are removed.
+    Staff only.'''
+
+    if not get_current_provider_type(request).staff_view:
+        raise PermissionDenied
+
+    if dataset not in data_export.DATASETS:
+        raise Http404("No dataset '%s'." % dataset)
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in data_export.FORMATS:
+        raise Http404("No export format '%s'." % export_format)
+    deidentify = request.GET.get('deidentify') in ('1', 'true')
+
+    response = StreamingHttpResponse(
+        data_export.stream(data_export.DATASETS[dataset], export_format,
+                           deidentify),
+        content_type=('text/csv' if export_format == 'csv'
+                      else 'application/x-ndjson'))
+    response["Content-Disposition"] = 'attachment; filename="%s%s.%s"' % (
+        dataset, '-deidentified' if deidentify else '', export_format)
+
+    return response
+
+
+class PatientImport(FormView):
+    """Import patients in bulk from an uploaded CSV (see
+    core.patient_import), then list the rows that weren't imported.
+    Staff only."""
+    template_name = 'core/patient-import.html'
+    form_class = forms.PatientImportForm
+
+    def dispatch(self, request, *args, **kwargs):
+        if not get_current_provider_type(request).staff_view:
+            raise PermissionDenied
+        return super(PatientImport, self).dispatch(request, *args, **kwargs)
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # each batch of patients is committed as it's imported (see
+        # patient_import.import_patients), not all with the request
+        return transaction.non_atomic_requests(
+            super(PatientImport, cls).as_view(**initkwargs))
+
+    def form_valid(self, form):
+        csv_file = io.TextIOWrapper(form.cleaned_data['csv_file'],
+                                    encoding='utf-8-sig', newline='')
+        try:
+            result = patient_import.import_patients(
+                csv_file,
+                allow_duplicates=form.cleaned_data['allow_duplicates'],
+                dry_run=form.cleaned_data['dry_run'],
+                user=self.request.user)
+        except ValidationError as e:
+            form.add_error('csv_file', e)
+            return self.form_invalid(form)
+        except (UnicodeDecodeError, csv.Error) as e:
+            if isinstance(e, UnicodeDecodeError):
+                message = ("The file isn't UTF-8 text. Save it as "
+                           "\"CSV UTF-8\" and upload it again.")
+            else:
+                message = "The file isn't a valid CSV: %s." % e
+            if not form.cleaned_data['dry_run']:
+                message += (" Patients in the rows before the error may "
+                            "already have been imported.")
+            form.add_error('csv_file', message)
+            return self.form_invalid(form)
+
+        return self.render_to_response(self.get_context_data(
+            form=form, result=result, dry_run=form.cleaned_data['dry_run']))
+
+
+@conditional.conditional_page
 def all_patients(request):
     """
     Query is written to minimize hits to the database; number of db hits can be
         see on the django debug toolbar.
     """
-    patient_list = core_models.Patient.objects.all() \
+    patient_list = core_models.Patient.objects.with_history_dates() \
         .order_by('last_name') \
         .select_related('gender') \
+        .select_related('status_summary') \
         .prefetch_related('case_managers') \
         .prefetch_related(Prefetch(
             'workup_set',
             queryset=workupmodels.Workup.objects.order_by(
-                'clinic_day__clinic_date'))) \
-        .prefetch_related('actionitem_set')
-
-    # Don't know how to prefetch history
-    # https://stackoverflow.com/questions/45713517/use-prefetch-related-in-django-simple-history
-    # Source code is https://github.com/treyhunner/django-simple-history/blob/master/simple_history/models.py if we want to try to figure out
+                'clinic_day__clinic_date')))
 
     return render(request,
                   'core/all_patients.html',
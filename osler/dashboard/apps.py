@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class DashboardConfig(AppConfig):
     name = 'osler.dashboard'
     verbose_name = _("Dashboard")
+
+    def ready(self):
+        import osler.dashboard.signals  # noqa F401
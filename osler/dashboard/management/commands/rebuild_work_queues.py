@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from osler.dashboard.models import WorkQueueEntry
+
+
+class Command(BaseCommand):
+    help = '''Rebuild the work queues listed on the coordinator and
+    volunteer dashboards. Run after migrating, or after action items,
+    appointments, notes or case managers are changed in bulk in a way that
+    bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = WorkQueueEntry.objects.rebuild()
+        self.stdout.write("Rebuilt %s work queue entries." % n)
@@ -0,0 +1,47 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0007_actionitemnotification'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queue', models.CharField(choices=[('action_item', 'Action items'), ('case', 'Cases'), ('appointment', 'Appointments'), ('unsigned_note', 'Unsigned notes')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('date', models.DateField(blank=True, null=True)),
+                ('text', models.CharField(blank=True, max_length=200)),
+                ('url', models.CharField(blank=True, max_length=200)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.ContentType')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_queue_entries', to='core.Patient')),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_queue_entries', to='core.Provider')),
+            ],
+            options={
+                'verbose_name_plural': 'work queue entries',
+                'ordering': ['date', 'pk'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='workqueueentry',
+            index=models.Index(fields=['queue', 'date'], name='dashboard_queue_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workqueueentry',
+            index=models.Index(fields=['queue', 'provider', 'date'], name='dashboard_queue_provider_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workqueueentry',
+            index=models.Index(fields=['content_type', 'object_id'], name='dashboard_queue_object_idx'),
+        ),
+    ]
@@ -0,0 +1,204 @@
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.urls import reverse
+
+from osler.core.models import Patient, Provider, todo_models
+
+# Notes that wait in the unsigned queue until an attending signs them
+SIGNED_NOTES = [('workup', 'Workup'), ('workup', 'ProgressNote')]
+
+
+def signed_note_models():
+    return [apps.get_model(app, model) for app, model in SIGNED_NOTES]
+
+
+def queue_models():
+    """The models whose rows are listed on work queues."""
+    return ([Patient, apps.get_model('appointment', 'Appointment')] +
+            todo_models() + signed_note_models())
+
+
+def truncate(text, max_length):
+    if len(text) > max_length:
+        text = text[:max_length - 3] + "..."
+    return text
+
+
+class WorkQueueEntryManager(models.Manager):
+    """Maintains the WorkQueueEntry rows."""
+
+    def entries_for(self, obj, content_type=None):
+        """The unsaved entries listing obj: none, or one per queue (or,
+        for a patient's cases, per case manager) it belongs on."""
+
+        if content_type is None:
+            content_type = ContentType.objects.get_for_model(obj)
+
+        def entry(queue, **kwargs):
+            text_length = self.model._meta.get_field('text').max_length
+            kwargs['text'] = truncate(kwargs.get('text', ''), text_length)
+            return self.model(queue=queue, content_type=content_type,
+                              object_id=obj.pk, **kwargs)
+
+        model = type(obj)
+        Appointment = apps.get_model('appointment', 'Appointment')
+
+        if model is Patient:
+            return [entry(self.model.CASES, patient_id=obj.pk,
+                          provider_id=provider.pk, url=obj.detail_url())
+                    for provider in obj.case_managers.all()]
+
+        elif model is Appointment:
+            return [entry(self.model.APPOINTMENTS,
+                          patient_id=obj.patient_id,
+                          provider_id=obj.author_id,
+                          date=obj.clindate,
+                          text="%s at %s" % (obj.verbose_appointment_type(),
+                                             obj.clintime.strftime('%H:%M')),
+                          url=reverse('appointment-list'))]
+
+        elif model in todo_models():
+            if obj.completion_author_id is not None:
+                return []
+            return [entry(self.model.ACTION_ITEMS,
+                          patient_id=obj.patient_id,
+                          provider_id=obj.author_id,
+                          date=obj.due_date,
+                          text="%s: %s" % (obj.short_name(), obj.summary()),
+                          url=reverse('core:patient-detail',
+                                      args=(obj.patient_id,)))]
+
+        elif model in signed_note_models():
+            if obj.signer_id is not None:
+                return []
+            if hasattr(obj, 'clinic_day'):
+                date = obj.clinic_day.clinic_date
+            else:
+                date = obj.written_datetime.date()
+            return [entry(self.model.UNSIGNED_NOTES,
+                          patient_id=obj.patient_id,
+                          provider_id=obj.author_id,
+                          date=date,
+                          text=obj.short_text() or "",
+                          url=obj.detail_url())]
+
+        raise ValueError("%s isn't listed on work queues." % model.__name__)
+
+    def refresh(self, obj):
+        """Replace the entries of one object with its current ones."""
+
+        entries = self.entries_for(obj)
+        with transaction.atomic():
+            self.forget(obj)
+            self.bulk_create(entries)
+
+        return entries
+
+    def forget(self, obj):
+        """Delete the entries of an object, e.g. when it is deleted."""
+        self.get_queryset().filter(
+            content_type=ContentType.objects.get_for_model(obj),
+            object_id=obj.pk).delete()
+
+    def rebuild(self, batch_size=1000):
+        """Recreate every entry. Returns the number of entries written."""
+
+        self.get_queryset().delete()
+
+        count = 0
+        for model in queue_models():
+            content_type = ContentType.objects.get_for_model(model)
+
+            if model is Patient:
+                objects = model.objects \
+                    .exclude(case_managers=None) \
+                    .prefetch_related('case_managers')
+            elif model in todo_models():
+                objects = model.objects \
+                    .filter(completion_author=None) \
+                    .select_related(*[
+                        f.name for f in model._meta.concrete_fields
+                        if f.is_relation])
+            elif model in signed_note_models():
+                objects = model.objects.filter(signer=None)
+                if hasattr(model, 'clinic_day'):
+                    objects = objects.select_related('clinic_day')
+            else:
+                objects = model.objects.all()
+
+            batch = []
+            for obj in objects.order_by('pk'):
+                batch.extend(self.entries_for(obj, content_type))
+                if len(batch) >= batch_size:
+                    count += len(self.bulk_create(batch))
+                    batch = []
+            count += len(self.bulk_create(batch))
+
+        return count
+
+
+class WorkQueueEntry(models.Model):
+    """One row of a provider's work queue (an open action item, a case, an
+    appointment or an unsigned note), with what's needed to list it, so
+    that dashboards list each queue with one indexed query however large
+    the clinic is.
+
+    Rows are kept current by signals in osler.dashboard.signals.
+    """
+
+    ACTION_ITEMS = 'action_item'
+    CASES = 'case'
+    APPOINTMENTS = 'appointment'
+    UNSIGNED_NOTES = 'unsigned_note'
+    QUEUES = (
+        (ACTION_ITEMS, 'Action items'),
+        (CASES, 'Cases'),
+        (APPOINTMENTS, 'Appointments'),
+        (UNSIGNED_NOTES, 'Unsigned notes'),
+    )
+
+    class Meta(object):
+        ordering = ['date', 'pk']
+        verbose_name_plural = "work queue entries"
+        indexes = [
+            models.Index(fields=['queue', 'date'],
+                         name='dashboard_queue_date_idx'),
+            models.Index(fields=['queue', 'provider', 'date'],
+                         name='dashboard_queue_provider_idx'),
+            models.Index(fields=['content_type', 'object_id'],
+                         name='dashboard_queue_object_idx'),
+        ]
+
+    queue = models.CharField(max_length=20, choices=QUEUES)
+
+    # who the entry is for: the case manager of a case, otherwise the
+    # author of the item
+    provider = models.ForeignKey(
+        Provider,
+        blank=True, null=True,
+        related_name='work_queue_entries',
+        on_delete=models.CASCADE)
+    patient = models.ForeignKey(
+        Patient,
+        related_name='work_queue_entries',
+        on_delete=models.CASCADE)
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    item = GenericForeignKey('content_type', 'object_id')
+
+    # the due date of an action item, the date of an appointment, or the
+    # clinic day of an unsigned note
+    date = models.DateField(blank=True, null=True)
+    text = models.CharField(max_length=200, blank=True)
+    url = models.CharField(max_length=200, blank=True)
+
+    objects = WorkQueueEntryManager()
+
+    def __str__(self):
+        return "%s: %s for %s" % (self.get_queue_display(), self.text,
+                                  self.patient_id)
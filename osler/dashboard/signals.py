@@ -0,0 +1,43 @@
+'''Signal handlers that keep the work queues up to date.'''
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from osler.core.models import Patient
+from osler.dashboard.models import WorkQueueEntry, queue_models
+
+
+def refresh_work_queue_entries(sender, instance, raw=False, **kwargs):
+    '''Requeue an item (or take it off its queue, once it's done or
+    signed) whenever it's saved.'''
+    if not raw:
+        WorkQueueEntry.objects.refresh(instance)
+
+
+def forget_work_queue_entries(sender, instance, **kwargs):
+    WorkQueueEntry.objects.forget(instance)
+
+
+for model in queue_models():
+    if model is Patient:
+        # cases change with case_managers; see refresh_cases
+        continue
+    name = model._meta.label_lower
+    post_save.connect(refresh_work_queue_entries, sender=model,
+                      dispatch_uid='work_queue_save_%s' % name)
+    post_delete.connect(forget_work_queue_entries, sender=model,
+                        dispatch_uid='work_queue_delete_%s' % name)
+
+
+@receiver(m2m_changed, sender=Patient.case_managers.through)
+def refresh_cases(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Update the cases of each provider whose patients changed.'''
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            WorkQueueEntry.objects.refresh(instance)
+    elif action == 'pre_clear':
+        WorkQueueEntry.objects.filter(
+            queue=WorkQueueEntry.CASES, provider=instance).delete()
+    elif action in ('post_add', 'post_remove'):
+        for patient in Patient.objects.filter(pk__in=pk_set):
+            WorkQueueEntry.objects.refresh(patient)
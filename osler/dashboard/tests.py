@@ -3,16 +3,24 @@ from __future__ import unicode_literals
 
 from builtins import range
 import datetime
+from io import StringIO
 from django.utils.timezone import now
 
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
+from django.core.management import call_command
 
 from osler.core.tests.test_views import log_in_provider, build_provider
-from osler.core.models import (Gender, Patient, ContactMethod)
+from osler.core.models import (Gender, Patient, ContactMethod, ActionItem,
+                               ActionInstruction)
 
+from osler.appointment.models import Appointment
+from osler.dashboard.models import WorkQueueEntry
 from osler.workup.models import ClinicDate, ClinicType, Workup
+from osler.workup.tests import wu_dict
 
 
 def dewhitespace(s):
@@ -128,6 +136,66 @@ class TestAttendingDashboard(TestCase):
         # ONE of which are marked as unattested
         self.assertContains(response, '<tr  class="warning" >', count=1)
 
+    def add_workup(self, clinic_day, signed=False):
+        pt = Patient.objects.create(
+            first_name="John", last_name="Doe", middle_name="",
+            phone='454545', gender=Gender.objects.first(),
+            address='A', city='B', state='C',
+            zip_code='12345', pcp_preferred_zip='12345',
+            date_of_birth=datetime.date(1992, 4, 22),
+            patient_comfortable_with_english=False,
+            preferred_contact_method=ContactMethod.objects.first(),
+        )
+        wu = Workup.objects.create(
+            attending=self.attending,
+            clinic_day=clinic_day,
+            author=self.clinical_student,
+            author_type=self.clinical_student.clinical_roles.first(),
+            patient=pt,
+            **self.wu_info)
+        if signed:
+            wu.sign(self.attending.associated_user)
+            wu.save()
+        return wu
+
+    def test_clinic_day_summaries(self):
+        self.wu2.attending = self.attending
+        self.wu2.save()
+        self.add_workup(self.clinic_today)
+        self.add_workup(self.clinic_today, signed=True)
+
+        response = self.client.get(reverse('dashboard-attending'))
+
+        # several of the attending's workups on a day don't repeat it
+        self.assertEqual(len(response.context['clinics']), 1)
+        clinic_day = response.context['clinics'][0]
+        self.assertEqual(clinic_day.n_unsigned, 2)
+        self.assertEqual(len(clinic_day.workup_set.all()), 3)
+        self.assertContains(response, "2 unattested")
+
+    @override_settings(OSLER_CLINIC_DAYS_PER_PAGE=3)
+    def test_dashboard_queries(self):
+        '''The queries of the dashboard don't grow with the number of
+        clinic days or workups.'''
+        self.wu2.attending = self.attending
+        self.wu2.save()
+
+        self.client.get(reverse('dashboard-attending'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard-attending'))
+        n_queries = len(queries)
+
+        for i in range(5):
+            clinic_day = ClinicDate.objects.create(
+                clinic_date=datetime.date(2001, i + 1, 1),
+                clinic_type=ClinicType.objects.first())
+            for signed in [True, False]:
+                self.add_workup(clinic_day, signed)
+
+        with self.assertNumQueries(n_queries):
+            response = self.client.get(reverse('dashboard-attending'))
+        self.assertEqual(len(response.context['clinics']), 3)
+
     @override_settings(OSLER_CLINIC_DAYS_PER_PAGE=3)
     def test_dashboard_pagination(self):
         response = self.client.get(reverse('dashboard-attending'))
@@ -242,3 +310,157 @@ class TestAttendingDashboard(TestCase):
                     <span aria-hidden="true">&raquo;</span>
                 </a> </li>'''),
             dewhitespace(response.content.decode('utf-8')))
+
+
+class TestWorkQueueDashboards(TestCase):
+
+    fixtures = ['core', 'workup']
+
+    def setUp(self):
+        self.coordinator = build_provider(roles=["Coordinator"])
+        self.student = build_provider(roles=["Clinical"])
+        self.today = now().date()
+
+        self.pt = Patient.objects.first()
+        self.pt.case_managers.add(self.coordinator)
+
+        self.clinic_today = ClinicDate.objects.create(
+            clinic_type=ClinicType.objects.first(),
+            clinic_date=self.today)
+
+    def add_items(self, n=1):
+        '''Add n each of overdue action items, appointments today and
+        unsigned workups, written by the student.'''
+        items = []
+        for i in range(n):
+            items.append(ActionItem.objects.create(
+                instruction=ActionInstruction.objects.first(),
+                comments="Call about labs", due_date=self.today,
+                author=self.student,
+                author_type=self.student.clinical_roles.first(),
+                patient=self.pt))
+            items.append(Appointment.objects.create(
+                comment="Recheck BP", clindate=self.today,
+                author=self.student,
+                author_type=self.student.clinical_roles.first(),
+                patient=self.pt))
+            items.append(Workup.objects.create(**dict(
+                wu_dict(), clinic_day=self.clinic_today, author=self.student,
+                author_type=self.student.clinical_roles.first(),
+                patient=self.pt)))
+        return items
+
+    def queue(self, queue, **filters):
+        return list(WorkQueueEntry.objects.filter(queue=queue, **filters)
+                    .values_list('object_id', flat=True))
+
+    def test_refreshed_on_writes(self):
+        ai, appointment, wu = self.add_items()
+
+        self.assertEqual(self.queue(WorkQueueEntry.CASES,
+                                    provider=self.coordinator), [self.pt.pk])
+        self.assertEqual(self.queue(WorkQueueEntry.ACTION_ITEMS,
+                                    provider=self.student), [ai.pk])
+        self.assertEqual(self.queue(WorkQueueEntry.APPOINTMENTS,
+                                    date=self.today), [appointment.pk])
+        self.assertEqual(self.queue(WorkQueueEntry.UNSIGNED_NOTES,
+                                    provider=self.student), [wu.pk])
+
+        # done, signed and deleted items leave their queues
+        ai.mark_done(self.coordinator)
+        ai.save()
+        self.assertEqual(self.queue(WorkQueueEntry.ACTION_ITEMS), [])
+
+        attending = build_provider(roles=["Attending"])
+        wu.sign(attending.associated_user)
+        wu.save()
+        self.assertEqual(self.queue(WorkQueueEntry.UNSIGNED_NOTES), [])
+
+        appointment.delete()
+        self.assertEqual(self.queue(WorkQueueEntry.APPOINTMENTS), [])
+
+        # as do cases, from either side of case_managers
+        self.coordinator.patient_set.clear()
+        self.assertEqual(self.queue(WorkQueueEntry.CASES), [])
+        self.coordinator.patient_set.add(self.pt)
+        self.assertEqual(self.queue(WorkQueueEntry.CASES), [self.pt.pk])
+        self.pt.case_managers.remove(self.coordinator)
+        self.assertEqual(self.queue(WorkQueueEntry.CASES), [])
+
+    def test_rebuild(self):
+        self.add_items(2)
+
+        def entries():
+            return sorted(WorkQueueEntry.objects.values_list(
+                'queue', 'provider', 'patient', 'content_type', 'object_id',
+                'date', 'text', 'url'))
+
+        refreshed = entries()
+        out = StringIO()
+        call_command('rebuild_work_queues', stdout=out)
+        self.assertEqual(entries(), refreshed)
+        self.assertIn("Rebuilt 7 work queue entries.", out.getvalue())
+
+    def test_dispatch(self):
+        log_in_provider(self.client, self.coordinator)
+        self.assertRedirects(self.client.get(reverse('dashboard-dispatch')),
+                             reverse('dashboard-coordinator'))
+
+        log_in_provider(self.client, self.student)
+        self.assertRedirects(self.client.get(reverse('dashboard-dispatch')),
+                             reverse('dashboard-volunteer'))
+
+    def test_coordinator_dashboard(self):
+        ai, appointment, wu = self.add_items()
+        log_in_provider(self.client, self.coordinator)
+
+        response = self.client.get(reverse('dashboard-coordinator'))
+
+        queues = {q['title']: list(q['entries'])
+                  for q in response.context['queues']}
+        # the overdue items of the coordinator's cases are theirs, too
+        self.assertEqual([e.object_id for e in
+                          queues["Overdue Action Items"]], [ai.pk])
+        self.assertEqual([e.patient for e in queues["My Cases"]], [self.pt])
+        self.assertEqual([e.object_id for e in
+                          queues["Today's Appointments"]], [appointment.pk])
+        self.assertEqual([e.object_id for e in queues["Unsigned Notes"]],
+                         [wu.pk])
+        self.assertContains(response, wu.detail_url())
+
+    def test_volunteer_dashboard(self):
+        ai, appointment, wu = self.add_items()
+        log_in_provider(self.client, self.student)
+
+        response = self.client.get(reverse('dashboard-volunteer'))
+        queues = {q['title']: list(q['entries'])
+                  for q in response.context['queues']}
+        self.assertEqual([e.object_id for e in
+                          queues["My Overdue Action Items"]], [ai.pk])
+        self.assertEqual([e.object_id for e in queues["My Unsigned Notes"]],
+                         [wu.pk])
+
+        # other volunteers' items aren't theirs
+        log_in_provider(self.client, build_provider(roles=["Clinical"]))
+        response = self.client.get(reverse('dashboard-volunteer'))
+        queues = {q['title']: list(q['entries'])
+                  for q in response.context['queues']}
+        self.assertEqual(queues["My Overdue Action Items"], [])
+        self.assertEqual(queues["My Unsigned Notes"], [])
+
+    def test_dashboard_queries(self):
+        '''The queries of the dashboards don't grow with the number of
+        items in their queues.'''
+        self.add_items()
+
+        for provider, url in [(self.coordinator, 'dashboard-coordinator'),
+                              (self.student, 'dashboard-volunteer')]:
+            log_in_provider(self.client, provider)
+            self.client.get(reverse(url))
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(url))
+            n_queries = len(queries)
+
+            self.add_items(5)
+            with self.assertNumQueries(n_queries):
+                self.client.get(reverse(url))
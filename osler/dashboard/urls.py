@@ -11,6 +11,12 @@ unwrapped_urlconf = [
     path(r'attending/',
          views.dashboard_attending,
          name='dashboard-attending'),
+    path(r'coordinator/',
+         views.dashboard_coordinator,
+         name='dashboard-coordinator'),
+    path(r'volunteer/',
+         views.dashboard_volunteer,
+         name='dashboard-volunteer'),
 ]
 
 urlpatterns = [wrap_url(u, **{}) for u in unwrapped_urlconf]
@@ -4,9 +4,12 @@ from __future__ import unicode_literals, print_function
 from django.shortcuts import render, redirect
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.conf import settings
+from django.db.models import Count, Prefetch, Q
+from django.utils.timezone import now
 
-from osler.workup.models import ClinicDate
-from osler.core.models import Patient
+from osler.workup.models import ClinicDate, Workup
+from osler.core.models import Patient, history_subquery
+from osler.dashboard.models import WorkQueueEntry
 
 
 def dashboard_dispatch(request):
@@ -25,10 +28,31 @@ def dashboard_dispatch(request):
 
 
 def dashboard_attending(request):
+    """The clinic days on which the logged in provider attended, newest
+    first, with all of their workups.
+
+    Each page is read with a fixed number of queries: the clinic days,
+    with their number of unattested workups annotated, and one query for
+    all of their workups, with the people named on them joined and when
+    each patient was first seen annotated.
+    """
 
     provider = request.user.provider
 
-    clinic_list = ClinicDate.objects.filter(workup__attending=provider)
+    workups = Workup.objects \
+        .select_related('patient', 'attending', 'author', 'signer') \
+        .annotate(patient_first_history_date=history_subquery(
+            Patient, 'history_date', outer_ref='patient')) \
+        .order_by('pk')
+
+    clinic_list = ClinicDate.objects \
+        .filter(pk__in=Workup.objects.filter(attending=provider)
+                .values('clinic_day')) \
+        .select_related('clinic_type') \
+        .annotate(n_unsigned=Count('workup',
+                                   filter=Q(workup__signer=None))) \
+        .order_by('-clinic_date', '-pk') \
+        .prefetch_related(Prefetch('workup_set', queryset=workups))
 
     paginator = Paginator(clinic_list, settings.OSLER_CLINIC_DAYS_PER_PAGE,
                           allow_empty_first_page=True)
@@ -43,10 +67,75 @@ def dashboard_attending(request):
         # If page is out of range (e.g. 9999), deliver last page of results.
         clinics = paginator.page(paginator.num_pages)
 
-    no_note_patients = Patient.objects.filter(workup=None).order_by('-pk')[:20]
+    no_note_patients = Patient.objects.with_history_dates() \
+        .filter(workup=None).order_by('-pk')[:20]
 
     return render(request,
                   'dashboard/dashboard-attending.html',
                   {'clinics': clinics,
                    'no_note_patients': no_note_patients
                    })
+
+
+def work_queue(queue, *args, **filters):
+    """The first OSLER_WORK_QUEUE_LENGTH entries of a work queue matching
+    filters."""
+    return WorkQueueEntry.objects \
+        .filter(*args, queue=queue, **filters) \
+        .select_related('patient', 'provider') \
+        .order_by('date', 'pk')[:settings.OSLER_WORK_QUEUE_LENGTH]
+
+
+def dashboard_coordinator(request):
+    """The coordinator's work queues: overdue action items of their cases
+    (or that they wrote), their cases, today's appointments, and every
+    unsigned note. Each queue is one query of WorkQueueEntry."""
+
+    provider = request.user.provider
+    today = now().date()
+
+    cases = WorkQueueEntry.objects.filter(
+        queue=WorkQueueEntry.CASES, provider=provider)
+
+    queues = [
+        {'title': "Overdue Action Items",
+         'entries': work_queue(
+             WorkQueueEntry.ACTION_ITEMS,
+             Q(provider=provider) | Q(patient__in=cases.values('patient')),
+             date__lte=today)},
+        {'title': "My Cases",
+         'entries': cases
+            .select_related('patient', 'patient__status_summary')
+            .order_by('patient__last_name', 'patient__first_name')
+            [:settings.OSLER_WORK_QUEUE_LENGTH],
+         'show_status': True},
+        {'title': "Today's Appointments",
+         'entries': work_queue(WorkQueueEntry.APPOINTMENTS, date=today)},
+        {'title': "Unsigned Notes",
+         'entries': work_queue(WorkQueueEntry.UNSIGNED_NOTES)},
+    ]
+
+    return render(request, 'dashboard/dashboard-work-queues.html',
+                  {'title': "Coordinator Dashboard", 'queues': queues})
+
+
+def dashboard_volunteer(request):
+    """A volunteer's work queues: their overdue action items, today's
+    appointments, and the notes they wrote that aren't yet signed."""
+
+    provider = request.user.provider
+    today = now().date()
+
+    queues = [
+        {'title': "My Overdue Action Items",
+         'entries': work_queue(WorkQueueEntry.ACTION_ITEMS,
+                               provider=provider, date__lte=today)},
+        {'title': "Today's Appointments",
+         'entries': work_queue(WorkQueueEntry.APPOINTMENTS, date=today)},
+        {'title': "My Unsigned Notes",
+         'entries': work_queue(WorkQueueEntry.UNSIGNED_NOTES,
+                               provider=provider)},
+    ]
+
+    return render(request, 'dashboard/dashboard-work-queues.html',
+                  {'title': "Volunteer Dashboard", 'queues': queues})
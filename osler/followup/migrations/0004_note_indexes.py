@@ -0,0 +1,29 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('followup', '0003_auto_20200509_2315'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionitemfollowup',
+            index=models.Index(fields=['patient', '-written_datetime'], name='followup_ac_patient_c13f73_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='actionitemfollowup',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='followup_ac_written_3110b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labfollowup',
+            index=models.Index(fields=['patient', '-written_datetime'], name='followup_la_patient_f7f0d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labfollowup',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='followup_la_written_8f381c_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 '''The datamodels for various types required for followup tracking in Osler.'''
 from django.db import models
+from django.urls import reverse
 from osler.core.models import (Note, ContactMethod,
                                   ReferralType, ReferralLocation, ActionItem)
 
@@ -48,6 +49,7 @@ class Followup(Note):
 
     class Meta(object):
         abstract = True
+        indexes = Note.Meta.indexes
 
     contact_method = models.ForeignKey(
         ContactMethod, on_delete=models.PROTECT)
@@ -101,6 +103,10 @@ class ActionItemFollowup(Followup):
     def type(self):
         return "Action Item"
 
+    def detail_url(self):
+        return reverse('followup',
+                       kwargs={'pk': self.pk, 'model': self.type()})
+
 
 class LabFollowup(Followup):
     '''Datamodel for a follow up for lab results.'''
@@ -114,6 +120,10 @@ class LabFollowup(Followup):
     def type(self):
         return "Lab"
 
+    def detail_url(self):
+        return reverse('followup',
+                       kwargs={'pk': self.pk, 'model': self.type()})
+
     def short_text(self):
         return ("successfully reached" if self.communication_success else
                 "failed to reach") + " patient regarding lab results."
@@ -0,0 +1,30 @@
+from __future__ import unicode_literals
+from django.contrib import admin
+
+from .models import Job
+
+
+def retry(modeladmin, request, queryset):
+    queryset.filter(status=Job.FAILED).update(
+        status=Job.QUEUED, attempts=0, finished=None)
+
+
+retry.short_description = "Retry selected failed jobs"
+
+
+class JobAdmin(admin.ModelAdmin):
+    actions = [retry]
+
+    list_filter = ('status', 'name')
+    list_display = ('name', 'status', 'attempts', 'created', 'run_after',
+                    'finished', 'worker')
+    search_fields = ('name', 'error')
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+from django.utils.translation import gettext_lazy as _
+
+
+class JobsConfig(AppConfig):
+    name = 'osler.jobs'
+    verbose_name = _("Jobs")
+
+    def ready(self):
+        # register the tasks defined in each app's tasks module
+        autodiscover_modules('tasks')
@@ -0,0 +1,52 @@
+import datetime
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.timezone import now
+
+from osler.jobs import queue
+from osler.jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = '''Run background jobs as they come due, until interrupted.
+    Run one or more of these alongside the web server.'''
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit once no jobs are due, instead of waiting for more.")
+        parser.add_argument(
+            '--sleep', type=float, default=settings.OSLER_JOBS_POLL_INTERVAL,
+            help="Seconds to wait between checks for jobs. Defaults to "
+                 "OSLER_JOBS_POLL_INTERVAL.")
+
+    def handle(self, *args, **options):
+        worker = '%s:%s' % (socket.gethostname(), os.getpid())
+
+        Job.objects.purge(
+            now() - datetime.timedelta(days=settings.OSLER_JOBS_KEEP_DAYS))
+
+        n_run = n_failed = 0
+        try:
+            while True:
+                close_old_connections()
+                Job.objects.requeue_stale(now() - datetime.timedelta(
+                    seconds=settings.OSLER_JOBS_TIMEOUT))
+
+                job = queue.run_next(worker)
+                if job is not None:
+                    n_run += 1
+                    n_failed += job.status != Job.SUCCEEDED
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write("Ran %s jobs (%s failed)." % (n_run, n_failed))
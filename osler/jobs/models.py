@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+import json
+
+from django.db import models
+from django.db.models import F
+from django.utils.timezone import now
+
+
+class JobManager(models.Manager):
+
+    def claim(self, worker):
+        '''Mark the next job that is due as running on worker, and return
+        it (or None if no job is due). Jobs are claimed with a conditional
+        update, so two workers never claim the same job.'''
+
+        due = self.get_queryset() \
+            .filter(status=Job.QUEUED, run_after__lte=now()) \
+            .order_by('run_after', 'pk') \
+            .values_list('pk', flat=True)
+
+        for pk in due[:10]:
+            claimed = self.get_queryset() \
+                .filter(pk=pk, status=Job.QUEUED) \
+                .update(status=Job.RUNNING, worker=worker, started=now(),
+                        attempts=F('attempts') + 1)
+            if claimed:
+                return self.get_queryset().get(pk=pk)
+
+        return None
+
+    def requeue_stale(self, started_before):
+        '''Queue again the jobs whose workers seem to have died while
+        running them, unless they have used up their attempts (counted as
+        they were claimed), in which case they fail, so that a job that
+        kills its worker isn't run forever. Returns the number
+        requeued.'''
+
+        stale = self.get_queryset() \
+            .filter(status=Job.RUNNING, started__lt=started_before)
+
+        stale.filter(attempts__gte=F('max_attempts')) \
+            .update(status=Job.FAILED, finished=now(),
+                    error="The worker running this job stopped.")
+        return stale.filter(attempts__lt=F('max_attempts')) \
+            .update(status=Job.QUEUED, run_after=now())
+
+    def purge(self, finished_before):
+        '''Delete the jobs that succeeded before finished_before.'''
+        return self.get_queryset() \
+            .filter(status=Job.SUCCEEDED, finished__lt=finished_before) \
+            .delete()[0]
+
+
+class Job(models.Model):
+    '''A call of a task (see jobs.queue) to be run by a worker.'''
+
+    class Meta(object):
+        indexes = [models.Index(fields=['status', 'run_after'],
+                                name='jobs_status_run_after_idx')]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [QUEUED, RUNNING, SUCCEEDED, FAILED]
+
+    name = models.CharField(max_length=200)
+    # JSON-encoded arguments of the task
+    args = models.TextField(default='[]')
+    kwargs = models.TextField(default='{}')
+
+    status = models.CharField(
+        max_length=max(len(s) for s in STATUSES),
+        choices=[(s, s) for s in STATUSES],
+        default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # the error of the last failed attempt
+    error = models.TextField(blank=True)
+
+    created = models.DateTimeField(default=now)
+    run_after = models.DateTimeField(default=now)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    objects = JobManager()
+
+    def get_args(self):
+        return json.loads(self.args)
+
+    def get_kwargs(self):
+        return json.loads(self.kwargs)
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.name, self.pk, self.status)
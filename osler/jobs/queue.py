@@ -0,0 +1,120 @@
+'''A queue of background jobs, stored in the database.
+
+Slow work (rendering PDFs, sending email, archiving audit records) is
+defined as tasks with the task decorator, in the tasks module of an app.
+Calling task.delay(*args, **kwargs) saves a Job, which a worker (the
+run_jobs command) runs later, retrying it up to its max_attempts times
+with exponential backoff. Arguments must be JSON-serializable, so pass
+pks rather than model instances.
+
+With OSLER_JOBS_EAGER (as in tests), jobs run as soon as they're queued,
+in the queueing process, and errors are raised to the caller.
+'''
+from __future__ import unicode_literals
+import datetime
+import json
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from osler.jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class Task(object):
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        '''Queue a call of this task. Returns the Job.'''
+        return enqueue(self.name, args, kwargs, self.max_attempts)
+
+
+def task(name, max_attempts=3):
+    '''Register a function as the task called name.'''
+
+    def register(func):
+        if name in registry:
+            raise ValueError("Task '%s' is already registered." % name)
+        registry[name] = Task(func, name, max_attempts)
+        return registry[name]
+
+    return register
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=3):
+    if name not in registry:
+        raise ValueError("No task '%s' is registered." % name)
+
+    job = Job.objects.create(name=name, args=json.dumps(list(args)),
+                             kwargs=json.dumps(kwargs or {}),
+                             max_attempts=max_attempts)
+
+    if settings.OSLER_JOBS_EAGER:
+        job.status = Job.RUNNING
+        job.attempts = 1
+        job.started = now()
+        run_job(job, raise_errors=True)
+
+    return job
+
+
+def retry_delay(attempts):
+    '''How long to wait before retrying a job that has failed attempts
+    times.'''
+    return datetime.timedelta(
+        seconds=settings.OSLER_JOBS_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def run_job(job, raise_errors=False):
+    '''Run a claimed job, recording whether it succeeded. Returns True if
+    it did.'''
+
+    try:
+        # a failed task's writes are rolled back, so retrying is safe
+        with transaction.atomic():
+            registry[job.name](*job.get_args(), **job.get_kwargs())
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts and not raise_errors:
+            job.status = Job.QUEUED
+            job.run_after = now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished = now()
+        job.save()
+
+        logger.exception("Job %s failed (attempt %s of %s).",
+                         job, job.attempts, job.max_attempts)
+        if raise_errors:
+            raise
+        return False
+
+    job.status = Job.SUCCEEDED
+    job.finished = now()
+    job.error = ''
+    job.save()
+
+    return True
+
+
+def run_next(worker):
+    '''Claim and run the next job that is due. Returns the job, or None if
+    no job is due.'''
+
+    job = Job.objects.claim(worker)
+    if job is not None:
+        run_job(job)
+    return job
@@ -0,0 +1,148 @@
+from __future__ import unicode_literals
+from io import StringIO
+import datetime
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from osler.core.models import Patient
+
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.task('jobs.test_record')
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@queue.task('jobs.test_fail', max_attempts=2)
+def fail():
+    # writes of failed jobs are rolled back
+    Patient.objects.all().delete()
+    raise RuntimeError("task failed")
+
+
+class TestEagerJobs(TestCase):
+
+    def setUp(self):
+        del calls[:]
+
+    def test_runs_immediately(self):
+        job = record.delay(1, 'a', b=2)
+
+        self.assertEqual(calls, [((1, 'a'), {'b': 2})])
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.SUCCEEDED)
+
+    def test_errors_raised(self):
+        with self.assertRaises(RuntimeError):
+            fail.delay()
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("task failed", job.error)
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue('jobs.no_such_task')
+
+
+@override_settings(OSLER_JOBS_EAGER=False)
+class TestQueuedJobs(TestCase):
+
+    fixtures = ['core']
+
+    def setUp(self):
+        del calls[:]
+
+    def run_jobs(self):
+        out = StringIO()
+        call_command('run_jobs', once=True, stdout=out)
+        return out.getvalue()
+
+    def test_worker_runs_jobs(self):
+        record.delay(1)
+        record.delay(2)
+        self.assertEqual(calls, [])
+
+        self.assertIn("Ran 2 jobs (0 failed)", self.run_jobs())
+        self.assertEqual(calls, [((1,), {}), ((2,), {})])
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 2)
+
+        self.assertIn("Ran 0 jobs", self.run_jobs())
+
+    def test_retry_then_fail(self):
+        n_patients = Patient.objects.count()
+        job = fail.delay()
+
+        self.assertIn("Ran 1 jobs (1 failed)", self.run_jobs())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, now())
+        self.assertEqual(Patient.objects.count(), n_patients)
+
+        # not due until the retry delay has passed
+        self.assertIn("Ran 0 jobs", self.run_jobs())
+
+        Job.objects.update(run_after=now())
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_claim(self):
+        job = record.delay()
+
+        self.assertEqual(Job.objects.claim('a'), job)
+        self.assertIsNone(Job.objects.claim('b'))
+
+        claimed = Job.objects.get(pk=job.pk)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertEqual(claimed.worker, 'a')
+        self.assertEqual(claimed.attempts, 1)
+
+    def test_requeue_stale(self):
+        job = record.delay()
+        Job.objects.claim('a')
+
+        self.assertEqual(Job.objects.requeue_stale(
+            now() - datetime.timedelta(hours=1)), 0)
+        self.assertEqual(Job.objects.requeue_stale(now()), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    def test_requeue_stale_out_of_attempts(self):
+        # every attempt kills its worker
+        job = fail.delay()
+        for attempt in range(job.max_attempts):
+            self.assertEqual(Job.objects.claim('a'), job)
+            Job.objects.requeue_stale(now())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIsNone(Job.objects.claim('a'))
+
+    def test_purge(self):
+        record.delay()
+        self.run_jobs()
+
+        Job.objects.purge(now() - datetime.timedelta(days=1))
+        self.assertEqual(Job.objects.count(), 1)
+        Job.objects.purge(now() + datetime.timedelta(seconds=1))
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_send_email(self):
+        from osler.core.tasks import send_email
+
+        send_email.delay("Subject", "Body", None, ['a@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.run_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com'])
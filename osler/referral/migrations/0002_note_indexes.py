@@ -0,0 +1,45 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('referral', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='followuprequest',
+            index=models.Index(fields=['patient', '-written_datetime'], name='referral_fo_patient_1a7f34_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='followuprequest',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='referral_fo_written_9ff21d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='followuprequest',
+            index=models.Index(fields=['patient', 'completion_author', 'due_date'], name='referral_fo_patient_b8cf29_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='followuprequest',
+            index=models.Index(fields=['completion_author', 'due_date'], name='referral_fo_complet_cda705_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientcontact',
+            index=models.Index(fields=['patient', '-written_datetime'], name='referral_pa_patient_7876b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientcontact',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='referral_pa_written_86a01e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['patient', '-written_datetime'], name='referral_re_patient_baa27e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='referral',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='referral_re_written_66f0f5_idx'),
+        ),
+    ]
@@ -70,6 +70,9 @@ class Referral(Note):
 
 class FollowupRequest(Note, CompletableMixin):
 
+    class Meta(Note.Meta):
+        indexes = Note.Meta.indexes + CompletableMixin.Meta.indexes
+
     referral = models.ForeignKey(
         Referral,
         on_delete=models.CASCADE)
@@ -89,7 +92,7 @@ class FollowupRequest(Note, CompletableMixin):
 
     def mark_done_url(self):
         return reverse(self.MARK_DONE_URL_NAME,
-                       args=(self.referral.patient.id,
+                       args=(self.referral.patient_id,
                              self.referral.id,
                              self.id))
 
@@ -4,4 +4,7 @@ from django.utils.translation import gettext_lazy as _
 
 class VaccineConfig(AppConfig):
     name = "osler.vaccine"
-    verbose_name = _("Vaccine")
\ No newline at end of file
+    verbose_name = _("Vaccine")
+
+    def ready(self):
+        import osler.vaccine.signals  # noqa F401
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from osler.vaccine.schedule import Schedule
+
+
+class Command(BaseCommand):
+    help = '''Recompute when the next dose of every vaccine series (and
+    after every dose given) is due. Run after migrating, or after doses
+    or dose types are changed in bulk in a way that bypasses signals.'''
+
+    def handle(self, *args, **options):
+        n = Schedule().rebuild()
+        self.stdout.write("Rescheduled %s vaccine series." % n)
@@ -0,0 +1,53 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0002_vaccineactionitem_vaccinefollowup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaccineactionitem',
+            index=models.Index(fields=['patient', '-written_datetime'], name='vaccine_vac_patient_80cacb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineactionitem',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='vaccine_vac_written_2a0625_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineactionitem',
+            index=models.Index(fields=['patient', 'completion_author', 'due_date'], name='vaccine_vac_patient_93c9df_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineactionitem',
+            index=models.Index(fields=['completion_author', 'due_date'], name='vaccine_vac_complet_fbaa44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinedose',
+            index=models.Index(fields=['patient', '-written_datetime'], name='vaccine_vac_patient_778b77_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinedose',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='vaccine_vac_written_eab6d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinefollowup',
+            index=models.Index(fields=['patient', '-written_datetime'], name='vaccine_vac_patient_6b331e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccinefollowup',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='vaccine_vac_written_7b573c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineseries',
+            index=models.Index(fields=['patient', '-written_datetime'], name='vaccine_vac_patient_e6abf4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineseries',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='vaccine_vac_written_f1e922_idx'),
+        ),
+    ]
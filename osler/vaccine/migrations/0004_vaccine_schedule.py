@@ -0,0 +1,23 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccine', '0003_note_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccinedose',
+            name='next_dose_due',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vaccineseries',
+            name='next_due_date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
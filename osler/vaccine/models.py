@@ -16,20 +16,18 @@ class VaccineSeriesType(models.Model):
         '''Return queryset of all VaccineDoseTypes for this VaccineSeriesType'''
         return VaccineDoseType.objects.filter(kind=self).order_by('time_from_first')
 
+    def ladder(self):
+        '''Return the DoseLadder of this VaccineSeriesType'''
+        from osler.vaccine.schedule import Schedule
+        return Schedule().ladder(self.pk)
+
     def last_dose(self):
         '''Return VaccineDoseType object that is last dose in this VaccineSeriesType'''
-        return self.doses().reverse()[0]
+        return self.ladder().last()
 
     def next_dose(self, dose):
         '''Takes VaccineDoseType and returns next in this VaccineSeriesType or None if last'''
-        if dose==self.last_dose():
-            return None
-        else:
-            #Please change if you have a more elegant way of doing
-            #Hypothetically shouldn't take forever to query db since shouldn't be too many doses
-            for index, item in enumerate(self.doses()):
-                if dose==item:
-                    return self.doses()[index+1]
+        return self.ladder().next(dose.pk)
 
     def __str__(self):
         return self.name
@@ -59,15 +57,17 @@ class VaccineSeries(Note):
     kind = models.ForeignKey(VaccineSeriesType, on_delete=models.PROTECT,
         help_text='What kind of vaccine are you administering?')
 
+    # when the dose after the furthest one given is due, kept by
+    # osler.vaccine.schedule
+    next_due_date = models.DateField(blank=True, null=True, db_index=True,
+                                     editable=False)
+
     def doses(self):
         '''Return queryset of all VaccineDose for this VaccineSeries'''
         return VaccineDose.objects.filter(series=self).order_by('written_datetime')
 
     def first_dose(self):
-        if not self.doses():
-            return None
-        else:
-            return self.doses()[0]
+        return self.doses().first()
 
     def __str__(self):
         return str(self.kind)
@@ -80,20 +80,19 @@ class VaccineDose(Note):
         help_text='Which vaccine is this?')
     which_dose = models.ForeignKey(VaccineDoseType, on_delete=models.PROTECT)
 
+    # kept by osler.vaccine.schedule
+    next_dose_due = models.DateTimeField(blank=True, null=True,
+                                         editable=False)
+
     def is_last(self):
         '''Return True if this dose is last dose in the series'''
-        return self.which_dose==self.series.kind.last_dose()
+        from osler.vaccine.schedule import Schedule
+        return Schedule().ladder(self.series.kind_id).is_last(
+            self.which_dose_id)
 
     def next_due_date(self):
         '''Return DateTime object of next dose due date or None is last dose'''
-        if self.is_last():
-            return None
-        else:
-            #Please change if you have a more elegant way of doing
-            first = self.series.first_dose() #First VaccineDose in this series
-            next = self.series.kind.next_dose(self.which_dose) #Next VaccineDoseType
-            next_due=first.written_datetime+next.time_from_first
-            return next_due
+        return self.next_dose_due
 
     def __str__(self):
         return str(self.which_dose)
@@ -0,0 +1,167 @@
+'''The vaccine schedule: when the next dose of each patient's vaccine
+series is due.
+
+The dose types of a series type, ordered by their time from the first
+dose, form its dose ladder. After a dose is given, the next dose on the
+ladder is due its time_from_first after the series' first dose (the
+earliest given); after the last, none is. A Schedule reads the ladder of
+each series type once, and schedules all the doses of a series in one
+pass over them.
+
+Due dates are stored rather than worked out whenever they're shown: on
+each dose, as next_dose_due, and on each series, as next_due_date, the
+date the dose after the furthest one given is due. The latter is what
+patients_due_between reads, in a single query. Both are kept current by
+the signal handlers in osler.vaccine.signals, and can be rebuilt with
+the rebuild_vaccine_schedules command.
+'''
+from __future__ import unicode_literals
+from collections import defaultdict
+
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import localdate
+
+from osler.core.models import Patient
+from osler.vaccine.models import VaccineDose, VaccineDoseType, VaccineSeries
+
+
+class DoseLadder(object):
+    '''The dose types of a series type, in the order they're given.'''
+
+    def __init__(self, dose_types):
+        self.dose_types = sorted(dose_types,
+                                 key=lambda d: (d.time_from_first, d.pk))
+        self.positions = {d.pk: i for i, d in enumerate(self.dose_types)}
+
+    def position(self, dose_type_id):
+        '''Where dose_type_id is on the ladder, or -1 if it isn't.'''
+        return self.positions.get(dose_type_id, -1)
+
+    def next(self, dose_type_id):
+        '''The dose type after dose_type_id, or None if it's the last.'''
+        position = self.position(dose_type_id)
+        if position < 0 or position + 1 == len(self.dose_types):
+            return None
+        return self.dose_types[position + 1]
+
+    def is_last(self, dose_type_id):
+        return self.next(dose_type_id) is None
+
+    def last(self):
+        return self.dose_types[-1]
+
+
+class Schedule(object):
+    '''Schedules the doses of vaccine series, reading the ladder of each
+    series type only once.'''
+
+    def __init__(self):
+        self.ladders = {}
+
+    def load(self, series_type_ids=None):
+        '''Read the ladders of series_type_ids, or of every series type,
+        in one query.'''
+
+        dose_types = VaccineDoseType.objects.all()
+        by_type = defaultdict(list)
+        if series_type_ids is not None:
+            dose_types = dose_types.filter(kind__in=series_type_ids)
+            for series_type_id in series_type_ids:
+                by_type[series_type_id] = []
+
+        for dose_type in dose_types:
+            by_type[dose_type.kind_id].append(dose_type)
+
+        for series_type_id, ladder in by_type.items():
+            self.ladders[series_type_id] = DoseLadder(ladder)
+
+    def ladder(self, series_type_id):
+        if series_type_id not in self.ladders:
+            self.load([series_type_id])
+        return self.ladders[series_type_id]
+
+    def schedule(self, series, doses):
+        '''Set next_dose_due on each of doses, all the doses given in
+        series, and next_due_date on series. Returns the doses whose due
+        date changed.'''
+
+        ladder = self.ladder(series.kind_id)
+        doses = sorted(doses, key=lambda d: (d.written_datetime, d.pk))
+
+        changed = []
+        furthest = None
+        for dose in doses:
+            next_type = ladder.next(dose.which_dose_id)
+            due = None
+            if next_type is not None:
+                due = doses[0].written_datetime + next_type.time_from_first
+
+            if dose.next_dose_due != due:
+                dose.next_dose_due = due
+                changed.append(dose)
+
+            if furthest is None or ladder.position(dose.which_dose_id) > \
+                    ladder.position(furthest.which_dose_id):
+                furthest = dose
+
+        series.next_due_date = None
+        if furthest is not None and furthest.next_dose_due is not None:
+            series.next_due_date = localdate(furthest.next_dose_due)
+
+        return changed
+
+    def refresh(self, series, dose=None):
+        '''Reschedule series (a VaccineSeries or its pk). If dose, one of
+        its doses, is given, its due date is set on it too.'''
+
+        if not isinstance(series, VaccineSeries):
+            series = VaccineSeries.objects.only('kind') \
+                .filter(pk=series).first()
+            if series is None:
+                # being deleted, along with its doses
+                return
+
+        doses = [d for d in VaccineDose.objects.filter(series=series)
+                 .only('written_datetime', 'which_dose', 'next_dose_due')
+                 if dose is None or d.pk != dose.pk]
+        if dose is not None and dose.pk is not None:
+            doses.append(dose)
+
+        changed = self.schedule(series, doses)
+        if changed:
+            VaccineDose.objects.bulk_update(changed, ['next_dose_due'])
+        VaccineSeries.objects.filter(pk=series.pk).update(
+            next_due_date=series.next_due_date)
+
+    def rebuild(self, queryset=None, batch_size=500):
+        '''Reschedule every series in queryset (by default, all of them).
+        Returns the number of series.'''
+
+        if queryset is None:
+            queryset = VaccineSeries.objects.all()
+            self.load()
+
+        series_list = list(
+            queryset.only('kind', 'next_due_date').prefetch_related(
+                'vaccinedose_set'))
+        changed = []
+        for series in series_list:
+            changed.extend(
+                self.schedule(series, series.vaccinedose_set.all()))
+
+        VaccineDose.objects.bulk_update(changed, ['next_dose_due'],
+                                        batch_size=batch_size)
+        VaccineSeries.objects.bulk_update(series_list, ['next_due_date'],
+                                          batch_size=batch_size)
+        return len(series_list)
+
+
+def patients_due_between(start, end, queryset=None):
+    '''The patients (of queryset, by default all of them) with a series
+    whose next dose is due between start and end, inclusive.'''
+
+    if queryset is None:
+        queryset = Patient.objects.all()
+
+    return queryset.filter(Exists(VaccineSeries.objects.filter(
+        patient=OuterRef('pk'), next_due_date__range=(start, end))))
@@ -0,0 +1,44 @@
+'''Signal handlers that keep the vaccine schedule (see
+osler.vaccine.schedule) up to date.'''
+from django.db.models.signals import post_save, post_delete
+
+from osler.vaccine.models import VaccineDose, VaccineDoseType, VaccineSeries
+from osler.vaccine.schedule import Schedule
+
+
+def reschedule_dose(sender, instance, raw=False, **kwargs):
+    '''Reschedule the series of a dose whenever it's given (setting the
+    dose's own due date too) or changed.'''
+    if not raw:
+        Schedule().refresh(instance.series_id, dose=instance)
+
+
+def reschedule_deleted_dose(sender, instance, **kwargs):
+    Schedule().refresh(instance.series_id)
+
+
+def reschedule_series(sender, instance, created=False, raw=False,
+                      **kwargs):
+    '''A series has no doses when it's made, but its kind can change.'''
+    if not raw and not created:
+        Schedule().refresh(instance)
+
+
+def reschedule_series_type(sender, instance, raw=False, **kwargs):
+    '''Reschedule every series of a dose type's series type whenever its
+    ladder changes.'''
+    if not raw:
+        Schedule().rebuild(
+            VaccineSeries.objects.filter(kind=instance.kind_id))
+
+
+post_save.connect(reschedule_dose, sender=VaccineDose,
+                  dispatch_uid='vaccine_schedule_save_dose')
+post_delete.connect(reschedule_deleted_dose, sender=VaccineDose,
+                    dispatch_uid='vaccine_schedule_delete_dose')
+post_save.connect(reschedule_series, sender=VaccineSeries,
+                  dispatch_uid='vaccine_schedule_save_series')
+post_save.connect(reschedule_series_type, sender=VaccineDoseType,
+                  dispatch_uid='vaccine_schedule_save_dose_type')
+post_delete.connect(reschedule_series_type, sender=VaccineDoseType,
+                    dispatch_uid='vaccine_schedule_delete_dose_type')
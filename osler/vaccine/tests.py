@@ -4,7 +4,7 @@ import datetime
 
 from django.test import TestCase
 from django.urls import reverse
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
 
 from osler.core.tests.test_views import log_in_provider, build_provider
 from osler.core.models import (
@@ -13,6 +13,7 @@ from osler.followup.models import (ContactMethod, ContactResult)
 
 from . import forms
 from . import models
+from . import schedule
 
 
 class TestVaccineSeriesCreate(TestCase):
@@ -364,3 +365,145 @@ class TestVaccineFollowupCreate(TestCase):
             elif 'followup_close' in submitted_fu:
                 self.assertRedirects(response,reverse('core:patient-detail', 
                     args=(self.pt.id,)))
+
+
+class TestVaccineSchedule(TestCase):
+
+    fixtures = ['core']
+
+    def setUp(self):
+        self.provider = build_provider()
+        self.pt = Patient.objects.create(
+            first_name="Juggie",
+            last_name="Brodeltein",
+            middle_name="Bayer",
+            phone='+49 178 236 5288',
+            gender=Gender.objects.first(),
+            address='Schulstrasse 9',
+            city='Munich',
+            state='BA',
+            zip_code='63108',
+            pcp_preferred_zip='63018',
+            date_of_birth=datetime.date(1990, 1, 1),
+            patient_comfortable_with_english=False,
+        )
+        self.series_type = models.VaccineSeriesType.objects.create(
+            name="Hepatitis B")
+        self.dose_types = [
+            models.VaccineDoseType.objects.create(
+                kind=self.series_type,
+                time_from_first=datetime.timedelta(days=days))
+            for days in [180, 0, 30]]
+        self.first, self.second, self.third = sorted(
+            self.dose_types, key=lambda d: d.time_from_first)
+        self.series = self.make_series(self.pt)
+
+    def make_series(self, pt):
+        return models.VaccineSeries.objects.create(
+            author=self.provider,
+            author_type=self.provider.clinical_roles.first(),
+            patient=pt,
+            kind=self.series_type)
+
+    def give(self, dose_type, series=None):
+        return models.VaccineDose.objects.create(
+            author=self.provider,
+            author_type=self.provider.clinical_roles.first(),
+            patient=self.pt,
+            series=series or self.series,
+            which_dose=dose_type)
+
+    def test_ladder(self):
+        ladder = self.series_type.ladder()
+        self.assertEqual(ladder.dose_types,
+                         [self.first, self.second, self.third])
+        self.assertEqual(ladder.next(self.first.pk), self.second)
+        self.assertIsNone(ladder.next(self.third.pk))
+        self.assertEqual(self.series_type.last_dose(), self.third)
+        self.assertEqual(self.series_type.next_dose(self.second),
+                         self.third)
+
+    def test_due_dates(self):
+        first = self.give(self.first)
+        # the dose's own due date is set on save
+        self.assertEqual(first.next_due_date(),
+                         first.written_datetime + datetime.timedelta(30))
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.next_due_date,
+                         localdate(first.next_dose_due))
+
+        second = self.give(self.second)
+        self.assertEqual(second.next_due_date(),
+                         first.written_datetime + datetime.timedelta(180))
+
+        third = self.give(self.third)
+        self.assertIsNone(third.next_due_date())
+        self.assertTrue(third.is_last())
+        self.series.refresh_from_db()
+        self.assertIsNone(self.series.next_due_date)
+
+        # doses are rescheduled as others are taken back
+        third.delete()
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.next_due_date,
+                         localdate(second.next_dose_due))
+
+    def test_dose_type_changes(self):
+        first = self.give(self.first)
+        self.second.time_from_first = datetime.timedelta(days=60)
+        self.second.save()
+
+        first.refresh_from_db()
+        self.assertEqual(first.next_dose_due,
+                         first.written_datetime + datetime.timedelta(60))
+
+    def test_next_due_date_queries(self):
+        self.give(self.first)
+        dose = models.VaccineDose.objects.get()
+        with self.assertNumQueries(0):
+            dose.next_due_date()
+
+    def test_patients_due_between(self):
+        first = self.give(self.first)
+        due = localdate(first.next_dose_due)
+
+        pt2 = Patient.objects.create(
+            first_name="Arthur",
+            last_name="Miller",
+            middle_name="",
+            phone='+49 178 236 5288',
+            gender=Gender.objects.first(),
+            address='Schulstrasse 9',
+            city='Munich',
+            state='BA',
+            zip_code='63108',
+            pcp_preferred_zip='63018',
+            date_of_birth=datetime.date(1994, 1, 22),
+            patient_comfortable_with_english=False,
+        )
+        # a series that's complete is due no more
+        series2 = self.make_series(pt2)
+        self.give(self.first, series2)
+        self.give(self.third, series2)
+
+        with self.assertNumQueries(1):
+            patients = list(schedule.patients_due_between(
+                due, due + datetime.timedelta(7)))
+        self.assertEqual(patients, [self.pt])
+        self.assertFalse(schedule.patients_due_between(
+            due + datetime.timedelta(1), due + datetime.timedelta(7)))
+
+    def test_rebuild(self):
+        first = self.give(self.first)
+        second = self.give(self.second)
+        models.VaccineDose.objects.update(next_dose_due=None)
+        models.VaccineSeries.objects.update(next_due_date=None)
+
+        self.assertEqual(schedule.Schedule().rebuild(), 1)
+
+        second.refresh_from_db()
+        self.assertEqual(second.next_dose_due,
+                         first.written_datetime + datetime.timedelta(180))
+        self.series.refresh_from_db()
+        self.assertEqual(self.series.next_due_date,
+                         localdate(second.next_dose_due))
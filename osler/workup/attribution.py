@@ -0,0 +1,98 @@
+'''Inferring which attending should attest each unsigned note.
+
+A workup is attributed to its recorded attending if it has one, and
+otherwise to whoever signed the most workups of its clinic day. Failing
+that, and for progress notes (which have no clinic day), it goes to
+whoever signed the most notes on the same date. Signers are counted by
+aggregate queries over all signed notes, so the number of queries doesn't
+depend on the number of notes.
+'''
+from __future__ import unicode_literals
+import collections
+
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+
+from osler.core.models import Provider
+from osler.workup.models import Workup, ProgressNote
+
+
+def top_signers(rows):
+    '''From rows of (key, signer, count), the signer with the highest
+    count for each key (breaking ties by lowest pk).'''
+
+    best = {}
+    for key, signer, n in rows:
+        if key not in best or (n, -signer) > (best[key][1], -best[key][0]):
+            best[key] = (signer, n)
+    return {key: signer for key, (signer, n) in best.items()}
+
+
+def signer_counts():
+    '''The most frequent signer of each clinic day and of each date.'''
+
+    signed_workups = Workup.objects.exclude(signer=None)
+
+    by_clinic_day = signed_workups \
+        .values_list('clinic_day', 'signer') \
+        .annotate(n=Count('pk')) \
+        .order_by()
+
+    # workups count for their clinic date, progress notes the date written
+    by_date = signed_workups \
+        .annotate(date=F('clinic_day__clinic_date')) \
+        .values_list('date', 'signer') \
+        .annotate(n=Count('pk')) \
+        .order_by() \
+        .union(ProgressNote.objects
+               .exclude(signer=None)
+               .annotate(date=TruncDate('written_datetime'))
+               .values_list('date', 'signer')
+               .annotate(n=Count('pk'))
+               .order_by(), all=True)
+
+    date_counts = collections.Counter()
+    for date, signer, n in by_date:
+        date_counts[(date, signer)] += n
+
+    return (top_signers(by_clinic_day),
+            top_signers((date, signer, n) for (date, signer), n
+                        in date_counts.items()))
+
+
+def infer_attendings(workups=None, progress_notes=None):
+    '''Infer the attending responsible for each unsigned workup and
+    progress note (or those of the given querysets). Returns a list of
+    (note, provider) pairs, where provider is None if none could be
+    inferred, workups first and each oldest first.'''
+
+    if workups is None:
+        workups = Workup.objects.filter(signer=None)
+    if progress_notes is None:
+        progress_notes = ProgressNote.objects.filter(signer=None)
+
+    by_clinic_day, by_date = signer_counts()
+
+    workups = workups \
+        .select_related('patient', 'clinic_day') \
+        .order_by('clinic_day__clinic_date', 'pk')
+    progress_notes = progress_notes \
+        .select_related('patient') \
+        .order_by('written_datetime', 'pk')
+
+    inferred = []
+    for wu in workups:
+        inferred.append((wu, wu.attending_id or
+                         by_clinic_day.get(wu.clinic_day_id) or
+                         by_date.get(wu.clinic_day.clinic_date)))
+    for note in progress_notes:
+        inferred.append((note, by_date.get(
+            localtime(note.written_datetime).date())))
+
+    providers = Provider.objects \
+        .filter(pk__in={pk for note, pk in inferred if pk is not None}) \
+        .select_related('associated_user') \
+        .in_bulk()
+
+    return [(note, providers.get(pk)) for note, pk in inferred]
@@ -0,0 +1,197 @@
+'''Exporting many notes' PDFs at once as a zip archive: all the workups of a
+clinic day, or all the workups and progress notes of a patient.
+
+PDFs are taken from the cache in osler.workup.pdf where possible. The rest
+have their HTML rendered in this process (which needs the database) and
+are converted to PDF in a pool of OSLER_PDF_EXPORT_PROCESSES processes,
+a few notes ahead of the one being written. The archive is generated
+chunk by chunk, so it can be written as it is made.
+
+Since that takes a while, archives are only made outside the web
+processes: by the export_pdfs command, or for downloads, by the
+workup.export_zip job, which writes them to OSLER_PDF_EXPORT_DIR for the
+views to serve. Their names are derived from the versions of the notes in
+them, so archives of notes that have since changed are never served.
+'''
+from __future__ import unicode_literals
+from concurrent.futures import ProcessPoolExecutor
+import collections
+import hashlib
+import hmac
+import os
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from osler.core.models import Patient
+from osler.workup import pdf
+from osler.workup.models import ClinicDate, Workup, ProgressNote
+
+WORKUP_RELATED = ['patient', 'clinic_day', 'author', 'author_type',
+                  'attending', 'signer']
+
+
+def clinic_date_notes(clinic_date):
+    '''The workups of a clinic day, in the order they're exported.'''
+    return list(Workup.objects
+                .filter(clinic_day=clinic_date)
+                .select_related(*WORKUP_RELATED)
+                .order_by('patient__last_name', 'patient__first_name', 'pk'))
+
+
+def patient_notes(patient):
+    '''The workups and progress notes of a patient, oldest first.'''
+
+    workups = Workup.objects \
+        .filter(patient=patient) \
+        .select_related(*WORKUP_RELATED)
+    progress_notes = ProgressNote.objects \
+        .filter(patient=patient) \
+        .select_related('patient', 'author', 'author_type', 'signer')
+
+    return sorted(list(workups) + list(progress_notes),
+                  key=lambda note: (note.written_datetime, note.pk))
+
+
+def archive_name(note):
+    '''The name of a note's PDF within an archive, unique to the note.'''
+    return '%s-%s %s' % (note._meta.model_name, note.pk,
+                         pdf.pdf_filename(note))
+
+
+def render_pdfs(notes, processes=None):
+    '''Generate (note, PDF bytes) for each of notes, in order.'''
+
+    if processes is None:
+        processes = settings.OSLER_PDF_EXPORT_PROCESSES
+
+    if processes <= 1:
+        for note in notes:
+            f = pdf.open_cached(note)
+            if f is not None:
+                with f:
+                    yield note, f.read()
+            else:
+                data = pdf.render_pdf(note)
+                pdf.store(note, data)
+                yield note, data
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # (note, cached bytes or future), at most 2 futures per process
+        pending = collections.deque()
+        n_futures = 0
+
+        for note in notes:
+            f = pdf.open_cached(note)
+            if f is not None:
+                with f:
+                    pending.append((note, f.read()))
+            else:
+                pending.append((note, executor.submit(
+                    pdf.html_to_pdf, pdf.render_html(note))))
+                n_futures += 1
+
+            while n_futures >= 2 * processes or \
+                    (pending and isinstance(pending[0][1], bytes)):
+                note, data = pending.popleft()
+                if not isinstance(data, bytes):
+                    n_futures -= 1
+                    data = data.result()
+                    pdf.store(note, data)
+                yield note, data
+
+        while pending:
+            note, data = pending.popleft()
+            if not isinstance(data, bytes):
+                data = data.result()
+                pdf.store(note, data)
+            yield note, data
+
+
+class _Sink(object):
+    '''A write-only file that collects what is written until drained.
+    Since it can't tell or seek, zipfile writes to it sequentially.'''
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(notes, processes=None):
+    '''Generate the bytes of a zip archive of the PDFs of notes, one chunk
+    per note (and one for the archive's directory).'''
+
+    sink = _Sink()
+    # PDFs are mostly compressed already
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for note, data in render_pdfs(notes, processes):
+            archive.writestr(archive_name(note), data)
+            yield sink.drain()
+    yield sink.drain()
+
+
+class Export(object):
+    '''A kind of export: the notes of a model instance.'''
+
+    def __init__(self, model, notes):
+        self.model = model
+        self.notes = notes
+
+
+EXPORTS = {
+    'clinic_date': Export(ClinicDate, clinic_date_notes),
+    'patient': Export(Patient, patient_notes),
+}
+
+
+def export_path(kind, pk, notes):
+    '''Where the archive of notes, exported as kind of pk, is written.
+    The name is keyed with SECRET_KEY so it can't be guessed.'''
+
+    if settings.OSLER_PDF_EXPORT_DIR is None:
+        raise ImproperlyConfigured(
+            "OSLER_PDF_EXPORT_DIR must be set to export PDFs.")
+
+    version = '%s:%s:%s' % (kind, pk, ','.join(
+        '%s-%s-%s' % (n._meta.model_name, n.pk, n.last_modified.isoformat())
+        for n in notes))
+    digest = hmac.new(settings.SECRET_KEY.encode('utf-8'),
+                      version.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    return os.path.join(settings.OSLER_PDF_EXPORT_DIR,
+                        '%s-%s-%s.zip' % (kind, pk, digest))
+
+
+def write_zip(notes, path, processes=None):
+    '''Write the zip archive of notes to path, which appears only once
+    it's complete. Older archives are deleted first, least recently
+    downloaded first, to keep them within OSLER_PDF_EXPORT_MAX_BYTES.'''
+
+    export_dir = os.path.dirname(path)
+    os.makedirs(export_dir, exist_ok=True)
+    pdf.prune(export_dir, settings.OSLER_PDF_EXPORT_MAX_BYTES,
+              suffix='.zip')
+
+    fd, tmp_path = tempfile.mkstemp(dir=export_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in stream_zip(notes, processes):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from osler.core.models import Patient
+from osler.workup import export
+from osler.workup.models import ClinicDate
+
+
+class Command(BaseCommand):
+    help = '''Write a zip archive of the PDFs of all workups of a clinic
+    day, or of all workups and progress notes of a patient, e.g. for
+    archiving at the end of a clinic night or for a records request.'''
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            '--clinic-date', type=int, metavar='PK',
+            help="Export the workups of this clinic day.")
+        group.add_argument(
+            '--patient', type=int, metavar='PK',
+            help="Export the notes of this patient.")
+        parser.add_argument(
+            'output', help="The zip file to write.")
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help="Processes converting notes to PDF (default: "
+            "OSLER_PDF_EXPORT_PROCESSES).")
+
+    def handle(self, *args, **options):
+        try:
+            if options['clinic_date'] is not None:
+                notes = export.clinic_date_notes(
+                    ClinicDate.objects.get(pk=options['clinic_date']))
+            else:
+                notes = export.patient_notes(
+                    Patient.objects.get(pk=options['patient']))
+        except (ClinicDate.DoesNotExist, Patient.DoesNotExist) as e:
+            raise CommandError(e)
+
+        with open(options['output'], 'wb') as f:
+            for chunk in export.stream_zip(notes, options['processes']):
+                f.write(chunk)
+
+        self.stdout.write("Exported %s notes to %s." % (
+            len(notes), options['output']))
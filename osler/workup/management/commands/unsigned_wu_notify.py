@@ -1,41 +1,68 @@
 from __future__ import unicode_literals
 from builtins import str
-from django.urls import reverse
+import csv
+
 from django.core.management.base import BaseCommand
 from django.core.mail import send_mail
+from django.utils.timezone import localtime
 
-from osler.core.models import Provider
+from osler.core.tasks import send_email
+from osler.workup.attribution import infer_attendings
 from osler.workup.models import Workup
 
 
+def note_date(note):
+    if isinstance(note, Workup):
+        return note.clinic_day.clinic_date
+    return localtime(note.written_datetime).date()
+
+
 class Command(BaseCommand):
-    help = '''Email attendings when they have unattested workups.'''
+    help = '''Email attendings when they have unattested workups or
+    progress notes. With --dry-run, instead write a CSV of each unsigned
+    note and the attending inferred for it to stdout.'''
 
-    def handle(self, *args, **options):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report the inferred attendings as CSV; send no email.")
+        parser.add_argument(
+            '--background', action='store_true',
+            help="Queue each email as a background job instead of sending "
+                 "it now.")
 
-        unsigned_wus = Workup.objects.filter(signer=None)
+    def report(self, inferred):
+        writer = csv.writer(self.stdout, lineterminator='\n')
+        writer.writerow(['note_type', 'note_id', 'patient', 'date',
+                         'inferred_attending', 'email'])
+        for note, provider in inferred:
+            writer.writerow([
+                note._meta.model_name, note.pk, str(note.patient),
+                note_date(note),
+                str(provider) if provider else '',
+                provider.associated_user.email
+                if provider and provider.associated_user else ''])
 
-        # print(unsigned_wus)
+    def handle(self, *args, **options):
+
+        inferred = infer_attendings()
 
-        unsigned_wu2providers = {
-            wu: Provider.objects.filter(
-                signed_workups__in=wu.clinic_day.workup_set.all()).first()
-            for wu in unsigned_wus}
+        if options['dry_run']:
+            self.report(inferred)
+            return
 
         provider2unsigned = {}
         uninferred = []
-        for unsigned_wu, provider in list(unsigned_wu2providers.items()):
+        for unsigned_note, provider in inferred:
             if provider is not None:
                 if provider in provider2unsigned:
-                    provider2unsigned[provider].append(unsigned_wu)
+                    provider2unsigned[provider].append(unsigned_note)
                 else:
-                    provider2unsigned[provider] = [unsigned_wu]
+                    provider2unsigned[provider] = [unsigned_note]
             else:
-                uninferred.append(unsigned_wu)
+                uninferred.append(unsigned_note)
 
-        # print(provider2unsigned)
-
-        for provider, inferred_wus in list(provider2unsigned.items()):
+        for provider, inferred_notes in list(provider2unsigned.items()):
 
             last_name = (provider.last_name if provider.last_name
                          else provider.associated_user.last_name)
@@ -52,12 +79,11 @@ class Command(BaseCommand):
                 ""
             ]
 
-            for wu in inferred_wus:
+            for note in inferred_notes:
                 message_lines.append(" ".join([
-                    '-', str(wu.patient),
-                    '(seen %s):' % wu.clinic_day.clinic_date,
-                    'https://osler.wustl.edu' + \
-                        reverse('workup', kwargs={'pk': wu.pk})
+                    '-', str(note.patient),
+                    '(seen %s):' % note_date(note),
+                    'https://osler.wustl.edu' + note.detail_url()
                     ]))
 
             message_lines.extend([
@@ -68,10 +94,11 @@ class Command(BaseCommand):
                 "Justin"
             ])
 
-            send_mail(
-                '[OSLER] %s Unattested Notes' % len(inferred_wus),
-                "\n".join(message_lines),
-                'jrporter@wustl.edu',
-                [provider.associated_user.email],
-                fail_silently=False,
-            )
+            email = ('[OSLER] %s Unattested Notes' % len(inferred_notes),
+                     "\n".join(message_lines),
+                     'jrporter@wustl.edu',
+                     [provider.associated_user.email])
+            if options['background']:
+                send_email.delay(*email)
+            else:
+                send_mail(*email, fail_silently=False)
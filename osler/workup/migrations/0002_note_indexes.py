@@ -0,0 +1,29 @@
+# Generated by Django 3.0.5 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workup', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='progressnote',
+            index=models.Index(fields=['patient', '-written_datetime'], name='workup_prog_patient_bad29f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progressnote',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='workup_prog_written_c1ed99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workup',
+            index=models.Index(fields=['patient', '-written_datetime'], name='workup_work_patient_9f861c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workup',
+            index=models.Index(fields=['-written_datetime', '-last_modified'], name='workup_work_written_629849_idx'),
+        ),
+    ]
@@ -11,7 +11,8 @@ from django.core.validators import MinValueValidator
 
 from simple_history.models import HistoricalRecords
 
-from osler.core.models import Note, Provider, ReferralLocation, ReferralType
+from osler.core.models import (HistoryQuerySet, Note, Provider,
+                               ReferralLocation, ReferralType)
 from osler.core.validators import validate_attending
 from osler.workup import validators as workup_validators
 
@@ -94,6 +95,7 @@ class ClinicDate(models.Model):
 class AttestableNote(Note):
     class Meta(object):
         abstract = True
+        indexes = Note.Meta.indexes
 
     def sign(self, user, active_role=None):
         """Signs this workup.
@@ -153,6 +155,9 @@ class ProgressNote(AttestableNote):
     def short_text(self):
         return self.title
 
+    def detail_url(self):
+        return reverse('progress-note-detail', args=(self.pk,))
+
 
 class Workup(AttestableNote):
     '''Datamodel of a workup. Has fields specific to each part of an exam,
@@ -266,6 +271,8 @@ class Workup(AttestableNote):
 
     history = HistoricalRecords()
 
+    objects = HistoryQuerySet.as_manager()
+
     def short_text(self):
         '''
         Return the 'short text' representation of this Note. In this case, it's
@@ -273,6 +280,9 @@ class Workup(AttestableNote):
         '''
         return self.chief_complaint
 
+    def detail_url(self):
+        return reverse('workup', args=(self.pk,))
+
     # TODO: this is not consistent with the written datetime that we see for
     # the rest of the Note subclasses.
     def written_date(self):
@@ -0,0 +1,152 @@
+'''Rendering workups and progress notes to PDF, with a cache of rendered
+PDFs on disk.
+
+PDFs are stored in OSLER_PDF_CACHE_DIR under a name derived from the
+note's type, pk, last_modified and latest history id, so editing (or
+signing) a note makes a new file and old ones are never served. Names are
+keyed with SECRET_KEY so they can't be guessed. Reading a file marks it as
+recently used, and the least recently used files are deleted whenever
+the cache grows past OSLER_PDF_CACHE_MAX_BYTES.
+'''
+from __future__ import unicode_literals
+import hashlib
+import hmac
+import io
+import os
+import tempfile
+
+from xhtml2pdf import pisa
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.timezone import localtime
+
+from osler.workup.models import Workup, ProgressNote
+
+TEMPLATES = {
+    Workup: 'workup/workup_body.html',
+    ProgressNote: 'workup/progressnote_body.html',
+}
+
+
+def render_html(note):
+    '''The HTML from which a note's PDF is made.'''
+
+    return get_template(TEMPLATES[type(note)]).render(
+        {note._meta.model_name: note})
+
+
+def html_to_pdf(html):
+    '''Convert HTML to a PDF, as bytes. Doesn't touch the database, so it
+    can run in another process.'''
+
+    pdf = io.BytesIO()
+    pisa.CreatePDF(html.encode('utf-8'), dest=pdf, encoding='utf-8')
+
+    return pdf.getvalue()
+
+
+def render_pdf(note):
+    '''The PDF of a note, as bytes.'''
+    return html_to_pdf(render_html(note))
+
+
+def pdf_filename(note):
+    '''The name under which a note's PDF is downloaded, e.g.
+    "JBD (05.12.2020).pdf" for a workup.'''
+
+    initials = ''.join(name[0].upper() for name in note.patient.name(
+        reverse=False, middle_short=False).split())
+
+    if isinstance(note, Workup):
+        date = note.clinic_day.clinic_date
+        kind = ''
+    else:
+        date = localtime(note.written_datetime).date()
+        kind = ' %s' % note._meta.verbose_name
+
+    formatdate = '.'.join([str(date.month).zfill(2), str(date.day).zfill(2),
+                           str(date.year)])
+    return ''.join([initials, kind, ' (', formatdate, ').pdf'])
+
+
+def cache_path(note):
+    history_id = note.history.values_list('history_id', flat=True).first()
+    version = '%s:%s:%s:%s' % (note._meta.label_lower, note.pk,
+                               note.last_modified.isoformat(), history_id)
+    digest = hmac.new(settings.SECRET_KEY.encode('utf-8'),
+                      version.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    return os.path.join(settings.OSLER_PDF_CACHE_DIR, '%s-%s-%s.pdf' % (
+        note._meta.model_name, note.pk, digest))
+
+
+def prune(cache_dir, max_bytes, suffix='.pdf'):
+    '''Delete the least recently used files (ending in suffix) in
+    cache_dir until they take up at most max_bytes.'''
+
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # pruned concurrently
+        total -= size
+
+
+def open_cached(note):
+    '''An open binary file of the cached PDF of a note, or None if it isn't
+    cached (or the cache is disabled).'''
+
+    if settings.OSLER_PDF_CACHE_DIR is None:
+        return None
+
+    path = cache_path(note)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    try:
+        os.utime(path)  # mark as recently used
+    except FileNotFoundError:
+        pass  # pruned since opened, but the open file is still good
+    return f
+
+
+def store(note, pdf):
+    '''Add the PDF of a note, as bytes, to the cache (if it's enabled).'''
+
+    if settings.OSLER_PDF_CACHE_DIR is None:
+        return
+
+    os.makedirs(settings.OSLER_PDF_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=settings.OSLER_PDF_CACHE_DIR, suffix='.part')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(pdf)
+    os.replace(tmp_path, cache_path(note))
+
+    prune(settings.OSLER_PDF_CACHE_DIR, settings.OSLER_PDF_CACHE_MAX_BYTES)
+
+
+def cached_pdf(note):
+    '''An open binary file of the PDF of a note, rendered only if it isn't
+    in the cache.'''
+
+    f = open_cached(note)
+    if f is not None:
+        return f
+
+    pdf = render_pdf(note)
+    store(note, pdf)
+
+    return io.BytesIO(pdf)
@@ -0,0 +1,47 @@
+from __future__ import unicode_literals
+import json
+import os
+
+from django.conf import settings
+
+from osler.jobs.models import Job
+from osler.jobs.queue import task
+from osler.workup import export, pdf
+from osler.workup.models import Workup, ProgressNote
+
+
+@task('workup.cache_pdf')
+def cache_pdf(model_name, pk):
+    '''Render a workup's or progress note's PDF into the PDF cache, if it
+    isn't there already, so that it downloads instantly.'''
+
+    if settings.OSLER_PDF_CACHE_DIR is None:
+        return
+
+    model = {'workup': Workup, 'progressnote': ProgressNote}[model_name]
+    note = model.objects.filter(pk=pk).first()
+    if note is not None and not os.path.exists(pdf.cache_path(note)):
+        pdf.store(note, pdf.render_pdf(note))
+
+
+@task('workup.export_zip')
+def export_zip(kind, pk):
+    '''Write the zip archive of the PDFs of the notes of a clinic day or
+    patient (see workup.export.EXPORTS) to OSLER_PDF_EXPORT_DIR, for the
+    export views to serve.'''
+
+    obj = export.EXPORTS[kind].model.objects.filter(pk=pk).first()
+    if obj is None:
+        return
+
+    notes = export.EXPORTS[kind].notes(obj)
+    path = export.export_path(kind, pk, notes)
+    if not os.path.exists(path):
+        export.write_zip(notes, path)
+
+
+def export_zip_pending(kind, pk):
+    '''Whether an export_zip job of kind and pk is queued or running.'''
+    return Job.objects.filter(
+        name=export_zip.name, args=json.dumps([kind, pk]),
+        status__in=[Job.QUEUED, Job.RUNNING]).exists()
@@ -1,14 +1,24 @@
 from __future__ import unicode_literals
+import io
+import os
+import tempfile
+import zipfile
+from unittest import mock
 
 from builtins import range
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils.timezone import now
 from django.urls import reverse
 
 from osler.core.models import Patient, ProviderType
 from osler.core.tests.test_views import build_provider, log_in_provider
+from osler.jobs.models import Job
+from osler.jobs.queue import run_job
 
 from . import models
+from . import export
+from . import pdf
 from .tests import wu_dict
 
 
@@ -225,6 +235,178 @@ class ViewsExistTest(TestCase):
                 wu_data[unit])
 
 
+class WorkupPDFCacheTest(TestCase):
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_dir = cache_dir.name
+
+        provider = build_provider(["Coordinator"])
+        log_in_provider(self.client, provider)
+
+        models.ClinicDate.objects.create(
+            clinic_type=models.ClinicType.objects.first(),
+            clinic_date=now().date())
+        self.wu = models.Workup.objects.create(**dict(
+            wu_dict(), author=provider,
+            author_type=ProviderType.objects.get(pk="Coordinator"),
+            patient=Patient.objects.first()))
+
+    def download(self):
+        response = self.client.get(reverse('workup-pdf', args=(self.wu.pk,)))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.pdf', response['Content-Disposition'])
+        return b''.join(response.streaming_content)
+
+    def cached_files(self):
+        return sorted(os.listdir(self.cache_dir))
+
+    def test_cache_hit(self):
+        with override_settings(OSLER_PDF_CACHE_DIR=self.cache_dir):
+            first = self.download()
+            self.assertEqual(len(self.cached_files()), 1)
+
+            with mock.patch.object(pdf, 'render_pdf') as render:
+                self.assertEqual(self.download(), first)
+            render.assert_not_called()
+
+    def test_edit_makes_new_file(self):
+        with override_settings(OSLER_PDF_CACHE_DIR=self.cache_dir):
+            self.download()
+            old_files = self.cached_files()
+
+            self.wu.chief_complaint = "chest pain"
+            self.wu.save()
+            self.download()
+
+            self.assertEqual(len(self.cached_files()), 2)
+            self.assertNotIn(pdf.cache_path(self.wu),
+                             [os.path.join(self.cache_dir, f)
+                              for f in old_files])
+
+    def test_prune_least_recently_used(self):
+        for i, name in enumerate(['a.pdf', 'b.pdf', 'c.pdf']):
+            path = os.path.join(self.cache_dir, name)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 10)
+            os.utime(path, (i, i))
+
+        pdf.prune(self.cache_dir, 25)
+
+        self.assertEqual(self.cached_files(), ['b.pdf', 'c.pdf'])
+
+
+class PDFExportTest(TestCase):
+    fixtures = ['workup', 'core']
+
+    def setUp(self):
+        provider = build_provider(["Coordinator"])
+        log_in_provider(self.client, provider)
+
+        self.clinic_date = models.ClinicDate.objects.create(
+            clinic_type=models.ClinicType.objects.first(),
+            clinic_date=now().date())
+        self.patient = Patient.objects.first()
+        note_kwargs = dict(author=provider,
+                           author_type=ProviderType.objects.get(
+                               pk="Coordinator"),
+                           patient=self.patient)
+        self.workups = [
+            models.Workup.objects.create(**dict(wu_dict(), **note_kwargs))
+            for _ in range(3)]
+        self.progress_note = models.ProgressNote.objects.create(
+            title="Follow up", text="Doing well.", **note_kwargs)
+
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        settings = override_settings(OSLER_PDF_EXPORT_DIR=export_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def assertArchive(self, data, notes):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.namelist(),
+                             [export.archive_name(n) for n in notes])
+            for name in archive.namelist():
+                self.assertTrue(archive.read(name).startswith(b'%PDF'))
+
+    def assertZipResponse(self, response, notes):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertArchive(b''.join(response.streaming_content), notes)
+
+    @override_settings(OSLER_PDF_EXPORT_PROCESSES=2)
+    def test_clinic_date_export(self):
+        response = self.client.get(
+            reverse('clindate-pdf', args=(self.clinic_date.pk,)))
+        self.assertZipResponse(response, self.workups)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_patient_export(self):
+        response = self.client.get(
+            reverse('patient-notes-pdf', args=(self.patient.pk,)))
+
+        self.assertZipResponse(response, export.patient_notes(self.patient))
+        self.assertIn(self.progress_note, export.patient_notes(self.patient))
+
+    @override_settings(OSLER_JOBS_EAGER=False)
+    def test_export_in_background(self):
+        url = reverse('patient-notes-pdf', args=(self.patient.pk,))
+
+        # the export is queued once, however often the page is reloaded
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 202)
+            self.assertTemplateUsed(response, 'workup/export-pending.html')
+        job = Job.objects.get(name='workup.export_zip')
+
+        run_job(job, raise_errors=True)
+        self.assertZipResponse(self.client.get(url),
+                               export.patient_notes(self.patient))
+
+        # changing a note makes the export stale
+        self.progress_note.text = "Doing better."
+        self.progress_note.save()
+        self.assertEqual(self.client.get(url).status_code, 202)
+        self.assertEqual(
+            Job.objects.filter(name='workup.export_zip',
+                               status=Job.QUEUED).count(), 1)
+
+    def test_export_requires_staff(self):
+        log_in_provider(self.client, build_provider(["Clinical"]))
+
+        response = self.client.get(
+            reverse('clindate-pdf', args=(self.clinic_date.pk,)))
+        self.assertRedirects(response, reverse('clindate-list'))
+
+    def test_export_uses_cache(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        with override_settings(OSLER_PDF_CACHE_DIR=cache_dir.name):
+            notes = export.clinic_date_notes(self.clinic_date)
+            first = b''.join(export.stream_zip(notes, processes=0))
+
+            with mock.patch.object(pdf, 'html_to_pdf') as html_to_pdf:
+                self.assertEqual(
+                    b''.join(export.stream_zip(notes, processes=0)), first)
+            html_to_pdf.assert_not_called()
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            output = os.path.join(output_dir, 'notes.zip')
+            out = io.StringIO()
+            call_command('export_pdfs', output, patient=self.patient.pk,
+                         processes=2, stdout=out)
+
+            self.assertIn("Exported 4 notes", out.getvalue())
+            with open(output, 'rb') as f:
+                self.assertArchive(f.read(),
+                                   export.patient_notes(self.patient))
+
+
 class TestProgressNoteViews(TestCase):
     '''
     Verify that views involving the workup are functioning.
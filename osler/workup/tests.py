@@ -1,5 +1,9 @@
 from __future__ import unicode_literals
 from builtins import str
+import csv
+import datetime
+import io
+
 from django.test import TestCase
 from django.core import mail
 from django.core.exceptions import ValidationError
@@ -10,7 +14,7 @@ from django.utils.timezone import now
 from osler.core.tests.test_views import build_provider, log_in_provider
 from osler.core.models import Patient, ProviderType, Provider
 
-from osler.workup import validators
+from osler.workup import attribution, validators
 from osler.workup import models
 
 
@@ -79,6 +83,56 @@ class TestEmailForUnsignedNotes(TestCase):
             'https://osler.wustl.edu/workup/%s/' % wu_unsigned.pk,
             mail.outbox[0].body)
 
+    def sign(self, note):
+        note.sign(self.provider.associated_user,
+                  active_role=self.provider.clinical_roles.filter(
+                      signs_charts=True).first())
+        note.save()
+
+    def create_progress_note(self):
+        return models.ProgressNote.objects.create(
+            title="Depression", text="so sad", author=Provider.objects.first(),
+            author_type=ProviderType.objects.first(),
+            patient=Patient.objects.first())
+
+    def test_infer_attendings(self):
+        self.sign(models.Workup.objects.create(**wu_dict()))
+        self.sign(self.create_progress_note())
+
+        # attributed to the attending of the same clinic day
+        wu_unsigned = models.Workup.objects.create(**wu_dict())
+        # attributed to the attending who signed notes on the same date
+        pn_unsigned = self.create_progress_note()
+        # on a day without signed notes, so not attributed
+        other_day = models.ClinicDate.objects.create(
+            clinic_type=models.ClinicType.objects.first(),
+            clinic_date=now().date() - datetime.timedelta(days=7))
+        wu_other_day = models.Workup.objects.create(
+            **dict(wu_dict(), clinic_day=other_day))
+
+        with self.assertNumQueries(5):
+            inferred = attribution.infer_attendings()
+
+        self.assertEqual(inferred, [(wu_other_day, None),
+                                    (wu_unsigned, self.provider),
+                                    (pn_unsigned, self.provider)])
+
+    def test_unsigned_report(self):
+        self.sign(models.Workup.objects.create(**wu_dict()))
+        wu_unsigned = models.Workup.objects.create(**wu_dict())
+
+        out = io.StringIO()
+        call_command('unsigned_wu_notify', '--dry-run', stdout=out)
+
+        self.assertEqual(len(mail.outbox), 0)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['note_type'], 'workup')
+        self.assertEqual(rows[0]['note_id'], str(wu_unsigned.pk))
+        self.assertEqual(rows[0]['inferred_attending'], str(self.provider))
+        self.assertEqual(rows[0]['email'],
+                         self.provider.associated_user.email)
+
 
 class TestClinDateViews(TestCase):
 
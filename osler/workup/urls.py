@@ -35,6 +35,10 @@ unwrapped_urlconf = [
         r'^(?P<pk>[0-9]+)/pdf/$',
         views.pdf_workup,
         name="workup-pdf"),
+    re_path(
+        r'^patient/(?P<pt_id>[0-9]+)/pdf/$',
+        views.pdf_patient_notes,
+        name="patient-notes-pdf"),
 
     # PROGRESS NOTES
     re_path(
@@ -58,6 +62,10 @@ unwrapped_urlconf = [
         r'^(?P<pt_id>[0-9]+)/clindate/$',
         views.ClinicDateCreate.as_view(),
         name="new-clindate"),
+    re_path(
+        r'^clindates/(?P<pk>[0-9]+)/pdf/$',
+        views.pdf_clinic_date,
+        name="clindate-pdf"),
     re_path(
         r'^clindates/$',
         views.clinic_date_list,
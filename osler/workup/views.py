@@ -1,12 +1,10 @@
-from tempfile import TemporaryFile
-from xhtml2pdf import pisa
+import os
 
 from django.shortcuts import get_object_or_404, render
 from django.http import (HttpResponseRedirect, HttpResponseServerError,
-                         HttpResponse)
+                         FileResponse)
 from django.urls import reverse
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.template.loader import get_template
 from django.utils.timezone import now
 from django.views.generic.edit import FormView
 from django.conf import settings
@@ -17,6 +15,9 @@ from osler.core.models import Patient, ProviderType
 
 from osler.workup import models
 from osler.workup import forms
+from osler.workup import pdf
+from osler.workup import export
+from osler.workup import tasks
 
 
 def get_clindates():
@@ -225,6 +226,7 @@ def sign_workup(request, pk):
     try:
         wu.sign(request.user, active_provider_type)
         wu.save()
+        tasks.cache_pdf.delay(wu._meta.model_name, wu.pk)
     except ValueError:
         # thrown exception can be ignored since we just redirect back to the
         # workup detail view anyway
@@ -240,6 +242,7 @@ def sign_progress_note(request, pk):
     try:
         wu.sign(request.user, active_provider_type)
         wu.save()
+        tasks.cache_pdf.delay(wu._meta.model_name, wu.pk)
     except ValueError:
         # thrown exception can be ignored since we just redirect back to the
         # workup detail view anyway
@@ -262,31 +265,66 @@ def pdf_workup(request, pk):
                                              pk=request.session['clintype_pk'])
 
     if active_provider_type.staff_view:
-        data = {'workup': wu}
+        return FileResponse(pdf.cached_pdf(wu),
+                            as_attachment=True,
+                            filename=pdf.pdf_filename(wu),
+                            content_type='application/pdf')
+    else:
+        return HttpResponseRedirect(reverse('workup',
+                                            args=(wu.id,)))
+
+
+def zip_response(request, kind, obj, filename):
+    '''The zip archive of the PDFs of obj's notes (see workup.export), if
+    it has been made; otherwise, a page that waits for the export_zip job
+    making it.'''
+
+    notes = export.EXPORTS[kind].notes(obj)
+    path = export.export_path(kind, obj.pk, notes)
+    if not os.path.exists(path) and \
+            not tasks.export_zip_pending(kind, obj.pk):
+        tasks.export_zip.delay(kind, obj.pk)
+
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return render(request, 'workup/export-pending.html',
+                      {'filename': filename}, status=202)
+
+    try:
+        os.utime(path)  # mark as recently used
+    except FileNotFoundError:
+        pass
+    return FileResponse(f, as_attachment=True, filename=filename,
+                        content_type='application/zip')
 
-        template = get_template('workup/workup_body.html')
-        html = template.render(data)
 
-        with TemporaryFile(mode="w+b") as file:
-            pisa.CreatePDF(html.encode('utf-8'), dest=file,
-                           encoding='utf-8')
+def pdf_clinic_date(request, pk):
+    '''A zip archive of the PDFs of all workups of a clinic day.'''
 
-            file.seek(0)
-            pdf = file.read()
+    clinic_date = get_object_or_404(models.ClinicDate, pk=pk)
+    active_provider_type = get_object_or_404(ProviderType,
+                                             pk=request.session['clintype_pk'])
+
+    if active_provider_type.staff_view:
+        return zip_response(
+            request, 'clinic_date', clinic_date,
+            'workups %s.zip' % clinic_date.clinic_date.isoformat())
+    else:
+        return HttpResponseRedirect(reverse('clindate-list'))
 
-        initials = ''.join(name[0].upper() for name in wu.patient.name(
-            reverse=False, middle_short=False).split())
-        formatdate = '.'.join(
-            [str(wu.clinic_day.clinic_date.month).zfill(2),
-             str(wu.clinic_day.clinic_date.day).zfill(2),
-             str(wu.clinic_day.clinic_date.year)])
-        filename = ''.join([initials, ' (', formatdate, ')'])
 
-        response = HttpResponse(pdf, 'application/pdf')
-        response["Content-Disposition"] = (
-            "attachment; filename=%s.pdf" % (filename,))
+def pdf_patient_notes(request, pt_id):
+    '''A zip archive of the PDFs of all workups and progress notes of a
+    patient.'''
 
-        return response
+    patient = get_object_or_404(Patient, pk=pt_id)
+    active_provider_type = get_object_or_404(ProviderType,
+                                             pk=request.session['clintype_pk'])
+
+    if active_provider_type.staff_view:
+        return zip_response(request, 'patient', patient,
+                            'patient-%s notes.zip' % patient.pk)
     else:
-        return HttpResponseRedirect(reverse('workup',
-                                            args=(wu.id,)))
+        return HttpResponseRedirect(
+            reverse('core:patient-detail', args=(patient.pk,)))